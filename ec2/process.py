@@ -1,14 +1,59 @@
+import argparse
 import boto3
+import json
+import threading
+from botocore.exceptions import ClientError
+from collections import deque
+from datetime import datetime, timedelta, timezone
 from concurrent.futures import ThreadPoolExecutor
-from time import sleep
+from time import monotonic, sleep, time
 
-# Configure source and destination regions
+# Configure source and destination regions. One AMI is created per instance and copied to all
+# destination regions concurrently; the instance is launched in each region as its copy lands
 SOURCE_REGION = 'eu-central-1'
-DESTINATION_REGION = 'eu-north-1'
+DESTINATION_REGIONS = ['eu-north-1']
 
-# Initialize Boto3 clients for both regions
+# Initialize Boto3 clients for the source region (destination clients are created per region)
 source_ec2 = boto3.client('ec2', region_name=SOURCE_REGION)
-destination_ec2 = boto3.client('ec2', region_name=DESTINATION_REGION)
+source_cloudwatch = boto3.client('cloudwatch', region_name=SOURCE_REGION)
+
+# AMI polling: interval grows while nothing changes and resets when an image changes state
+AMI_POLL_MIN_INTERVAL = 5
+AMI_POLL_MAX_INTERVAL = 60
+AMI_WAIT_TIMEOUT = 3000  # Seconds to wait for an AMI before giving up
+# EBS snapshot copies kept in flight per destination region (an AMI copy counts once per snapshot).
+# Limited to 20 concurrent per destination region; adjust if Service Quotas shows a different value
+MAX_CONCURRENT_SNAPSHOT_COPIES = 20
+
+# Fast Snapshot Restore: volumes of the new instance are fully initialized at launch instead of
+# lazily loading blocks from S3. Enabled on the copied AMI's snapshots in the launch AZ before launch
+# and disabled once the instance is running
+ENABLE_FAST_SNAPSHOT_RESTORE = False
+FAST_RESTORE_AVAILABILITY_ZONE_SUFFIX = 'a'  # AZ '<region>a' is used when the launch subnet's AZ is unknown
+FAST_RESTORE_WAIT_TIMEOUT = 7200  # Seconds to wait for 'enabled' before launching without it
+# Default quota: 5 snapshots with fast snapshot restore per region (counted per snapshot)
+MAX_CONCURRENT_FAST_RESTORES = 5
+# Minutes after the last launch to sample EBS read latency of new vs. source volumes (0 to skip)
+DISK_LATENCY_REPORT_MINUTES = 15
+
+# Warm migration (--phase): 'preseed' copies an initial AMI to the destination ahead of the cutover window;
+# 'cutover' takes a fresh AMI and copies its snapshots one by one. EBS copies only the blocks changed since
+# the pre-seeded snapshot copies, so the cutover copy time follows the changed data instead of the disk size.
+# Keep the pre-seed AMIs and snapshots in both regions until the cutover is done
+PRESEED_INSTANCE_TAG = 'migration:source-instance'
+PRESEED_PHASE_TAG = 'migration:phase'
+PRESEED_COPY_TIME_TAG = 'migration:copy-seconds'
+# Source EBS volume of a snapshot copy: EBS copies incrementally only on top of the latest copy of the same volume
+SOURCE_VOLUME_TAG = 'migration:source-volume'
+# Source AMI attributes carried over when the copied snapshots are registered as an AMI
+REGISTER_IMAGE_ATTRIBUTES = ['Architecture', 'RootDeviceName', 'VirtualizationType', 'EnaSupport',
+                             'SriovNetSupport', 'BootMode', 'TpmSupport', 'ImdsSupport']
+
+# Machine-readable timeline of the migration: one JSON object per line with a span per instance and stage
+# (start/end, volume size, GiB/s) and events for AMI state changes and snapshot copy progress. None disables it
+TELEMETRY_FILE = 'ec2-migration-telemetry.jsonl'
+# Stages whose duration is dominated by moving the instance's data; GiB/s is derived only for these
+TELEMETRY_THROUGHPUT_STAGES = ['wait_ami', 'wait_copied_ami', 'wait_snapshots', 'wait_fast_restore']
 
 # List of instance IDs to migrate
 INSTANCE_IDS_TO_MIGRATE = [
@@ -29,11 +74,291 @@ INSTANCE_IDS_TO_MIGRATE = [
 ]
 
 
-def create_ami(instance_id):
-    """Create an AMI from an EC2 instance."""
+class Telemetry:
+    """Append stage spans and state/progress events to a JSONL timeline and summarize throughput per region and stage."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        self.spans = []
+        self.clock_offset = time() - monotonic()  # Spans are timed with monotonic(); the timeline uses wall time
+
+    def timestamp(self, at):
+        return datetime.fromtimestamp(at + self.clock_offset, timezone.utc).isoformat()
+
+    def write(self, record):
+        if not self.path:
+            return
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, 'a')
+            self.file.write(json.dumps(record) + '\n')
+            self.file.flush()
+
+    def span(self, resource, region, stage, started, finished, size_gib=None, status='ok', **fields):
+        """Record one stage of one resource; started and finished are monotonic() times."""
+        duration = finished - started
+        record = {'type': 'span', 'resource': resource, 'region': region, 'stage': stage,
+                  'start': self.timestamp(started), 'end': self.timestamp(finished), 'duration_s': round(duration, 3),
+                  'size_gib': size_gib, 'status': status, **fields}
+        if size_gib and duration > 0 and stage in TELEMETRY_THROUGHPUT_STAGES:
+            record['gib_per_s'] = round(size_gib / duration, 4)
+        with self.lock:
+            self.spans.append((record, started, finished))
+        self.write(record)
+
+    def event(self, resource, region, event, **fields):
+        """Record a point-in-time event, e.g. a state change or copy progress."""
+        self.write({'type': 'event', 'time': self.timestamp(monotonic()), 'resource': resource, 'region': region,
+                    'event': event, **fields})
+
+    def summary(self):
+        """Print and record per region and stage: resources, GiB, busy time and aggregate GiB/s over the makespan."""
+        groups = {}
+        for record, started, finished in self.spans:
+            groups.setdefault((record['region'], record['stage']), []).append((record, started, finished))
+        print(f'{"region":<15} {"stage":<20} {"count":>5} {"size_gib":>9} {"busy_s":>9} {"makespan_s":>11} {"gib_per_s":>10}')
+        # Regions in order, and stages within a region in the order they started
+        for (region, stage), spans in sorted(groups.items(), key=lambda group: (group[0][0], min(s[1] for s in group[1]))):
+            size_gib = sum(record['size_gib'] or 0 for record, _, _ in spans)
+            busy = sum(finished - started for _, started, finished in spans)
+            makespan = max(finished for _, _, finished in spans) - min(started for _, started, _ in spans)
+            throughput = size_gib / makespan if stage in TELEMETRY_THROUGHPUT_STAGES and makespan > 0 else None
+            print(f'{region:<15} {stage:<20} {len(spans):>5} {size_gib:>9} {busy:>9.1f} {makespan:>11.1f} '
+                  f'{f"{throughput:.3f}" if throughput is not None else "-":>10}')
+            self.write({'type': 'summary', 'region': region, 'stage': stage, 'count': len(spans), 'size_gib': size_gib,
+                        'busy_s': round(busy, 3), 'makespan_s': round(makespan, 3),
+                        'gib_per_s': round(throughput, 4) if throughput is not None else None})
+
+
+telemetry = Telemetry(TELEMETRY_FILE)
+
+
+class ImagePoller:
+    """Track all pending AMIs of one region and poll them with a single describe_images call per tick."""
+
+    ready_state = 'available'
+    failed_state = 'failed'
+
+    def __init__(self, ec2_client, label):
+        self.ec2_client = ec2_client
+        self.label = label
+        self.lock = threading.Lock()
+        self.pending = {}  # image_id -> {'callbacks': [...], 'state': last seen state, 'deadline': ...}
+        self.thread = None
+
+    def watch(self, image_id, callback, timeout=AMI_WAIT_TIMEOUT):
+        """Call callback(state) from the poller thread once the image is available or failed (None on timeout)."""
+        with self.lock:
+            waiter = self.pending.setdefault(image_id, {'callbacks': [], 'state': None, 'deadline': monotonic() + timeout})
+            waiter['callbacks'].append(callback)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=f'{self.label}-poller', daemon=True)
+                self.thread.start()
+
+    def wait(self, image_id, timeout=AMI_WAIT_TIMEOUT):
+        """Block until the image is available or failed; returns the last seen state."""
+        done = threading.Event()
+        result = {}
+
+        def finished(state):
+            result['state'] = state
+            done.set()
+
+        self.watch(image_id, finished, timeout)
+        done.wait()
+        return result['state']
+
+    def _describe(self, image_ids):
+        """Current state of each image. Images not yet visible after create/copy are skipped."""
+        try:
+            images = self.ec2_client.describe_images(ImageIds=image_ids)['Images']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidAMIID.NotFound':
+                raise
+            images = self.ec2_client.describe_images(Filters=[{'Name': 'image-id', 'Values': image_ids}])['Images']
+        return {image['ImageId']: image['State'] for image in images}
+
+    def _run(self):
+        interval = AMI_POLL_MIN_INTERVAL
+        while True:
+            with self.lock:
+                image_ids = list(self.pending)
+                if not image_ids:
+                    self.thread = None
+                    return
+
+            try:
+                states = {}
+                for start in range(0, len(image_ids), 100):
+                    states.update(self._describe(image_ids[start:start + 100]))
+            except Exception as e:
+                print(f'Error polling {self.label}s {image_ids}: {e}')
+                states = {}
+
+            changed = False
+            finished = []
+            now = monotonic()
+            with self.lock:
+                for image_id in image_ids:
+                    waiter = self.pending[image_id]
+                    state = states.get(image_id, waiter['state'])
+                    if state != waiter['state']:
+                        changed = True
+                        waiter['state'] = state
+                        telemetry.event(image_id, self.ec2_client.meta.region_name, 'state', state=state)
+                        if state not in (self.ready_state, self.failed_state):
+                            print(f'{self.label} {image_id} is {state}.')
+                    if state in (self.ready_state, self.failed_state) or now > waiter['deadline']:
+                        terminal = state if state in (self.ready_state, self.failed_state) else None
+                        finished.append((self.pending.pop(image_id), terminal))
+
+            # Callbacks run outside the lock so they can register further images
+            for waiter, state in finished:
+                for callback in waiter['callbacks']:
+                    callback(state)
+
+            # Poll quickly right after a change, back off while all images stay in the same state
+            interval = AMI_POLL_MIN_INTERVAL if changed else min(interval * 2, AMI_POLL_MAX_INTERVAL)
+            sleep(interval)
+
+
+class SnapshotPoller(ImagePoller):
+    """Same batched polling for snapshot copies, with a single describe_snapshots call per tick."""
+
+    ready_state = 'completed'
+    failed_state = 'error'
+
+    def __init__(self, ec2_client, label):
+        super().__init__(ec2_client, label)
+        self.progress = {}  # snapshot_id -> last seen progress, recorded in the telemetry timeline on change
+
+    def _describe(self, snapshot_ids):
+        try:
+            snapshots = self.ec2_client.describe_snapshots(SnapshotIds=snapshot_ids)['Snapshots']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidSnapshot.NotFound':
+                raise
+            snapshots = self.ec2_client.describe_snapshots(
+                Filters=[{'Name': 'snapshot-id', 'Values': snapshot_ids}])['Snapshots']
+        for snapshot in snapshots:
+            progress = snapshot.get('Progress')
+            if progress and self.progress.get(snapshot['SnapshotId']) != progress:
+                self.progress[snapshot['SnapshotId']] = progress
+                telemetry.event(snapshot['SnapshotId'], self.ec2_client.meta.region_name, 'progress',
+                                progress_pct=float(progress.rstrip('%')))
+        return {snapshot['SnapshotId']: snapshot['State'] for snapshot in snapshots}
+
+
+# One poller per region shared by all migration threads (destination pollers live in Destination)
+source_images = ImagePoller(source_ec2, 'AMI')
+
+
+class CopyScheduler:
+    """Keep at most `limit` units (snapshots) in flight; queued operations are admitted in order as earlier ones
+    complete. An operation with more units than the limit is admitted alone so it cannot block the queue forever."""
+
+    def __init__(self, label, limit):
+        self.label = label
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.queue = deque()
+        self.in_use = 0
+        self.in_flight = {}  # key -> (units, queued, admitted)
+        self.timings = []  # (key, queue wait, transfer time)
+
+    def _fits(self, units):
+        return not self.in_flight or self.in_use + units <= self.limit
+
+    def submit(self, key, start, units=1):
+        """Call start() once `units` slots are free. start() must not block: it only hands the work to a worker."""
+        with self.lock:
+            queued = monotonic()
+            if self.queue or not self._fits(units):
+                self.queue.append((key, start, units, queued))
+                return
+            self.in_use += units
+            self.in_flight[key] = (units, queued, monotonic())
+        start()
+
+    def complete(self, key):
+        """Free the slots of a finished or failed operation and admit the queued ones that now fit."""
+        admit = []
+        with self.lock:
+            units, queued, admitted = self.in_flight.pop(key)
+            self.in_use -= units
+            self.timings.append((key, admitted - queued, monotonic() - admitted))
+            while self.queue and self._fits(self.queue[0][2]):
+                next_key, start, next_units, next_queued = self.queue.popleft()
+                self.in_use += next_units
+                self.in_flight[next_key] = (next_units, next_queued, monotonic())
+                admit.append(start)
+        for start in admit:
+            start()
+
+    def report(self):
+        """Print queue wait vs. transfer time of the copies."""
+        if not self.timings:
+            return
+        waits = [wait for _, wait, _ in self.timings]
+        transfers = [transfer for _, _, transfer in self.timings]
+        print(f'{self.label}: {len(self.timings)} done, max {self.limit} snapshots in flight; '
+              f'queue wait avg {sum(waits) / len(waits):.1f}s max {max(waits):.1f}s; '
+              f'in flight avg {sum(transfers) / len(transfers):.1f}s max {max(transfers):.1f}s')
+
+
+class Destination:
+    """Clients, pollers, copy limits and security group translations of one destination region."""
+
+    def __init__(self, region):
+        self.region = region
+        self.ec2 = boto3.client('ec2', region_name=region)
+        self.cloudwatch = boto3.client('cloudwatch', region_name=region)
+        self.images = ImagePoller(self.ec2, f'Copied AMI ({region})')
+        self.snapshots = SnapshotPoller(self.ec2, f'Copied snapshot ({region})')
+        # Copy quotas are per destination region, so each region gets its own slots
+        self.ami_copies = CopyScheduler(f'AMI copies to {region}', MAX_CONCURRENT_SNAPSHOT_COPIES)
+        self.fast_restores = CopyScheduler(f'Fast snapshot restores in {region}', MAX_CONCURRENT_FAST_RESTORES)
+        # Source -> destination security group IDs, translated once per unique group and shared by all threads.
+        # A single re-entrant lock: translation is rare, and referenced groups are translated recursively
+        self.security_group_map = {}
+        self.security_group_lock = threading.RLock()
+
+
+destinations = {}
+destinations_lock = threading.Lock()
+
+
+def get_destination(region):
+    """Shared Destination of a region (boto3 client creation is not thread-safe, so under a lock)."""
+    with destinations_lock:
+        if region not in destinations:
+            destinations[region] = Destination(region)
+        return destinations[region]
+
+
+# Source AMI descriptions, fetched once per AMI and shared by all destination regions
+source_image_cache = {}
+
+
+def describe_source_image(ami_id):
+    """Description of a source AMI."""
+    if ami_id not in source_image_cache:
+        source_image_cache[ami_id] = source_ec2.describe_images(ImageIds=[ami_id])['Images'][0]
+    return source_image_cache[ami_id]
+
+
+def image_size_gib(image):
+    """Total size of the AMI's EBS volumes in GiB."""
+    return sum(mapping['Ebs'].get('VolumeSize', 0) for mapping in image['BlockDeviceMappings'] if 'Ebs' in mapping)
+
+
+def create_ami(instance_id, phase='full'):
+    """Create an AMI from an EC2 instance. Pre-seed and cutover AMIs get the phase in their name."""
     response = source_ec2.create_image(
         InstanceId=instance_id,
-        Name=f'Migration-{instance_id}',
+        Name=f'Migration-{instance_id}' if phase == 'full' else f'Migration-{instance_id}-{phase}',
         NoReboot=True
     )
     ami_id = response['ImageId']
@@ -42,110 +367,266 @@ def create_ami(instance_id):
 
 
 def wait_for_ami(ami_id):
-    """Wait for the AMI to become available with manual status checks."""
+    """Wait for the AMI to become available via the shared source region poller."""
     print(f'Waiting for AMI {ami_id} to become available...')
+    started = monotonic()
+    state = source_images.wait(ami_id)
 
-    max_attempts = 100  # Number of attempts to check the status
-    sleep_time = 30  # Time to wait between checks in seconds
+    if state == 'available':
+        print(f'AMI {ami_id} is now available after {monotonic() - started:.0f}s.')
+    elif state == 'failed':
+        print(f'AMI {ami_id} creation failed.')
+    else:
+        print(f'AMI {ami_id} did not become available after {AMI_WAIT_TIMEOUT / 60} minutes.')
+    return state
 
-    for attempt in range(max_attempts):
-        response = source_ec2.describe_images(ImageIds=[ami_id])
-        state = response['Images'][0]['State']
 
-        if state == 'available':
-            print(f'AMI {ami_id} is now available.')
-            return
-        elif state == 'failed':
-            print(f'AMI {ami_id} creation failed.')
-            return
-        else:
-            print(f'Attempt {attempt + 1}: AMI {ami_id} is still {state}. Waiting...')
-            sleep(sleep_time)
+def permission_entries(permissions):
+    """Split permissions into single-source entries keyed by (protocol, ports, source) for diffing."""
+    entries = {}
+    for permission in permissions:
+        base = (permission['IpProtocol'], permission.get('FromPort'), permission.get('ToPort'))
+        for kind, field in (('IpRanges', 'CidrIp'), ('Ipv6Ranges', 'CidrIpv6'), ('UserIdGroupPairs', 'GroupId')):
+            for source in permission.get(kind, []):
+                value = {field: source[field]}
+                if source.get('Description'):
+                    value['Description'] = source['Description']
+                entries[base + (kind, source[field])] = value
+    return entries
 
-    print(f'AMI {ami_id} did not become available after {max_attempts * sleep_time / 60} minutes.')
 
+def build_permissions(entries):
+    """Group single-source entries back into IpPermissions for one authorize call."""
+    grouped = {}
+    for (protocol, from_port, to_port, kind, _), value in entries.items():
+        permission = grouped.get((protocol, from_port, to_port))
+        if permission is None:
+            permission = {'IpProtocol': protocol}
+            if from_port is not None:
+                permission.update(FromPort=from_port, ToPort=to_port)
+            grouped[(protocol, from_port, to_port)] = permission
+        permission.setdefault(kind, []).append(value)
+    return list(grouped.values())
 
-def copy_security_groups(security_group_ids):
-    """Copy security groups from source to destination region."""
-    copied_security_group_ids = []
-    for sg_id in security_group_ids:
-        sg = source_ec2.describe_security_groups(GroupIds=[sg_id])['SecurityGroups'][0]
 
-        # Check if the security group already exists in the destination region
-        existing_sg = destination_ec2.describe_security_groups(
-            Filters=[{'Name': 'group-name', 'Values': [sg['GroupName']]}]
-        )['SecurityGroups']
+def translate_permissions(permissions, sg_id, new_sg_id, destination):
+    """Rewrite group references to destination group IDs. Prefix lists are regional and are skipped."""
+    translated = []
+    for permission in permissions:
+        permission = dict(permission)
+        if permission.pop('PrefixListIds', None):
+            print(f'Skipping prefix list rules of security group {sg_id}: prefix lists differ between regions')
+        pairs = []
+        for pair in permission.get('UserIdGroupPairs', []):
+            if pair['GroupId'] == sg_id:
+                referenced = new_sg_id
+            else:
+                referenced = translate_security_group(pair['GroupId'], destination)
+            if referenced:
+                pairs.append(dict(pair, GroupId=referenced))
+        permission['UserIdGroupPairs'] = pairs
+        translated.append(permission)
+    return translated
 
-        if existing_sg:
-            new_sg_id = existing_sg[0]['GroupId']
-            print(f'Security group {sg["GroupName"]} already exists as {new_sg_id}')
-        else:
-            response = destination_ec2.create_security_group(
-                GroupName=sg['GroupName'],
-                Description=sg['Description'],
-                VpcId=sg['VpcId'] if 'VpcId' in sg else None
-            )
-            new_sg_id = response['GroupId']
-            print(f'Copied security group {sg_id} to {new_sg_id}')
-
-        # Copy security group rules
-        for permission in sg['IpPermissions']:
-            try:
-                destination_ec2.authorize_security_group_ingress(
-                    GroupId=new_sg_id,
-                    IpPermissions=[permission]
+
+def replicate_rules(sg, new_sg_id, destination):
+    """Apply the ingress and egress rules missing in the destination group, one call per direction."""
+    existing = destination.ec2.describe_security_groups(GroupIds=[new_sg_id])['SecurityGroups'][0]
+    for rules_key, authorize in (('IpPermissions', destination.ec2.authorize_security_group_ingress),
+                                 ('IpPermissionsEgress', destination.ec2.authorize_security_group_egress)):
+        wanted = permission_entries(
+            translate_permissions(sg.get(rules_key, []), sg['GroupId'], new_sg_id, destination))
+        present = permission_entries(existing.get(rules_key, []))
+        missing = {key: value for key, value in wanted.items() if key not in present}
+        if not missing:
+            continue
+        try:
+            authorize(GroupId=new_sg_id, IpPermissions=build_permissions(missing))
+            print(f'Copied {len(missing)} {rules_key} rules to security group {new_sg_id}')
+        except ClientError as e:
+            print(f'Error copying {rules_key} rules for security group {new_sg_id}: {e}')
+
+
+def translate_security_group(sg_id, destination, sg=None):
+    """Destination ID for a source security group; the group and its rules are replicated once per region."""
+    with destination.security_group_lock:
+        if sg_id in destination.security_group_map:
+            # Either ready, or being replicated by this thread further up a reference chain
+            return destination.security_group_map[sg_id]
+        try:
+            if sg is None:
+                sg = source_ec2.describe_security_groups(GroupIds=[sg_id])['SecurityGroups'][0]
+
+            # Check if the security group already exists in the destination region
+            existing_sg = destination.ec2.describe_security_groups(
+                Filters=[{'Name': 'group-name', 'Values': [sg['GroupName']]}]
+            )['SecurityGroups']
+
+            if existing_sg:
+                new_sg_id = existing_sg[0]['GroupId']
+                print(f'Security group {sg["GroupName"]} already exists as {new_sg_id}')
+            else:
+                params = {'VpcId': sg['VpcId']} if 'VpcId' in sg else {}
+                response = destination.ec2.create_security_group(
+                    GroupName=sg['GroupName'],
+                    Description=sg['Description'],
+                    **params
                 )
-            except Exception as e:
-                print(f'Error copying rules for security group {new_sg_id}: {e}')
+                new_sg_id = response['GroupId']
+                print(f'Copied security group {sg_id} to {new_sg_id} in {destination.region}')
+        except ClientError as e:
+            print(f'Error copying security group {sg_id}: {e}')
+            return None
 
-        copied_security_group_ids.append(new_sg_id)
-    return copied_security_group_ids
+        destination.security_group_map[sg_id] = new_sg_id
+        replicate_rules(sg, new_sg_id, destination)
+        return new_sg_id
 
 
-def copy_ami(ami_id):
+def copy_security_groups(security_group_ids, destination):
+    """Copy security groups from source to destination region (cached across instances)."""
+    with destination.security_group_lock:
+        unknown = [sg_id for sg_id in security_group_ids if sg_id not in destination.security_group_map]
+        described = {}
+        if unknown:
+            described = {sg['GroupId']: sg for sg in
+                         source_ec2.describe_security_groups(GroupIds=unknown)['SecurityGroups']}
+        copied = [translate_security_group(sg_id, destination, described.get(sg_id)) for sg_id in security_group_ids]
+    return [sg_id for sg_id in copied if sg_id]
+
+
+def copy_ami(ami_id, destination):
     """Copy an AMI to the destination region."""
-    response = destination_ec2.copy_image(
+    response = destination.ec2.copy_image(
         Name=f'Migration-{ami_id}',
         SourceImageId=ami_id,
         SourceRegion=SOURCE_REGION
     )
     copied_ami_id = response['ImageId']
-    print(f'Copied AMI {ami_id} to destination region as {copied_ami_id}')
+    print(f'Copied AMI {ami_id} to {destination.region} as {copied_ami_id}')
     return copied_ami_id
 
 
-def wait_for_copied_ami(copied_ami_id):
-    """Wait for the copied AMI to become available with manual status checks."""
+def wait_for_copied_ami(copied_ami_id, destination):
+    """Wait for the copied AMI to become available via the shared destination region poller."""
     print(f'Waiting for copied AMI {copied_ami_id} to become available...')
+    started = monotonic()
+    state = destination.images.wait(copied_ami_id)
 
-    max_attempts = 100  # Number of attempts to check the status
-    sleep_time = 30  # Time to wait between checks in seconds
+    if state == 'available':
+        print(f'Copied AMI {copied_ami_id} is now available after {monotonic() - started:.0f}s.')
+    elif state == 'failed':
+        print(f'Copied AMI {copied_ami_id} creation failed.')
+    else:
+        print(f'Copied AMI {copied_ami_id} did not become available after {AMI_WAIT_TIMEOUT / 60} minutes.')
+    return state
 
-    for attempt in range(max_attempts):
-        response = destination_ec2.describe_images(ImageIds=[copied_ami_id])
-        state = response['Images'][0]['State']
 
-        if state == 'available':
-            print(f'Copied AMI {copied_ami_id} is now available.')
-            return
-        elif state == 'failed':
-            print(f'Copied AMI {copied_ami_id} creation failed.')
-            return
-        else:
-            print(f'Attempt {attempt + 1}: Copied AMI {copied_ami_id} is still {state}. Waiting...')
-            sleep(sleep_time)
+def tag_preseed(instance_id, copied_ami_id, copy_seconds, destination, source_image):
+    """Tag the pre-seeded AMI and its snapshots in the destination region so the cutover can find them.
+    Each snapshot also gets the source volume it was copied from."""
+    image = destination.ec2.describe_images(ImageIds=[copied_ami_id])['Images'][0]
+    snapshot_ids = [mapping['Ebs']['SnapshotId'] for mapping in image['BlockDeviceMappings']
+                    if mapping.get('Ebs', {}).get('SnapshotId')]
+    tags = [
+        {'Key': PRESEED_INSTANCE_TAG, 'Value': instance_id},
+        {'Key': PRESEED_PHASE_TAG, 'Value': 'preseed'},
+        {'Key': PRESEED_COPY_TIME_TAG, 'Value': str(round(copy_seconds))},
+    ]
+    destination.ec2.create_tags(Resources=[copied_ami_id], Tags=tags)
+    # The copied AMI keeps the device names of the source AMI
+    volumes = source_volumes(source_image)
+    source_snapshots = {mapping['DeviceName']: mapping['Ebs']['SnapshotId']
+                        for mapping in source_image['BlockDeviceMappings'] if mapping.get('Ebs', {}).get('SnapshotId')}
+    for mapping in image['BlockDeviceMappings']:
+        if not mapping.get('Ebs', {}).get('SnapshotId'):
+            continue
+        volume_id = volumes.get(source_snapshots.get(mapping['DeviceName']))
+        volume_tags = [{'Key': SOURCE_VOLUME_TAG, 'Value': volume_id}] if volume_id else []
+        destination.ec2.create_tags(Resources=[mapping['Ebs']['SnapshotId']], Tags=tags + volume_tags)
+    print(f'Pre-seeded instance {instance_id} in {destination.region} as {copied_ami_id} with snapshots {snapshot_ids}')
+    return snapshot_ids
+
+
+def source_volumes(image):
+    """Source EBS volume of each snapshot of a source AMI: {snapshot: volume}."""
+    snapshot_ids = [mapping['Ebs']['SnapshotId'] for mapping in image['BlockDeviceMappings']
+                    if mapping.get('Ebs', {}).get('SnapshotId')]
+    if not snapshot_ids:
+        return {}
+    response = source_ec2.describe_snapshots(SnapshotIds=snapshot_ids)
+    return {snapshot['SnapshotId']: snapshot['VolumeId'] for snapshot in response['Snapshots']}
+
 
-    print(f'Copied AMI {copied_ami_id} did not become available after {max_attempts * sleep_time / 60} minutes.')
+def preseeded_snapshots(instance_id, destination):
+    """Pre-seeded snapshots of an instance in the destination region that are still the latest copy of their
+    source volume, i.e. the base EBS copies the cutover incrementally on top of: {source volume: snapshot}."""
+    paginator = destination.ec2.get_paginator('describe_snapshots')
+    latest = {}
+    for page in paginator.paginate(OwnerIds=['self'],
+                                   Filters=[{'Name': f'tag:{PRESEED_INSTANCE_TAG}', 'Values': [instance_id]}]):
+        for snapshot in page['Snapshots']:
+            tags = {tag['Key']: tag['Value'] for tag in snapshot.get('Tags', [])}
+            volume_id = tags.get(SOURCE_VOLUME_TAG)
+            # On equal start times a later-phase copy wins, so a pre-seed is never assumed to be the base by mistake
+            order = (snapshot['StartTime'], tags.get(PRESEED_PHASE_TAG) != 'preseed')
+            if volume_id and (volume_id not in latest or order > latest[volume_id][0]):
+                latest[volume_id] = (order, snapshot, tags)
+    return {volume_id: snapshot for volume_id, (_, snapshot, tags) in latest.items()
+            if tags.get(PRESEED_PHASE_TAG) == 'preseed'}
 
 
-def launch_instance(instance_data, ami_id, security_group_ids):
+def copy_snapshots(instance_id, image, destination, volumes):
+    """Copy each EBS snapshot of the AMI to the destination region, tagged with its source volume
+    so that later runs can tell which copy is the latest. Returns {source snapshot: copied snapshot}."""
+    copies = {}
+    for mapping in image['BlockDeviceMappings']:
+        snapshot_id = mapping.get('Ebs', {}).get('SnapshotId')
+        if not snapshot_id:
+            continue
+        tags = [{'Key': PRESEED_INSTANCE_TAG, 'Value': instance_id}, {'Key': PRESEED_PHASE_TAG, 'Value': 'cutover'}]
+        if volumes.get(snapshot_id):
+            tags.append({'Key': SOURCE_VOLUME_TAG, 'Value': volumes[snapshot_id]})
+        response = destination.ec2.copy_snapshot(
+            SourceRegion=SOURCE_REGION,
+            SourceSnapshotId=snapshot_id,
+            Description=f'Migration-{instance_id}-cutover {snapshot_id}',
+            TagSpecifications=[{'ResourceType': 'snapshot', 'Tags': tags}]
+        )
+        copies[snapshot_id] = response['SnapshotId']
+    print(f'Copying snapshots of AMI {image["ImageId"]} to {destination.region} as {list(copies.values())}')
+    return copies
+
+
+def register_copied_image(image, snapshot_copies, destination):
+    """Register the copied snapshots as an AMI in the destination region with the source AMI's attributes."""
+    mappings = []
+    for mapping in image['BlockDeviceMappings']:
+        mapping = dict(mapping)
+        if mapping.get('Ebs', {}).get('SnapshotId'):
+            ebs = {key: value for key, value in mapping['Ebs'].items()
+                   if key in ('DeleteOnTermination', 'VolumeSize', 'VolumeType', 'Iops', 'Throughput')}
+            mapping['Ebs'] = dict(ebs, SnapshotId=snapshot_copies[mapping['Ebs']['SnapshotId']])
+        mappings.append(mapping)
+    response = destination.ec2.register_image(
+        Name=f'Migration-{image["ImageId"]}',
+        Description=f'Copied from {image["ImageId"]} in {SOURCE_REGION}',
+        BlockDeviceMappings=mappings,
+        **{key: image[key] for key in REGISTER_IMAGE_ATTRIBUTES if key in image}
+    )
+    copied_ami_id = response['ImageId']
+    print(f'Registered AMI {copied_ami_id} in {destination.region} from the copied snapshots of {image["ImageId"]}')
+    return copied_ami_id
+
+
+def launch_instance(instance_data, ami_id, security_group_ids, destination):
     """Launch an EC2 instance from an AMI in the destination region."""
     # Extract block device mappings, excluding any ephemeral storage
     block_device_mappings = [
         mapping for mapping in instance_data['BlockDeviceMappings'] if 'Ebs' in mapping
     ]
 
-    response = destination_ec2.run_instances(
+    response = destination.ec2.run_instances(
         ImageId=ami_id,
         InstanceType=instance_data['InstanceType'],
         KeyName=instance_data.get('KeyName', None),
@@ -159,56 +640,551 @@ def launch_instance(instance_data, ami_id, security_group_ids):
         EbsOptimized=instance_data.get('EbsOptimized', False)
     )
     new_instance_id = response['Instances'][0]['InstanceId']
-    print(f'Launched new instance {new_instance_id} in destination region')
+    print(f'Launched new instance {new_instance_id} in {destination.region}')
     return new_instance_id
 
 
-def copy_tags(instance_id, new_instance_id):
+def copy_tags(instance_id, new_instance_id, destination):
     """Copy tags from the source instance to the destination instance."""
     tags = source_ec2.describe_tags(
         Filters=[{'Name': 'resource-id', 'Values': [instance_id]}]
     )['Tags']
     if tags:
-        destination_ec2.create_tags(Resources=[new_instance_id], Tags=tags)
+        destination.ec2.create_tags(Resources=[new_instance_id], Tags=tags)
         print(f'Copied tags from {instance_id} to {new_instance_id}')
 
 
-def migrate_instance(instance_id):
-    """Migrate an EC2 instance from source to destination region."""
+def fast_restore_availability_zone(instance_data, destination):
+    """AZ of the launch subnet in the destination region, where the volumes will be created."""
+    subnet_id = instance_data.get('SubnetId')
+    if subnet_id:
+        try:
+            return destination.ec2.describe_subnets(SubnetIds=[subnet_id])['Subnets'][0]['AvailabilityZone']
+        except ClientError as e:
+            print(f'Could not find subnet {subnet_id} in {destination.region}: {e}')
+    return f'{destination.region}{FAST_RESTORE_AVAILABILITY_ZONE_SUFFIX}'
+
+
+def enable_fast_restore(job):
+    """Enable fast snapshot restore on all snapshots of the copied AMI in the launch AZ."""
+    destination = job['destination']
+    image = destination.ec2.describe_images(ImageIds=[job['copied_ami_id']])['Images'][0]
+    job['fast_restore_snapshots'] = [mapping['Ebs']['SnapshotId'] for mapping in image['BlockDeviceMappings']
+                                     if mapping.get('Ebs', {}).get('SnapshotId')]
+    job['fast_restore_az'] = fast_restore_availability_zone(job['instance_data'], destination)
+    response = destination.ec2.enable_fast_snapshot_restores(
+        AvailabilityZones=[job['fast_restore_az']],
+        SourceSnapshotIds=job['fast_restore_snapshots']
+    )
+    for error in response.get('Unsuccessful', []):
+        print(f'Could not enable fast snapshot restore for {error["SnapshotId"]}: {error["FastSnapshotRestoreStateErrors"]}')
+    job['fast_restore_snapshots'] = [item['SnapshotId'] for item in response.get('Successful', [])]
+    print(f'Enabling fast snapshot restore for {job["fast_restore_snapshots"]} in {job["fast_restore_az"]}')
+
+
+def wait_for_fast_restore(job):
+    """Wait until fast snapshot restore is 'enabled' for all snapshots; returns False on timeout."""
+    deadline = monotonic() + FAST_RESTORE_WAIT_TIMEOUT
+    interval = AMI_POLL_MIN_INTERVAL
+    while True:
+        restores = job['destination'].ec2.describe_fast_snapshot_restores(Filters=[
+            {'Name': 'snapshot-id', 'Values': job['fast_restore_snapshots']},
+            {'Name': 'availability-zone', 'Values': [job['fast_restore_az']]},
+        ])['FastSnapshotRestores']
+        states = {restore['SnapshotId']: restore['State'] for restore in restores}
+        if all(states.get(snapshot_id) == 'enabled' for snapshot_id in job['fast_restore_snapshots']):
+            return True
+        if monotonic() > deadline:
+            print(f'Fast snapshot restore for {job["copied_ami_id"]} not enabled after {FAST_RESTORE_WAIT_TIMEOUT}s: {states}')
+            return False
+        sleep(interval)
+        interval = min(interval * 2, AMI_POLL_MAX_INTERVAL)
+
+
+def disable_fast_restore(job):
+    """Disable fast snapshot restore once the new instance is running (its volumes already exist).
+    It is disabled even if waiting fails: enabled fast snapshot restore is billed per snapshot and AZ hour."""
+    try:
+        job['destination'].ec2.get_waiter('instance_running').wait(InstanceIds=[job['new_instance_id']])
+    finally:
+        release_fast_restore(job)
+
+
+def release_fast_restore(job):
+    """Disable fast snapshot restore and free its quota slot."""
+    try:
+        job['destination'].ec2.disable_fast_snapshot_restores(
+            AvailabilityZones=[job['fast_restore_az']],
+            SourceSnapshotIds=job['fast_restore_snapshots']
+        )
+        print(f'Disabled fast snapshot restore for {job["fast_restore_snapshots"]} in {job["fast_restore_az"]}')
+    except ClientError as e:
+        print(f'Could not disable fast snapshot restore for {job["fast_restore_snapshots"]}: {e}')
+    finally:
+        job['destination'].fast_restores.complete(job['copied_ami_id'])
+
+
+def volume_ids(ec2_client, instance_ids):
+    """EBS volume IDs of each instance (one describe_instances per 200 instances)."""
+    volumes = {}
+    for start in range(0, len(instance_ids), 200):
+        paginator = ec2_client.get_paginator('describe_instances')
+        for page in paginator.paginate(InstanceIds=instance_ids[start:start + 200]):
+            for reservation in page['Reservations']:
+                for instance in reservation['Instances']:
+                    volumes[instance['InstanceId']] = [mapping['Ebs']['VolumeId'] for mapping in
+                                                       instance.get('BlockDeviceMappings', []) if 'Ebs' in mapping]
+    return volumes
+
+
+def read_latency_ms(cloudwatch, volumes, start_time, end_time):
+    """Average EBS read latency (ms) per volume: VolumeTotalReadTime / VolumeReadOps over the window."""
+    period = max(60, int((end_time - start_time).total_seconds()) // 60 * 60)
+    latency = {}
+    for start in range(0, len(volumes), 250):
+        chunk = volumes[start:start + 250]
+        queries = []
+        for index, volume_id in enumerate(chunk):
+            for prefix, metric in (('t', 'VolumeTotalReadTime'), ('o', 'VolumeReadOps')):
+                queries.append({'Id': f'{prefix}{index}', 'ReturnData': True, 'MetricStat': {
+                    'Metric': {'Namespace': 'AWS/EBS', 'MetricName': metric,
+                               'Dimensions': [{'Name': 'VolumeId', 'Value': volume_id}]},
+                    'Period': period, 'Stat': 'Sum'}})
+        sums = {}
+        paginator = cloudwatch.get_paginator('get_metric_data')
+        for page in paginator.paginate(MetricDataQueries=queries, StartTime=start_time, EndTime=end_time):
+            for result in page['MetricDataResults']:
+                sums[result['Id']] = sums.get(result['Id'], 0) + sum(result['Values'])
+        for index, volume_id in enumerate(chunk):
+            if sums.get(f'o{index}'):
+                latency[volume_id] = sums[f't{index}'] / sums[f'o{index}'] * 1000
+    return latency
+
+
+def report_disk_latency(jobs):
+    """Compare read latency of the new volumes since launch with the source volumes over the same window."""
+    jobs = [job for job in jobs if job.get('new_instance_id')]
+    if not jobs:
+        return
+    print(f'Sampling EBS read latency for {DISK_LATENCY_REPORT_MINUTES} minutes after the last launch...')
+    sleep(DISK_LATENCY_REPORT_MINUTES * 60)
+    end_time = datetime.now(timezone.utc)
+    start_time = end_time - timedelta(seconds=monotonic() - min(job['launched_at'] for job in jobs))
+
+    source_volumes = volume_ids(source_ec2, list({job['instance_id'] for job in jobs}))
+    source_latency = read_latency_ms(source_cloudwatch, [v for vs in source_volumes.values() for v in vs], start_time, end_time)
+    new_volumes, new_latency = {}, {}
+    for destination in {job['destination'].region: job['destination'] for job in jobs}.values():
+        new_instance_ids = [job['new_instance_id'] for job in jobs if job['destination'] is destination]
+        volumes = volume_ids(destination.ec2, new_instance_ids)
+        new_volumes.update(volumes)
+        new_latency.update(read_latency_ms(destination.cloudwatch, [v for vs in volumes.values() for v in vs],
+                                           start_time, end_time))
+
+    def average(values):
+        values = [value for value in values if value is not None]
+        return sum(values) / len(values) if values else None
+
+    groups = {}
+    print(f'{"instance":<21} {"region":<15} {"new instance":<21} {"fast restore":<13} {"source_ms":>10} {"new_ms":>10}')
+    for job in jobs:
+        source_ms = average(source_latency.get(v) for v in source_volumes.get(job['instance_id'], []))
+        new_ms = average(new_latency.get(v) for v in new_volumes.get(job['new_instance_id'], []))
+        fast_restore = 'yes' if job.get('fast_restore_enabled') else 'no'
+        groups.setdefault(fast_restore, []).append((source_ms, new_ms))
+        print(f'{job["instance_id"]:<21} {job["destination"].region:<15} {job["new_instance_id"]:<21} '
+              f'{fast_restore:<13} '
+              f'{source_ms if source_ms is not None else float("nan"):>10.2f} {new_ms if new_ms is not None else float("nan"):>10.2f}')
+    for fast_restore, values in sorted(groups.items()):
+        source_ms = average(source for source, _ in values)
+        new_ms = average(new for _, new in values)
+        if source_ms is not None and new_ms is not None:
+            print(f'Fast restore {fast_restore}: new volumes {new_ms:.2f} ms vs. source {source_ms:.2f} ms '
+                  f'({new_ms - source_ms:+.2f} ms) over {len(values)} instances')
+
+
+def instance_size_gib(instance_data):
+    """Total size of the instance's EBS volumes in GiB."""
+    ebs_volume_ids = [mapping['Ebs']['VolumeId'] for mapping in instance_data.get('BlockDeviceMappings', [])
+                      if 'Ebs' in mapping]
+    if not ebs_volume_ids:
+        return 0
+    return sum(volume['Size'] for volume in source_ec2.describe_volumes(VolumeIds=ebs_volume_ids)['Volumes'])
+
+
+def snapshot_count(instance_data):
+    """Number of EBS snapshots in the instance's AMI (one per attached EBS volume); used for quota slots."""
+    return max(1, sum(1 for mapping in instance_data.get('BlockDeviceMappings', []) if 'Ebs' in mapping))
+
+
+def stage_create_ami(job):
+    """Describe the source instance and start creating its AMI (once for all destination regions)."""
+    instance_info = source_ec2.describe_instances(InstanceIds=[job['instance_id']])
+    job['instance_data'] = instance_info['Reservations'][0]['Instances'][0]
+    job['size_gib'] = instance_size_gib(job['instance_data'])
+    job['ami_id'] = create_ami(job['instance_id'], job['phase'])
+
+
+def stage_security_groups(job):
+    """Copy the instance's security groups while its AMI is still being created."""
+    security_group_ids = [sg['GroupId'] for sg in job['instance_data']['SecurityGroups']]
+    job['security_group_ids'] = copy_security_groups(security_group_ids, job['destination'])
+
+
+def stage_copy_ami(job):
+    """Start copying the AMI to the destination region."""
+    job['copy_gib'] = image_size_gib(describe_source_image(job['ami_id']))
+    job['copy_started'] = monotonic()
+    job['copied_ami_id'] = copy_ami(job['ami_id'], job['destination'])
+
+
+def stage_tag_preseed(job):
+    """Mark the copied AMI as the pre-seed of its instance; the instance is launched at cutover."""
+    tag_preseed(job['instance_id'], job['copied_ami_id'], job['copy_seconds'], job['destination'],
+                describe_source_image(job['ami_id']))
+
+
+def stage_copy_snapshots(job):
+    """Start copying the AMI's snapshots; EBS copies a snapshot incrementally when the pre-seeded copy
+    of its source volume is still the latest copy in the destination, and in full otherwise."""
+    job['source_image'] = describe_source_image(job['ami_id'])
+    volumes = source_volumes(job['source_image'])
+    preseeded = preseeded_snapshots(job['instance_id'], job['destination'])
+    # Pre-seed copy time per source snapshot that has its own pre-seeded base
+    job['preseed_copy_seconds'] = {}
+    for snapshot_id, volume_id in volumes.items():
+        if volume_id in preseeded:
+            tags = {tag['Key']: tag['Value'] for tag in preseeded[volume_id].get('Tags', [])}
+            job['preseed_copy_seconds'][snapshot_id] = tags.get(PRESEED_COPY_TIME_TAG)
+    full = sorted(set(volumes) - set(job['preseed_copy_seconds']))
+    if full:
+        print(f'No pre-seeded base for snapshots {full} of instance {job["instance_id"]} '
+              f'in {job["destination"].region}: they are copied in full')
+    job['copy_gib'] = image_size_gib(job['source_image'])
+    job['copy_started'] = monotonic()
+    job['snapshot_copies'] = copy_snapshots(job['instance_id'], job['source_image'], job['destination'], volumes)
+    job['copied_snapshot_ids'] = list(job['snapshot_copies'].values())
+
+
+def stage_register_ami(job):
+    """Register the copied snapshots as the AMI to launch from."""
+    job['copied_ami_id'] = register_copied_image(job['source_image'], job['snapshot_copies'], job['destination'])
+
+
+def stage_enable_fast_restore(job):
+    """Start enabling fast snapshot restore; on failure the instance is launched without it."""
     try:
-        # Describe the instance to get all parameters
-        instance_info = source_ec2.describe_instances(InstanceIds=[instance_id])
-        instance_data = instance_info['Reservations'][0]['Instances'][0]
+        enable_fast_restore(job)
+    except Exception as e:
+        print(f'Could not enable fast snapshot restore for {job["copied_ami_id"]}: {e}')
+        job['fast_restore_snapshots'] = []
+    if not job['fast_restore_snapshots']:
+        job['destination'].fast_restores.complete(job['copied_ami_id'])
 
-        # Create an AMI
-        ami_id = create_ami(instance_id)
-        wait_for_ami(ami_id)
 
-        # Copy the AMI to the destination region
-        copied_ami_id = copy_ami(ami_id)
-        wait_for_copied_ami(copied_ami_id)
+def stage_wait_fast_restore(job):
+    """Wait for fast snapshot restore to be enabled before launch; on errors launch without waiting."""
+    if not job['fast_restore_snapshots']:
+        return
+    try:
+        job['fast_restore_enabled'] = wait_for_fast_restore(job)
+    except Exception as e:
+        print(f'Could not check fast snapshot restore for {job["copied_ami_id"]}: {e}')
 
-        # Copy security groups
-        security_group_ids = instance_data['SecurityGroups']
-        security_group_ids = [sg['GroupId'] for sg in security_group_ids]
-        copied_security_group_ids = copy_security_groups(security_group_ids)
 
-        # Launch the new instance
-        new_instance_id = launch_instance(instance_data, copied_ami_id, copied_security_group_ids)
+def stage_launch(job):
+    """Launch the new instance from the copied AMI."""
+    job['new_instance_id'] = launch_instance(job['instance_data'], job['copied_ami_id'], job['security_group_ids'],
+                                             job['destination'])
+    job['launched_at'] = monotonic()
 
-        # Copy tags
-        copy_tags(instance_id, new_instance_id)
 
+def stage_disable_fast_restore(job):
+    """Disable fast snapshot restore after launch and free its quota slot. The instance is already launched,
+    so errors here are reported without failing its migration."""
+    if not job['fast_restore_snapshots']:
+        return
+    try:
+        disable_fast_restore(job)
     except Exception as e:
-        print(f'Error migrating instance {instance_id}: {e}')
+        print(f'Instance {job["new_instance_id"]} did not reach running before fast snapshot restore was disabled: {e}')
+
+
+def stage_tags(job):
+    """Copy tags to the new instance."""
+    copy_tags(job['instance_id'], job['new_instance_id'], job['destination'])
+
+
+def pipeline_stages(phase, fast_restore=False):
+    """Migration stages of a phase in order. Wait stages hold no worker thread: the region poller calls back.
+    create_ami runs once per instance; the following stages run once per destination region."""
+    if phase == 'preseed':
+        return ['create_ami', 'security_groups', 'wait_ami', 'copy_ami', 'wait_copied_ami', 'tag_preseed']
+    if phase == 'cutover':
+        copy = ['copy_snapshots', 'wait_snapshots', 'register_ami', 'wait_registered_ami']
+    else:
+        copy = ['copy_ami', 'wait_copied_ami']
+    if fast_restore:
+        launch = ['enable_fast_restore', 'wait_fast_restore', 'launch', 'disable_fast_restore', 'tags']
+    else:
+        launch = ['launch', 'tags']
+    return ['create_ami', 'security_groups', 'wait_ami'] + copy + launch
+
+
+STAGE_FUNCTIONS = {
+    'create_ami': stage_create_ami,
+    'security_groups': stage_security_groups,
+    'copy_ami': stage_copy_ami,
+    'tag_preseed': stage_tag_preseed,
+    'copy_snapshots': stage_copy_snapshots,
+    'register_ami': stage_register_ami,
+    'enable_fast_restore': stage_enable_fast_restore,
+    'wait_fast_restore': stage_wait_fast_restore,
+    'launch': stage_launch,
+    'disable_fast_restore': stage_disable_fast_restore,
+    'tags': stage_tags,
+}
+# Wait stage -> (poller of the job's region, job key with the ID or IDs to wait for)
+WAIT_STAGES = {
+    'wait_ami': (lambda job: source_images, 'ami_id'),
+    'wait_copied_ami': (lambda job: job['destination'].images, 'copied_ami_id'),
+    'wait_snapshots': (lambda job: job['destination'].snapshots, 'copied_snapshot_ids'),
+    'wait_registered_ami': (lambda job: job['destination'].images, 'copied_ami_id'),
+}
+# Stages that run in the source region
+SOURCE_STAGES = ['create_ami', 'wait_ami']
+# Copy stages and the wait stage that ends the copy. A copy holds an ami_copies slot of its region in between
+COPY_STAGES = {'copy_ami': 'wait_copied_ami', 'copy_snapshots': 'wait_snapshots'}
+# Concurrency limit per API stage
+STAGE_WORKERS = {'create_ami': 5, 'security_groups': 2, 'copy_ami': 5, 'tag_preseed': 5, 'copy_snapshots': 5,
+                 'register_ami': 5, 'enable_fast_restore': 5,
+                 'wait_fast_restore': MAX_CONCURRENT_FAST_RESTORES, 'launch': 5, 'disable_fast_restore': 5, 'tags': 5}
+
+
+class MigrationPipeline:
+    """Move instances independently through per-stage worker pools and record per-stage timings.
+    Each instance's AMI is created once and then fanned out to every destination region."""
+
+    def __init__(self, phase='full', fast_restore=False, regions=DESTINATION_REGIONS, stage_workers=STAGE_WORKERS):
+        self.phase = phase
+        self.stages = pipeline_stages(phase, fast_restore)
+        self.destinations = [get_destination(region) for region in regions]
+        # Stages after the fan-out run once per region, so their pools scale with the number of regions
+        self.pools = {stage: ThreadPoolExecutor(max_workers=stage_workers[stage] * (
+                          1 if stage == self.stages[0] else len(self.destinations)), thread_name_prefix=stage)
+                      for stage in self.stages if stage not in WAIT_STAGES}
+        self.lock = threading.Lock()
+        self.timings = {stage: [] for stage in self.stages}  # stage -> [(queued, started, finished)]
+        self.results = {}
+        self.jobs = []  # One job per instance and destination region
+        self.source_spans = set()  # (stage, instance_id): source stages are shared by the region jobs, recorded once
+        self.remaining = 0
+        self.done = threading.Event()
+
+    def run(self, instance_ids):
+        """Migrate all instances; returns {instance_id: {region: new instance or pre-seeded AMI ID, or failed stage}}."""
+        self.started = monotonic()
+        self.remaining = len(instance_ids) * len(self.destinations)
+        for instance_id in instance_ids:
+            self.submit(self.stages[0], {'instance_id': instance_id, 'phase': self.phase})
+        if self.remaining:
+            self.done.wait()
+        for pool in self.pools.values():
+            pool.shutdown()
+        self.finished = monotonic()
+        return self.results
+
+    def submit(self, stage, job):
+        queued = monotonic()
+        if stage in WAIT_STAGES:
+            poller, key = WAIT_STAGES[stage]
+            ids = job[key] if isinstance(job[key], list) else [job[key]]
+            self._watch_all(poller(job), ids, lambda state: self._after_wait(stage, job, queued, state))
+        elif stage in COPY_STAGES:
+            job['destination'].ami_copies.submit(
+                job['ami_id'], lambda: self.pools[stage].submit(self._run_stage, stage, job, queued),
+                snapshot_count(job['instance_data']))
+        elif stage == 'enable_fast_restore':
+            job['destination'].fast_restores.submit(
+                job['copied_ami_id'], lambda: self.pools[stage].submit(self._run_stage, stage, job, queued),
+                snapshot_count(job['instance_data']))
+        else:
+            self.pools[stage].submit(self._run_stage, stage, job, queued)
+
+    def _run_stage(self, stage, job, queued):
+        started = monotonic()
+        try:
+            STAGE_FUNCTIONS[stage](job)
+        except Exception as e:
+            region = f' to {job["destination"].region}' if 'destination' in job else ''
+            print(f'Error migrating instance {job["instance_id"]}{region} at stage {stage}: {e}')
+            if stage in COPY_STAGES:
+                job['destination'].ami_copies.complete(job['ami_id'])
+            elif stage == 'launch' and job.get('fast_restore_snapshots'):
+                release_fast_restore(job)
+            self._record(stage, job, queued, started, 'failed')
+            self._finish(job, f'failed at {stage}')
+            return
+        self._record(stage, job, queued, started)
+        self._advance(stage, job)
+
+    def _watch_all(self, poller, ids, callback):
+        """Call callback with the ready state once all IDs are ready, otherwise with the first other state."""
+        if not ids:
+            callback(poller.ready_state)
+            return
+        lock = threading.Lock()
+        states = []
+
+        def finished(state):
+            with lock:
+                states.append(state)
+                if len(states) < len(ids):
+                    return
+            failed = [state for state in states if state != poller.ready_state]
+            callback(failed[0] if failed else poller.ready_state)
+
+        for item_id in ids:
+            poller.watch(item_id, finished)
+
+    def _after_wait(self, stage, job, queued, state):
+        poller, key = WAIT_STAGES[stage]
+        ready = state == poller(job).ready_state
+        self._record(stage, job, queued, queued, 'ok' if ready else state or 'timeout')
+        if stage in COPY_STAGES.values():
+            job['copy_finished'] = monotonic()
+            job['copy_seconds'] = job['copy_finished'] - job['copy_started']
+            job['destination'].ami_copies.complete(job['ami_id'])
+        if not ready:
+            print(f'{poller(job).label} {job[key]} of instance {job["instance_id"]} is {state or "not ready in time"}.')
+            self._finish(job, f'failed at {stage}')
+            return
+        self._advance(stage, job)
+
+    def _advance(self, stage, job):
+        index = self.stages.index(stage)
+        if index + 1 == len(self.stages):
+            self._finish(job, job.get('new_instance_id') or job['copied_ami_id'])
+        elif 'destination' in job:
+            self.submit(self.stages[index + 1], job)
+        else:
+            # Fan out: the AMI is copied to and launched in each region independently
+            for destination in self.destinations:
+                region_job = dict(job, destination=destination)
+                with self.lock:
+                    self.jobs.append(region_job)
+                self.submit(self.stages[index + 1], region_job)
+
+    def _record(self, stage, job, queued, started, status='ok'):
+        finished = monotonic()
+        with self.lock:
+            self.timings[stage].append((queued, started, finished))
+            if stage in SOURCE_STAGES:
+                if (stage, job['instance_id']) in self.source_spans:
+                    return
+                self.source_spans.add((stage, job['instance_id']))
+        # AMI creation happens in the source region; everything after the fan-out is per destination
+        region = job['destination'].region if stage not in SOURCE_STAGES else SOURCE_REGION
+        fields = {'destination': job['destination'].region} if 'destination' in job else {}
+        if job['phase'] == 'cutover' and stage in COPY_STAGES.values() and job.get('preseed_copy_seconds'):
+            incremental = [job['snapshot_copies'][snapshot_id] for snapshot_id in job['preseed_copy_seconds']]
+            fields['incremental'] = len(incremental) == len(job['snapshot_copies'])
+            fields['incremental_snapshots'] = sorted(incremental)
+        telemetry.span(job['instance_id'], region, stage, started, finished, job.get('size_gib'), status,
+                       queue_s=round(started - queued, 3), **fields)
+
+    def _finish(self, job, result):
+        # A failure before the fan-out fails the instance in all regions
+        destinations = [job['destination']] if 'destination' in job else self.destinations
+        with self.lock:
+            for destination in destinations:
+                self.results.setdefault(job['instance_id'], {})[destination.region] = result
+            self.remaining -= len(destinations)
+            if self.remaining == 0:
+                self.done.set()
+
+    def report(self):
+        """Print per-stage makespan, busy time and queueing delay, plus the total makespan."""
+        print(f'{"stage":<20} {"count":>5} {"makespan_s":>11} {"avg_s":>8} {"max_s":>8} {"avg_queue_s":>12}')
+        for stage in self.stages:
+            timings = self.timings[stage]
+            if not timings:
+                continue
+            makespan = max(t[2] for t in timings) - min(t[0] for t in timings)
+            durations = [finished - started for _, started, finished in timings]
+            queue_delays = [started - queued for queued, started, _ in timings]
+            print(f'{stage:<20} {len(timings):>5} {makespan:>11.1f} {sum(durations) / len(durations):>8.1f} '
+                  f'{max(durations):>8.1f} {sum(queue_delays) / len(queue_delays):>12.1f}')
+        results = [(instance_id, region, result) for instance_id, regions in self.results.items()
+                   for region, result in regions.items()]
+        failed = [(instance_id, region, result) for instance_id, region, result in results
+                  if result.startswith('failed')]
+        verb = 'Pre-seeded' if self.phase == 'preseed' else 'Migrated'
+        print(f'{verb} {len(results) - len(failed)} of {len(results)} instances to '
+              f'{", ".join(d.region for d in self.destinations)} in {self.finished - self.started:.1f}s.')
+        for instance_id, region, result in failed:
+            print(f'Instance {instance_id} {result} in {region}.')
+        self.region_report()
+        for destination in self.destinations:
+            destination.ami_copies.report()
+            destination.fast_restores.report()
+        if self.phase == 'cutover':
+            self.copy_report()
+        telemetry.summary()
+
+    def region_report(self):
+        """Print copy latency and throughput per destination region, and when its instances were launched."""
+        print(f'{"region":<15} {"copies":>6} {"size_gib":>9} {"avg_copy_s":>11} {"max_copy_s":>11} '
+              f'{"copy_makespan_s":>16} {"mib_per_s":>10} {"launched":>8} {"last_launch_s":>14}')
+        for destination in self.destinations:
+            jobs = [job for job in self.jobs if job['destination'] is destination]
+            copies = [job for job in jobs if 'copy_seconds' in job]
+            launches = [job['launched_at'] - self.started for job in jobs if 'launched_at' in job]
+            if copies:
+                size_gib = sum(job['copy_gib'] for job in copies)
+                durations = [job['copy_seconds'] for job in copies]
+                makespan = max(job['copy_finished'] for job in copies) - min(job['copy_started'] for job in copies)
+                throughput = size_gib * 1024 / makespan if makespan else 0
+                print(f'{destination.region:<15} {len(copies):>6} {size_gib:>9} '
+                      f'{sum(durations) / len(durations):>11.1f} {max(durations):>11.1f} {makespan:>16.1f} '
+                      f'{throughput:>10.1f} {len(launches):>8} {max(launches, default=0):>14.1f}')
+            else:
+                print(f'{destination.region:<15} {0:>6} {"-":>9} {"-":>11} {"-":>11} {"-":>16} {"-":>10} '
+                      f'{len(launches):>8} {"-":>14}')
+        if any(job.get('preseed_copy_seconds') for job in self.jobs):
+            print('Cutover copies of pre-seeded instances are incremental: '
+                  'size_gib and mib_per_s count full volume sizes.')
+
+    def copy_report(self):
+        """Print the cutover copy time of each instance next to the full copy time of its pre-seeds
+        and how many of its snapshots were copied incrementally."""
+        print(f'{"instance":<20} {"region":<15} {"preseed_copy_s":>15} {"cutover_copy_s":>15} {"incremental":>12}')
+        for job in self.jobs:
+            if 'copy_seconds' not in job:
+                continue
+            seconds = [int(value) for value in job.get('preseed_copy_seconds', {}).values() if value]
+            preseed = max(seconds) if seconds else '-'
+            incremental = f'{len(job.get("preseed_copy_seconds", {}))}/{len(job.get("snapshot_copies", {}))}'
+            print(f'{job["instance_id"]:<20} {job["destination"].region:<15} {preseed:>15} '
+                  f'{job["copy_seconds"]:>15.1f} {incremental:>12}')
 
 
 def main():
-    # Use ThreadPoolExecutor to migrate instances in parallel
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        executor.map(migrate_instance, INSTANCE_IDS_TO_MIGRATE)
+    parser = argparse.ArgumentParser(description='Migrate EC2 instances to other regions.')
+    parser.add_argument('--phase', choices=['full', 'preseed', 'cutover'], default='full',
+                        help='full: copy and launch in one run; preseed: copy an initial AMI ahead of the cutover '
+                             'window; cutover: copy only the changes since the pre-seed and launch')
+    parser.add_argument('--regions', nargs='+', default=DESTINATION_REGIONS,
+                        help='Destination regions; each AMI is copied to all of them concurrently')
+    args = parser.parse_args()
+
+    # Instances flow through the stages independently; each stage has its own worker pool
+    pipeline = MigrationPipeline(args.phase, ENABLE_FAST_SNAPSHOT_RESTORE, args.regions)
+    pipeline.run(INSTANCE_IDS_TO_MIGRATE)
+    pipeline.report()
+    if ENABLE_FAST_SNAPSHOT_RESTORE and DISK_LATENCY_REPORT_MINUTES and args.phase != 'preseed':
+        report_disk_latency(pipeline.jobs)
 
 
 if __name__ == '__main__':
     main()
-
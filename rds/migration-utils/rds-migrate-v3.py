@@ -1,7 +1,9 @@
 import boto3
+import json
 import time
+import threading
 import concurrent.futures
-import botocore.exceptions
+from datetime import datetime, timezone
 
 # Configuration
 source_region = 'eu-central-1'  # Source region
@@ -9,6 +11,8 @@ target_region = 'eu-west-1'  # Target region
 availability_zone = f'{target_region}a'  # Availability zone in the target region
 multi_az = False  # Set to True for Multi-AZ deployment
 publicly_accessible = False  # Set to False if the instance should not be publicly accessible
+# Security group ID to be applied to the restored DB instance
+security_group_ids = ['sg-0fea3798bf54e9fe6']
 
 # Specify your KMS key ID in the target region (required for encrypted snapshots)
 kms_key_id = '18d3258d-89df-4690-82a1-f2da9ba78ccb'  # Ireland
@@ -26,185 +30,151 @@ account_id = boto3.client('sts').get_caller_identity().get('Account')
 # Define an exclude list for instance identifiers
 exclude_list = ['1athena-dev-banking', '1athena-dev-dwh', '1athena-dev-trading-processor', '1athena-devrds', '1athena-trading-processor', '1athena-vaultdev', '1athena-banking']  # Add your specific instance IDs to exclude
 
+# Cross-region snapshot copies kept in flight to the target region. RDS allows 20 concurrent
+# snapshot copies per destination region and account; adjust if Service Quotas shows a different value
+max_concurrent_copies = 20
+copy_slots = threading.BoundedSemaphore(max_concurrent_copies)
+copy_timings = []  # (snapshot identifier, queue wait, transfer time) in seconds
+copy_timings_lock = threading.Lock()
+
+# Machine-readable timeline of the migration: one JSON object per line with a span per instance and stage
+# (start/end, AllocatedStorage, GiB/s) and events with snapshot status and progress. Set to None to disable
+telemetry_file = 'rds-migration-telemetry.jsonl'
+telemetry_spans = []
+telemetry_lock = threading.Lock()
+# Snapshot statuses after which a snapshot will not become available
+snapshot_failed_statuses = ['deleted', 'deleting', 'failed', 'incompatible-restore', 'incompatible-parameters']
+
 # Record the total start time
 total_start_time = time.time()
 
-def migrate_rds_instance(db_instance):
-    try:
-        db_instance_identifier = db_instance['DBInstanceIdentifier']
-
-        if db_instance_identifier in exclude_list:
-            print(f"Skipping excluded RDS instance: {db_instance_identifier}")
-            return
-
-        instance_start_time = time.time()
-
-        db_instance_class = db_instance['DBInstanceClass']
-        storage_type = db_instance.get('StorageType', 'Not specified')
-        engine = db_instance['Engine']
-        allocated_storage = db_instance['AllocatedStorage']
-
-        print(f"Processing RDS Instance: {db_instance_identifier}")
-        print(f" - Instance Class: {db_instance_class}")
-        print(f" - Storage Type: {storage_type}")
-        print(f" - Engine: {engine}")
-        print(f" - Allocated Storage: {allocated_storage} GiB")
-
-        snapshot_identifier = f"{db_instance_identifier}-snapshot-{int(time.time())}"
-        target_db_instance_identifier = f"{db_instance_identifier}-migrated"
-
-        print(f"\nCreating snapshot for RDS instance: {db_instance_identifier}")
-        snapshot_start_time = time.time()
-
-        response_snapshot = rds_client_source.create_db_snapshot(
-            DBSnapshotIdentifier=snapshot_identifier,
-            DBInstanceIdentifier=db_instance_identifier
-        )
-
-        print("Waiting for snapshot to be available...")
-        snapshot_waiter = rds_client_source.get_waiter('db_snapshot_available')
-        snapshot_waiter.wait(
-            DBSnapshotIdentifier=snapshot_identifier
-        )
-
-        snapshot_end_time = time.time()
-        snapshot_duration = snapshot_end_time - snapshot_start_time
-        print(f"Snapshot {snapshot_identifier} is now available for {db_instance_identifier}. Time taken: {snapshot_duration:.2f} seconds.")
 
-        print(f"Copying snapshot to the target region: {target_region}")
+def write_telemetry(record):
+    """Append one record to the telemetry timeline."""
+    if not telemetry_file:
+        return
+    with telemetry_lock:
+        with open(telemetry_file, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def timestamp(at):
+    return datetime.fromtimestamp(at, timezone.utc).isoformat()
+
+
+def record_span(resource, region, stage, start_time, end_time, size_gib, status='ok', throughput=False, **fields):
+    """Record one stage of one DB instance. GiB/s is derived for stages that move the instance's data."""
+    duration = end_time - start_time
+    record = {'type': 'span', 'resource': resource, 'region': region, 'stage': stage,
+              'start': timestamp(start_time), 'end': timestamp(end_time), 'duration_s': round(duration, 3),
+              'size_gib': size_gib, 'status': status, **fields}
+    if throughput and size_gib and duration > 0:
+        record['gib_per_s'] = round(size_gib / duration, 4)
+    with telemetry_lock:
+        telemetry_spans.append((record, start_time, end_time, throughput))
+    write_telemetry(record)
+
+
+def record_event(resource, region, event, **fields):
+    """Record a point-in-time event, e.g. snapshot progress."""
+    write_telemetry({'type': 'event', 'time': timestamp(time.time()), 'resource': resource, 'region': region,
+                     'event': event, **fields})
+
+
+def wait_for_snapshot(rds_client, region, snapshot_identifier, delay=30, max_attempts=60):
+    """Wait for a snapshot to become available, recording status and PercentProgress changes in the timeline.
+    Returns False if the snapshot failed or is not available after max_attempts."""
+    last_seen = None
+    for attempt in range(max_attempts):
+        snapshot = rds_client.describe_db_snapshots(DBSnapshotIdentifier=snapshot_identifier)['DBSnapshots'][0]
+        seen = (snapshot['Status'], snapshot.get('PercentProgress'))
+        if seen != last_seen:
+            record_event(snapshot_identifier, region, 'progress', status=seen[0], progress_pct=seen[1])
+            last_seen = seen
+        if snapshot['Status'] == 'available':
+            return True
+        if snapshot['Status'] in snapshot_failed_statuses:
+            print(f"Snapshot {snapshot_identifier} in {region} is {snapshot['Status']}.")
+            return False
+        time.sleep(delay)
+    print(f"Snapshot {snapshot_identifier} in {region} is not available after {delay * max_attempts} seconds.")
+    return False
+
+
+def print_telemetry_summary():
+    """Print and record per region and stage: instances, GiB, busy time and aggregate GiB/s over the makespan."""
+    groups = {}
+    for record, start_time, end_time, throughput in telemetry_spans:
+        groups.setdefault((record['region'], record['stage']), []).append((record, start_time, end_time, throughput))
+    print(f"{'region':<15} {'stage':<10} {'count':>5} {'size_gib':>9} {'busy_s':>9} {'makespan_s':>11} {'gib_per_s':>10}")
+    # Regions in order, and stages within a region in the order they started
+    for (region, stage), spans in sorted(groups.items(), key=lambda group: (group[0][0], min(s[1] for s in group[1]))):
+        size_gib = sum(record['size_gib'] or 0 for record, _, _, _ in spans)
+        busy = sum(end_time - start_time for _, start_time, end_time, _ in spans)
+        makespan = max(end_time for _, _, end_time, _ in spans) - min(start_time for _, start_time, _, _ in spans)
+        gib_per_s = size_gib / makespan if spans[0][3] and makespan > 0 else None
+        print(f"{region:<15} {stage:<10} {len(spans):>5} {size_gib:>9} {busy:>9.1f} {makespan:>11.1f} "
+              f"{f'{gib_per_s:.3f}' if gib_per_s is not None else '-':>10}")
+        write_telemetry({'type': 'summary', 'region': region, 'stage': stage, 'count': len(spans),
+                         'size_gib': size_gib, 'busy_s': round(busy, 3), 'makespan_s': round(makespan, 3),
+                         'gib_per_s': round(gib_per_s, 4) if gib_per_s is not None else None})
+
+
+def copy_snapshot_to_target(snapshot_identifier, db_instance_identifier, allocated_storage):
+    """Copy a snapshot to the target region once a copy slot is free; the slot is held until the copy completes."""
+    queued_time = time.time()
+    copied = False
+    with copy_slots:
         copy_start_time = time.time()
-
-        snapshot_details = rds_client_source.describe_db_snapshots(
-            DBSnapshotIdentifier=snapshot_identifier
-        )['DBSnapshots'][0]
-
-        encrypted = snapshot_details['Encrypted']
-
-        copy_params = {
-            'SourceDBSnapshotIdentifier': f"arn:aws:rds:{source_region}:{account_id}:snapshot:{snapshot_identifier}",
-            'TargetDBSnapshotIdentifier': snapshot_identifier,
-            'SourceRegion': source_region
-        }
-
-        if encrypted:
-            copy_params['KmsKeyId'] = kms_key_id
-            print(f"Snapshot is encrypted. Using KMS key: {kms_key_id}")
-
-        response_copy = rds_client_target.copy_db_snapshot(**copy_params)
-
-        print("Waiting for the snapshot to be available in the target region...")
-        copy_waiter = rds_client_target.get_waiter('db_snapshot_completed')
-
-        max_attempts = 60
-        delay = 30
-
+        print(f"Copying snapshot {snapshot_identifier} to the target region: {target_region} (waited {copy_start_time - queued_time:.2f} seconds for a copy slot)")
         try:
-            copy_waiter.wait(
-                DBSnapshotIdentifier=snapshot_identifier,
-                WaiterConfig={
-                    'Delay': delay,
-                    'MaxAttempts': max_attempts
-                }
-            )
-        except botocore.exceptions.WaiterError as e:
-            print(f"Error waiting for snapshot copy: {e}")
-            return
-
-        copy_end_time = time.time()
-        copy_duration = copy_end_time - copy_start_time
-        print(f"Snapshot {snapshot_identifier} copied successfully to {target_region} for {db_instance_identifier}. Time taken: {copy_duration:.2f} seconds.")
+            snapshot_details = rds_client_source.describe_db_snapshots(
+                DBSnapshotIdentifier=snapshot_identifier
+            )['DBSnapshots'][0]
 
-        print(f"Restoring DB instance from snapshot {snapshot_identifier} in {target_region}")
-        restore_start_time = time.time()
-
-        restore_params = {
-            'DBInstanceIdentifier': target_db_instance_identifier,
-            'DBSnapshotIdentifier': snapshot_identifier,
-            'DBInstanceClass': db_instance_class,
-            'DBSubnetGroupName': db_subnet_group_name,
-            'MultiAZ': multi_az,
-            'PubliclyAccessible': publicly_accessible
-        }
+            encrypted = snapshot_details['Encrypted']
 
-        if not multi_az:
-            restore_params['AvailabilityZone'] = availability_zone
+            copy_params = {
+                'SourceDBSnapshotIdentifier': f"arn:aws:rds:{source_region}:{account_id}:snapshot:{snapshot_identifier}",
+                'TargetDBSnapshotIdentifier': snapshot_identifier,
+                'SourceRegion': source_region
+            }
 
-        response_restore = rds_client_target.restore_db_instance_from_db_snapshot(**restore_params)
+            if encrypted:
+                copy_params['KmsKeyId'] = kms_key_id
+                print(f"Snapshot is encrypted. Using KMS key: {kms_key_id}")
 
-        print("Waiting for the new DB instance to be available...")
-        instance_waiter = rds_client_target.get_waiter('db_instance_available')
-        instance_waiter.wait(
-            DBInstanceIdentifier=target_db_instance_identifier
-        )
+            response_copy = rds_client_target.copy_db_snapshot(**copy_params)
 
-        restore_end_time = time.time()
-        restore_duration = restore_end_time - restore_start_time
-        print(f"DB instance {target_db_instance_identifier} is now available in {target_region}. Time taken: {restore_duration:.2f} seconds.")
+            print("Waiting for the snapshot to be available in the target region...")
 
-        instance_end_time = time.time()
-        instance_duration = instance_end_time - instance_start_time
-        print(f"Migration of {db_instance_identifier} completed. Total time taken: {instance_duration:.2f} seconds.\n")
+            max_attempts = 60
+            delay = 30
 
-    except Exception as e:
-        print(f"Error migrating instance {db_instance['DBInstanceIdentifier']}: {e}")
+            if not wait_for_snapshot(rds_client_target, target_region, snapshot_identifier, delay, max_attempts):
+                print(f"Error waiting for snapshot copy {snapshot_identifier}.")
+                return False
+            copied = True
+            return True
+        finally:
+            copy_end_time = time.time()
+            with copy_timings_lock:
+                copy_timings.append((snapshot_identifier, copy_start_time - queued_time, copy_end_time - copy_start_time))
+            record_span(db_instance_identifier, target_region, 'copy', copy_start_time, copy_end_time, allocated_storage,
+                        'ok' if copied else 'failed', throughput=True, queue_s=round(copy_start_time - queued_time, 3))
 
-def main():
-    response = rds_client_source.describe_db_instances()
-    db_instances = response['DBInstances']
 
-    if not db_instances:
-        print("No RDS instances found in the source region.")
+def print_copy_report():
+    """Print queue wait vs. transfer time of the snapshot copies."""
+    if not copy_timings:
         return
-
-    print(f"Found {len(db_instances)} RDS instances.")
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        executor.map(migrate_rds_instance, db_instances)
-
-    total_end_time = time.time()
-    total_duration = total_end_time - total_start_time
-    print(f"All RDS instances have been processed for migration. Total time taken: {total_duration:.2f} seconds.")
-
-if __name__ == '__main__':
-    main()
-
-(venv) ubuntu@ip-10-1-160-199:~/migration/migration-Frankfurt-Ireland$ ls
-03-09-2024  04-09-2024  15-08-2024  aws  aws-tools  db_mapping_core.txt  db_mapping_pay.txt  db_mapping_pp.txt  db_mapping_pro.txt  db_mapping_saas.txt  process_pgrestore.py  process_psql.py  rds-migrate-v2.py  rds-migrate-v3.py  venv
-(venv) ubuntu@ip-10-1-160-199:~/migration/migration-Frankfurt-Ireland$ nano ./rds-migrate-v3.py
-(venv) ubuntu@ip-10-1-160-199:~/migration/migration-Frankfurt-Ireland$ cat ./rds-migrate-v3.py
-import boto3
-import time
-import concurrent.futures
-import botocore.exceptions
-
-# Configuration
-source_region = 'eu-central-1'  # Source region
-target_region = 'eu-west-1'  # Target region
-availability_zone = f'{target_region}a'  # Availability zone in the target region
-multi_az = False  # Set to True for Multi-AZ deployment
-publicly_accessible = False  # Set to False if the instance should not be publicly accessible
-# Security group ID to be applied to the restored DB instance
-security_group_ids = ['sg-0fea3798bf54e9fe6']
-
-# Specify your KMS key ID in the target region (required for encrypted snapshots)
-kms_key_id = '18d3258d-89df-4690-82a1-f2da9ba78ccb'  # Ireland
-db_subnet_group_name = 'multiregion-dev-vpc-blue'  # Your specific DB subnet group name
-
-# Create a client for the source region
-rds_client_source = boto3.client('rds', region_name=source_region)
-
-# Create a client for the target region
-
-rds_client_target = boto3.client('rds', region_name=target_region)
-
-# Get the account ID for ARN generation
-account_id = boto3.client('sts').get_caller_identity().get('Account')
-
-# Define an exclude list for instance identifiers
-exclude_list = ['1athena-dev-banking', '1athena-dev-dwh', '1athena-dev-trading-processor', '1athena-devrds', '1athena-trading-processor', '1athena-vaultdev', '1athena-banking']  # Add your specific instance IDs to exclude
-
-# Record the total start time
-total_start_time = time.time()
+    queue_waits = [wait for _, wait, _ in copy_timings]
+    transfers = [transfer for _, _, transfer in copy_timings]
+    print(f"Snapshot copies: {len(copy_timings)} (max {max_concurrent_copies} in flight)")
+    print(f" - Queue wait: avg {sum(queue_waits) / len(queue_waits):.2f} s, max {max(queue_waits):.2f} s")
+    print(f" - Transfer: avg {sum(transfers) / len(transfers):.2f} s, max {max(transfers):.2f} s")
+    for snapshot_identifier, wait, transfer in sorted(copy_timings):
+        print(f"   {snapshot_identifier}: queue wait {wait:.2f} s, transfer {transfer:.2f} s")
 
 def migrate_rds_instance(db_instance):
     try:
@@ -239,56 +209,21 @@ def migrate_rds_instance(db_instance):
         )
 
         print("Waiting for snapshot to be available...")
-        snapshot_waiter = rds_client_source.get_waiter('db_snapshot_available')
-        snapshot_waiter.wait(
-            DBSnapshotIdentifier=snapshot_identifier
-        )
+        snapshot_available = wait_for_snapshot(rds_client_source, source_region, snapshot_identifier)
 
         snapshot_end_time = time.time()
+        record_span(db_instance_identifier, source_region, 'snapshot', snapshot_start_time, snapshot_end_time,
+                    allocated_storage, 'ok' if snapshot_available else 'failed', throughput=True)
+        if not snapshot_available:
+            return
         snapshot_duration = snapshot_end_time - snapshot_start_time
         print(f"Snapshot {snapshot_identifier} is now available for {db_instance_identifier}. Time taken: {snapshot_duration:.2f} seconds.")
 
-        print(f"Copying snapshot to the target region: {target_region}")
-        copy_start_time = time.time()
-
-        snapshot_details = rds_client_source.describe_db_snapshots(
-            DBSnapshotIdentifier=snapshot_identifier
-        )['DBSnapshots'][0]
-
-        encrypted = snapshot_details['Encrypted']
-
-        copy_params = {
-            'SourceDBSnapshotIdentifier': f"arn:aws:rds:{source_region}:{account_id}:snapshot:{snapshot_identifier}",
-            'TargetDBSnapshotIdentifier': snapshot_identifier,
-            'SourceRegion': source_region
-        }
-
-        if encrypted:
-            copy_params['KmsKeyId'] = kms_key_id
-            print(f"Snapshot is encrypted. Using KMS key: {kms_key_id}")
-
-        response_copy = rds_client_target.copy_db_snapshot(**copy_params)
-
-        print("Waiting for the snapshot to be available in the target region...")
-        copy_waiter = rds_client_target.get_waiter('db_snapshot_completed')
-
-        max_attempts = 60
-        delay = 30
-
-        try:
-            copy_waiter.wait(
-                DBSnapshotIdentifier=snapshot_identifier,
-                WaiterConfig={
-                    'Delay': delay,
-                    'MaxAttempts': max_attempts
-                }
-            )
-        except botocore.exceptions.WaiterError as e:
-            print(f"Error waiting for snapshot copy: {e}")
+        if not copy_snapshot_to_target(snapshot_identifier, db_instance_identifier, allocated_storage):
             return
 
         copy_end_time = time.time()
-        copy_duration = copy_end_time - copy_start_time
+        copy_duration = copy_end_time - snapshot_end_time
         print(f"Snapshot {snapshot_identifier} copied successfully to {target_region} for {db_instance_identifier}. Time taken: {copy_duration:.2f} seconds.")
 
         print(f"Restoring DB instance from snapshot {snapshot_identifier} in {target_region}")
@@ -316,15 +251,19 @@ def migrate_rds_instance(db_instance):
         )
 
         restore_end_time = time.time()
+        record_span(db_instance_identifier, target_region, 'restore', restore_start_time, restore_end_time, allocated_storage)
         restore_duration = restore_end_time - restore_start_time
         print(f"DB instance {target_db_instance_identifier} is now available in {target_region}. Time taken: {restore_duration:.2f} seconds.")
 
         instance_end_time = time.time()
+        record_span(db_instance_identifier, target_region, 'migration', instance_start_time, instance_end_time,
+                    allocated_storage)
         instance_duration = instance_end_time - instance_start_time
         print(f"Migration of {db_instance_identifier} completed. Total time taken: {instance_duration:.2f} seconds.\n")
 
     except Exception as e:
         print(f"Error migrating instance {db_instance['DBInstanceIdentifier']}: {e}")
+        record_event(db_instance['DBInstanceIdentifier'], None, 'error', message=str(e))
 
 def main():
     response = rds_client_source.describe_db_instances()
@@ -336,12 +275,15 @@ def main():
 
     print(f"Found {len(db_instances)} RDS instances.")
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
+    # One thread per instance so snapshots start at once; cross-region copies are limited by copy_slots
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(db_instances)) as executor:
         executor.map(migrate_rds_instance, db_instances)
 
     total_end_time = time.time()
     total_duration = total_end_time - total_start_time
     print(f"All RDS instances have been processed for migration. Total time taken: {total_duration:.2f} seconds.")
+    print_copy_report()
+    print_telemetry_summary()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
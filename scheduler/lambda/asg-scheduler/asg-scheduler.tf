@@ -46,6 +46,10 @@ resource "aws_lambda_function" "asg_scheduler_lambda" {
       REGION        = "eu-west-1"
       CLUSTER_NAME  = "dev-1-30"
       SSM_PARAMETER = "/asg/disable-instances"
+      # terminate - масштабування до 0, warm-pool - паркування інстансів у warm pool
+      SCALE_DOWN_MODE     = "terminate"
+      WARM_POOL_STATE     = "Stopped"
+      REPORT_WINDOW_HOURS = "3"
       EXCLUDED_NODEGROUPS = jsonencode([
 #        "eks-dev-asg-spots-tst-20241008082545144500000009-e8c9359d-fc92-8a5e-70c9-d028418a0a90",
         "eks-dev-common-spots-gp3-20241003185735319400000001-90c929df-51d2-ffd0-1959-c49b616ed998",
@@ -137,4 +141,38 @@ resource "aws_lambda_permission" "allow_cloudwatch_disable" {
   function_name = aws_lambda_function.asg_scheduler_lambda.function_name
   principal     = "events.amazonaws.com"
   source_arn    = aws_cloudwatch_event_rule.lambda_schedule_disable.arn
-}
\ No newline at end of file
+}
+
+
+# CloudWatch Event Rule для ACTION=report (час до InService після ранкового включення)
+resource "aws_cloudwatch_event_rule" "lambda_schedule_report" {
+  provider            = aws.Blue
+  name                = "asg_scheduler-report-schedule"
+  description         = "Trigger Lambda function to report time-to-InService daily at 6:30 UTC"
+  schedule_expression = "cron(30 6 * * ? *)"
+  state               = "ENABLED"
+}
+
+
+# CloudWatch Event Target для ACTION=report
+resource "aws_cloudwatch_event_target" "trigger_lambda_report" {
+  provider  = aws.Blue
+  rule      = aws_cloudwatch_event_rule.lambda_schedule_report.name
+  target_id = "asg_scheduler-report"
+  arn       = aws_lambda_function.asg_scheduler_lambda.arn
+
+  input = jsonencode({
+    ACTION = "report"
+  })
+}
+
+
+# Permission for CloudWatch to Invoke the Lambda Function
+resource "aws_lambda_permission" "allow_cloudwatch_report" {
+  provider      = aws.Blue
+  statement_id  = "AllowExecutionFromCloudWatchReport"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.asg_scheduler_lambda.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lambda_schedule_report.arn
+}
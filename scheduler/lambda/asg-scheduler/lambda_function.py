@@ -1,9 +1,101 @@
 import boto3
 import json
 import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from botocore.exceptions import ClientError
 
 
+# Запас часу (мс) до таймауту, при якому решта роботи передається новому виклику
+TIME_RESERVE_MS = int(os.environ.get('TIME_RESERVE_MS', 10000))
+# Обмеження ланцюжка самовикликів, щоб уникнути нескінченного циклу
+MAX_CONTINUATIONS = int(os.environ.get('MAX_CONTINUATIONS', 50))
+CURSOR_PARAMETER = '/asg/scheduler/cursor'
+# Режим вимкнення: terminate - масштабування до 0 із завершенням інстансів,
+# warm-pool - інстанси паркуються у warm pool ASG (Stopped або Hibernated)
+SCALE_DOWN_MODE = os.environ.get('SCALE_DOWN_MODE', 'terminate')
+WARM_POOL_STATE = os.environ.get('WARM_POOL_STATE', 'Stopped')
+# За який період (год) аналізуються scaling activities для звіту про час до InService
+REPORT_WINDOW_HOURS = int(os.environ.get('REPORT_WINDOW_HOURS', 3))
+
+
+# Метрики виклику в CloudWatch Embedded Metric Format: CloudWatch Logs сам перетворює рядок лога
+# на метрики без виклику PutMetricData. Простір імен і виміри ті самі, що й у resource-scheduler
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ResourceScheduler')
+RESOURCE_TYPE = 'asg'
+METRIC_UNITS = {
+    'Duration': 'Milliseconds',
+    'ResourcesProcessed': 'Count',
+    'ApiCalls': 'Count',
+    'Throttles': 'Count',
+    'ApiFailures': 'Count',
+}
+THROTTLE_ERROR_CODES = (
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'RequestLimitExceeded', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'SlowDown',
+)
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def add_metric(name, value=1):
+    with _metrics_lock:
+        _metrics[name] = _metrics.get(name, 0) + value
+
+
+# Обробники подій botocore: рахують виклики API, тротлінг і помилки без додаткових запитів
+def _count_api_call(**kwargs):
+    add_metric('ApiCalls')
+
+
+def _count_throttle(response=None, **kwargs):
+    # Викликається для кожної спроби, зокрема повторних після тротлінгу
+    if response is not None and response[1].get('Error', {}).get('Code') in THROTTLE_ERROR_CODES:
+        add_metric('Throttles')
+
+
+def _count_api_failure(http_response=None, **kwargs):
+    if http_response is None or http_response.status_code >= 400:
+        add_metric('ApiFailures')
+
+
+# Лічильники підключаються до сесії за замовчуванням, тож діють для всіх клієнтів boto3.client
+def instrument_default_session():
+    boto3.setup_default_session()
+    events = boto3.DEFAULT_SESSION.events
+    events.register('before-call', _count_api_call)
+    events.register('needs-retry', _count_throttle)
+    events.register('after-call', _count_api_failure)
+    events.register('after-call-error', _count_api_failure)
+
+
+# Вивід метрик виклику одним рядком EMF. Лічильники скидаються, щоб теплий контейнер не змішував виклики
+def emit_metrics(region, action, duration_ms):
+    with _metrics_lock:
+        values = {name: _metrics.get(name, 0) for name in METRIC_UNITS if name != 'Duration'}
+        _metrics.clear()
+    values['Duration'] = duration_ms
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['ResourceType', 'Region', 'Action']],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, unit in METRIC_UNITS.items()],
+            }],
+        },
+        'ResourceType': RESOURCE_TYPE,
+        'Region': region,
+        'Action': action,
+        **values,
+    }))
+
+
+instrument_default_session()
+
+
 # Ініціалізація клієнтів для Auto Scaling і SSM
 def init_clients(region):
     asg_client = boto3.client('autoscaling', region_name=region)
@@ -13,10 +105,46 @@ def init_clients(region):
 
 # Отримання активних ASG, виключаючи ті, що в списку виключень
 def get_active_asgs(asg_client, excluded_asgs):
-    response = asg_client.describe_auto_scaling_groups()
-    all_asgs = response['AutoScalingGroups']
-    active_asgs = [asg['AutoScalingGroupName'] for asg in all_asgs if asg['AutoScalingGroupName'] not in excluded_asgs]
-    return active_asgs
+    paginator = asg_client.get_paginator('describe_auto_scaling_groups')
+    active_asgs = []
+    for page in paginator.paginate():
+        active_asgs.extend(asg['AutoScalingGroupName'] for asg in page['AutoScalingGroups']
+                           if asg['AutoScalingGroupName'] not in excluded_asgs)
+    # Сортування дає стабільний порядок, за яким курсор відновлює обробку
+    return sorted(active_asgs)
+
+
+# Чи залишилось часу менше, ніж потрібно для безпечного завершення
+def out_of_time(context):
+    return context is not None and context.get_remaining_time_in_millis() < TIME_RESERVE_MS
+
+
+# Збереження курсора (перша необроблена ASG) в SSM
+def save_cursor_to_ssm(ssm_client, action, next_asg, continuation):
+    cursor = {
+        'action': action,
+        'next': next_asg,
+        'continuation': continuation,
+        'status': 'in_progress' if next_asg else 'completed'
+    }
+    ssm_client.put_parameter(
+        Name=CURSOR_PARAMETER,
+        Value=json.dumps(cursor),
+        Type='String',
+        Overwrite=True
+    )
+
+
+# Асинхронний самовиклик Lambda з курсором необроблених ASG
+def continue_in_new_invocation(context, event, next_asg, continuation):
+    payload = dict(event, CURSOR=next_asg, CONTINUATION=continuation)
+    lambda_client = boto3.client('lambda')
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(payload)
+    )
+    print(f'Time is running out. Continuing from ASG {next_asg} in invocation #{continuation}.')
 
 
 # Збереження конфігурації ASG в SSM
@@ -34,11 +162,28 @@ def save_asg_config_to_ssm(asg_client, ssm_client, asg_name):
     print(f'Scaling config for {asg_name} saved to SSM.')
 
 
+# Warm pool для паркування інстансів: при scale-in вони зупиняються і повертаються в пул
+# (ReuseOnScaleIn) замість завершення. MaxGroupPreparedCapacity = поточна DesiredCapacity,
+# щоб вночі в пулі було рівно стільки інстансів, скільки працювало, а вдень - жодного
+def put_warm_pool(asg_client, asg_name, desired_capacity):
+    asg_client.put_warm_pool(
+        AutoScalingGroupName=asg_name,
+        MaxGroupPreparedCapacity=desired_capacity,
+        MinSize=0,
+        PoolState=WARM_POOL_STATE,
+        InstanceReusePolicy={'ReuseOnScaleIn': True}
+    )
+    print(f'Warm pool ({WARM_POOL_STATE}) for {asg_name} set to {desired_capacity} instances.')
+
+
 # Вимкнення ASG (масштабування вниз)
 def scale_down_asg(asg_client, asg_name):
     response = asg_client.describe_auto_scaling_groups(AutoScalingGroupNames=[asg_name])
     original_scaling_config = response['AutoScalingGroups'][0]
 
+    if SCALE_DOWN_MODE == 'warm-pool' and original_scaling_config['DesiredCapacity'] > 0:
+        put_warm_pool(asg_client, asg_name, original_scaling_config['DesiredCapacity'])
+
     new_scaling_config = {
         'MinSize': 0,
         'MaxSize': original_scaling_config['MaxSize'],  # Залишаємо maxSize без змін
@@ -51,7 +196,8 @@ def scale_down_asg(asg_client, asg_name):
         MaxSize=new_scaling_config['MaxSize'],
         DesiredCapacity=new_scaling_config['DesiredCapacity']
     )
-    print(f'ASG {asg_name} scaled down to 0 instances.')
+    print(f'ASG {asg_name} scaled down to 0 instances ({SCALE_DOWN_MODE} mode).')
+    add_metric('ResourcesProcessed')
 
 
 # Включення ASG з параметрами з SSM
@@ -71,30 +217,108 @@ def scale_up_asg(asg_client, ssm_client, asg_name):
         MaxSize=max_size,
         DesiredCapacity=desired_capacity
     )
+    # У режимі warm-pool ASG спершу бере зупинені інстанси з пулу, тож окремих дій не потрібно
     print(f'ASG {asg_name} scaled up with saved parameters.')
+    add_metric('ResourcesProcessed')
 
 
-def lambda_handler(event, context):
+# Час до InService за scaling activities: запуск з warm pool чи нового інстансу.
+# Тривалість activity (StartTime -> EndTime) включає bootstrap і lifecycle hooks
+def time_to_in_service(asg_client, asg_name, since):
+    paginator = asg_client.get_paginator('describe_scaling_activities')
+    durations = {'warm-pool': [], 'terminate': []}
+    for page in paginator.paginate(AutoScalingGroupName=asg_name):
+        for activity in page['Activities']:
+            if activity['StartTime'] < since:
+                return durations
+            if activity['StatusCode'] != 'Successful' or 'EndTime' not in activity:
+                continue
+            description = activity['Description']
+            if description.startswith('Launching a new EC2 instance from warm pool'):
+                mode = 'warm-pool'
+            elif description.startswith('Launching a new EC2 instance'):
+                mode = 'terminate'
+            else:
+                continue
+            durations[mode].append((activity['EndTime'] - activity['StartTime']).total_seconds())
+    return durations
+
+
+# Звіт про час до InService по ASG і по режимах за останні REPORT_WINDOW_HOURS
+def report_time_to_in_service(asg_client, asgs):
+    since = datetime.now(timezone.utc) - timedelta(hours=REPORT_WINDOW_HOURS)
+    by_asg = {}
+    by_mode = {'warm-pool': [], 'terminate': []}
+    for asg in asgs:
+        durations = time_to_in_service(asg_client, asg, since)
+        for mode, samples in durations.items():
+            if samples:
+                by_asg.setdefault(asg, {})[mode] = max(samples)
+                by_mode[mode].extend(samples)
+
+    report = {
+        'asgs': by_asg,
+        'modes': {
+            mode: {
+                'instances': len(samples),
+                'avg_s': round(sum(samples) / len(samples), 1),
+                'max_s': max(samples),
+            }
+            for mode, samples in by_mode.items() if samples
+        },
+    }
+    print(json.dumps({'time_to_in_service_report': report}))
+    return report
+
+
+def handle_event(event, context):
     excluded_asgs = event.get('EXCLUDED_ASGS', os.environ.get('EXCLUDED_ASGS', []))
     action = event.get('ACTION', os.environ.get('ACTION', 'enable'))
     region = event.get('REGION', os.environ.get('REGION', 'eu-central-1'))
 
+    cursor = event.get('CURSOR')
+    continuation = event.get('CONTINUATION', 0)
+
+    if action not in ('disable', 'enable', 'report'):
+        print(f'Invalid action: {action}')
+        return
+
     asg_client, ssm_client = init_clients(region)
 
-    if action == 'disable':
-        asgs = get_active_asgs(asg_client, excluded_asgs)
-        for asg in asgs:
-            try:
+    asgs = get_active_asgs(asg_client, excluded_asgs)
+    if action == 'report':
+        return report_time_to_in_service(asg_client, asgs)
+
+    if cursor:
+        asgs = [asg for asg in asgs if asg >= cursor]
+        print(f'Resuming {action} from ASG {cursor} (invocation #{continuation}), {len(asgs)} ASGs left.')
+
+    for asg in asgs:
+        if out_of_time(context):
+            save_cursor_to_ssm(ssm_client, action, asg, continuation + 1)
+            if continuation < MAX_CONTINUATIONS:
+                continue_in_new_invocation(context, event, asg, continuation + 1)
+            else:
+                print(f'Reached {MAX_CONTINUATIONS} continuations. Stopped at ASG {asg}, cursor saved to SSM.')
+            return
+        try:
+            if action == 'disable':
                 save_asg_config_to_ssm(asg_client, ssm_client, asg)
                 scale_down_asg(asg_client, asg)
-            except ClientError as e:
-                print(f'Error processing ASG {asg}: {e}')
-    elif action == 'enable':
-        asgs = get_active_asgs(asg_client, excluded_asgs)
-        for asg in asgs:
-            try:
+            else:
                 scale_up_asg(asg_client, ssm_client, asg)
-            except ClientError as e:
-                print(f'Error processing ASG {asg}: {e}')
-    else:
-        print(f'Invalid action: {action}')
+        except ClientError as e:
+            print(f'Error processing ASG {asg}: {e}')
+
+    save_cursor_to_ssm(ssm_client, action, None, continuation)
+
+
+# Виклик Lambda з метриками EMF незалежно від того, як завершилась обробка
+def lambda_handler(event, context):
+    started = time.perf_counter()
+    try:
+        return handle_event(event, context)
+    finally:
+        action = event.get('ACTION', os.environ.get('ACTION', 'enable'))
+        region = event.get('REGION', os.environ.get('REGION', 'eu-central-1'))
+        emit_metrics(region, action, round((time.perf_counter() - started) * 1000, 2))
@@ -45,6 +45,10 @@ resource "aws_lambda_function" "ec2_scheduler_lambda" {
       ACTION        = "enable"
       REGION        = "eu-central-1"
       SSM_PARAMETER = "/ec2/developers-disable-instances"
+      # Гібернація інстансів з HibernationOptions.Configured, решта зупиняються звичайно
+      HIBERNATE     = "false"
+      CHUNK_SIZE    = "100"
+      MAX_WORKERS   = "8"
       INSTANCES = jsonencode([
         "i-0f655bd83bd781b09",
         "i-0b51e80a3aed8b2f3",
@@ -2,6 +2,88 @@ import boto3
 from botocore.exceptions import ClientError
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Гібернація замість звичайної зупинки для інстансів, що її підтримують
+HIBERNATE = os.environ.get('HIBERNATE', 'false').lower() == 'true'
+# Запас часу (мс) до таймауту Lambda, при якому вимірювання часу відновлення припиняється
+TIME_RESERVE_MS = int(os.environ.get('TIME_RESERVE_MS', 5000))
+# Код StateReason інстансу, зупиненого гібернацією
+HIBERNATE_STATE_REASON = 'Client.UserInitiatedHibernate'
+# Кількість інстансів в одному виклику stop_instances/start_instances
+CHUNK_SIZE = int(os.environ.get('CHUNK_SIZE', 100))
+# Кількість частин, що обробляються паралельно
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', 8))
+
+# Метрики виклику в CloudWatch Embedded Metric Format: CloudWatch Logs сам перетворює рядок лога
+# на метрики без виклику PutMetricData. Простір імен і виміри ті самі, що й у resource-scheduler
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ResourceScheduler')
+RESOURCE_TYPE = 'ec2'
+METRIC_UNITS = {
+    'Duration': 'Milliseconds',
+    'ResourcesProcessed': 'Count',
+    'ApiCalls': 'Count',
+    'Throttles': 'Count',
+    'ApiFailures': 'Count',
+}
+THROTTLE_ERROR_CODES = (
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'RequestLimitExceeded', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'SlowDown',
+)
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+def add_metric(name, value=1):
+    with _metrics_lock:
+        _metrics[name] = _metrics.get(name, 0) + value
+
+# Обробники подій botocore: рахують виклики API, тротлінг і помилки без додаткових запитів
+def _count_api_call(**kwargs):
+    add_metric('ApiCalls')
+
+def _count_throttle(response=None, **kwargs):
+    # Викликається для кожної спроби, зокрема повторних після тротлінгу
+    if response is not None and response[1].get('Error', {}).get('Code') in THROTTLE_ERROR_CODES:
+        add_metric('Throttles')
+
+def _count_api_failure(http_response=None, **kwargs):
+    if http_response is None or http_response.status_code >= 400:
+        add_metric('ApiFailures')
+
+# Лічильники підключаються до сесії за замовчуванням, тож діють для всіх клієнтів boto3.client
+def instrument_default_session():
+    boto3.setup_default_session()
+    events = boto3.DEFAULT_SESSION.events
+    events.register('before-call', _count_api_call)
+    events.register('needs-retry', _count_throttle)
+    events.register('after-call', _count_api_failure)
+    events.register('after-call-error', _count_api_failure)
+
+# Вивід метрик виклику одним рядком EMF. Лічильники скидаються, щоб теплий контейнер не змішував виклики
+def emit_metrics(region, action, duration_ms):
+    with _metrics_lock:
+        values = {name: _metrics.get(name, 0) for name in METRIC_UNITS if name != 'Duration'}
+        _metrics.clear()
+    values['Duration'] = duration_ms
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['ResourceType', 'Region', 'Action']],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, unit in METRIC_UNITS.items()],
+            }],
+        },
+        'ResourceType': RESOURCE_TYPE,
+        'Region': region,
+        'Action': action,
+        **values,
+    }))
+
+instrument_default_session()
 
 def init_clients(region):
     print("Region: " + region)
@@ -19,44 +101,161 @@ def parse_instances(input_instances):
     else:
         return []
 
+def get_tagged_instances(region, tag_key, tag_values):
+    # Пошук інстансів з тегом розкладу одним пагінованим запитом до Tagging API
+    tagging_client = boto3.client('resourcegroupstaggingapi', region_name=region)
+    tag_filter = {'Key': tag_key}
+    if tag_values:
+        tag_filter['Values'] = tag_values
+    instances = []
+    paginator = tagging_client.get_paginator('get_resources')
+    for page in paginator.paginate(TagFilters=[tag_filter], ResourceTypeFilters=['ec2:instance']):
+        # arn:aws:ec2:<region>:<account>:instance/i-0123456789abcdef0
+        instances.extend(m['ResourceARN'].split('/')[-1] for m in page['ResourceTagMappingList'])
+    return instances
+
 def get_active_instances(instance_ids, excluded_instances):
     instances_to_manage = [inst for inst in instance_ids if inst not in excluded_instances]
     return instances_to_manage
 
+def describe_instances(ec2_client, instances, states=None):
+    # Один пагінований describe на 200 інстансів; states фільтрує за станом на боці AWS
+    paginator = ec2_client.get_paginator('describe_instances')
+    described = []
+    for start in range(0, len(instances), 200):
+        filters = [{'Name': 'instance-id', 'Values': instances[start:start + 200]}]
+        if states:
+            filters.append({'Name': 'instance-state-name', 'Values': states})
+        for page in paginator.paginate(Filters=filters):
+            for reservation in page['Reservations']:
+                described.extend(reservation['Instances'])
+    return described
+
+def apply_with_bisect(operation, instances):
+    # Виклик для частини інстансів; при помилці частина ділиться навпіл,
+    # щоб один застарілий ID або інстанс у неправильному стані не блокував решту
+    try:
+        operation(instances)
+        return instances, []
+    except ClientError as e:
+        if len(instances) == 1:
+            print(f'Failed for instance {instances[0]}: {e}')
+            return [], instances
+    middle = len(instances) // 2
+    done_left, failed_left = apply_with_bisect(operation, instances[:middle])
+    done_right, failed_right = apply_with_bisect(operation, instances[middle:])
+    return done_left + done_right, failed_left + failed_right
+
+def apply_in_chunks(operation, instances):
+    # Частини по CHUNK_SIZE інстансів обробляються паралельно
+    chunks = [instances[start:start + CHUNK_SIZE] for start in range(0, len(instances), CHUNK_SIZE)]
+    done, failed = [], []
+    if not chunks:
+        return done, failed
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(chunks))) as executor:
+        for chunk_done, chunk_failed in executor.map(lambda chunk: apply_with_bisect(operation, chunk), chunks):
+            done.extend(chunk_done)
+            failed.extend(chunk_failed)
+    add_metric('ResourcesProcessed', len(done))
+    return done, failed
+
 def disable_instances(ec2_client, instances):
     if not instances:
         print('No instances to disable.')
         return
 
-    try:
-        ec2_client.stop_instances(InstanceIds=instances)
-        print(f'Stopped EC2 instances: {instances}')
-    except ClientError as e:
-        print(f'Failed to stop instances: {e}')
-        raise
+    # Лише інстанси, які зараз працюють; решта вже зупинені або в перехідному стані
+    running = describe_instances(ec2_client, instances, ['running'])
+    hibernate = [inst['InstanceId'] for inst in running
+                 if HIBERNATE and inst.get('HibernationOptions', {}).get('Configured')]
+    stop = [inst['InstanceId'] for inst in running if inst['InstanceId'] not in hibernate]
+    print(f'{len(running)} of {len(instances)} instances are running.')
+
+    hibernated, hibernate_failed = apply_in_chunks(
+        lambda ids: ec2_client.stop_instances(InstanceIds=ids, Hibernate=True), hibernate)
+    if hibernated:
+        print(f'Hibernated EC2 instances: {hibernated}')
+    # Інстанси, які не вдалося перевести в гібернацію, зупиняються звичайно
+    stopped, failed = apply_in_chunks(lambda ids: ec2_client.stop_instances(InstanceIds=ids), stop + hibernate_failed)
+    if stopped:
+        print(f'Stopped EC2 instances: {stopped}')
+    if failed:
+        print(f'Failed to stop instances: {failed}')
+
+def group_by_stop_mode(described):
+    # Як був зупинений інстанс: гібернацією чи звичайною зупинкою
+    groups = {'hibernated': [], 'stopped': []}
+    for inst in described:
+        hibernated = inst.get('StateReason', {}).get('Code') == HIBERNATE_STATE_REASON
+        groups['hibernated' if hibernated else 'stopped'].append(inst['InstanceId'])
+    return groups
 
-def enable_instances(ec2_client, instances):
+def report_resume_time(ec2_client, groups, started, context):
+    # Час до стану running для кожної групи, поки дозволяє залишок часу Lambda
+    pending = {inst: group for group, ids in groups.items() for inst in ids}
+    resumed = {group: {} for group in groups}
+    delay = 2
+    while pending:
+        for inst in describe_instances(ec2_client, list(pending), ['running']):
+            if inst['InstanceId'] in pending:
+                group = pending.pop(inst['InstanceId'])
+                resumed[group][inst['InstanceId']] = round(time.time() - started, 1)
+        if not pending:
+            break
+        if context is not None and context.get_remaining_time_in_millis() - delay * 1000 < TIME_RESERVE_MS:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, 10)
+
+    report = {
+        group: {
+            'instances': times,
+            'max_s': max(times.values()) if times else None,
+            'not_resumed': [inst for inst, g in pending.items() if g == group],
+        }
+        for group, times in resumed.items() if times or groups[group]
+    }
+    print(json.dumps({'resume_report': report}))
+    return report
+
+def enable_instances(ec2_client, instances, context=None):
     print("Instances to enable: " + str(instances))
     if not instances:
         print('No instances to enable.')
         return
 
-    try:
-        ec2_client.start_instances(InstanceIds=instances)
-        print(f'Started EC2 instances: {instances}')
-    except ClientError as e:
-        print(f'Failed to start instances: {e}')
-        raise
+    # Лише зупинені інстанси; той самий describe визначає, як вони були зупинені
+    stopped = describe_instances(ec2_client, instances, ['stopped'])
+    print(f'{len(stopped)} of {len(instances)} instances are stopped.')
+    groups = group_by_stop_mode(stopped)
 
-def lambda_handler(event, context):
+    started_at = time.time()
+    started, failed = apply_in_chunks(
+        lambda ids: ec2_client.start_instances(InstanceIds=ids), [inst['InstanceId'] for inst in stopped])
+    if started:
+        print(f'Started EC2 instances: {started}')
+    if failed:
+        print(f'Failed to start instances: {failed}')
+    started_ids = set(started)
+    groups = {group: [inst for inst in ids if inst in started_ids] for group, ids in groups.items()}
+    report_resume_time(ec2_client, groups, started_at, context)
+
+def handle_event(event, context):
     action = event.get('ACTION', os.environ.get('ACTION', 'enable'))
     region = event.get('REGION', os.environ.get('REGION', 'eu-central-1'))
     instances = event.get('INSTANCES', os.environ.get('INSTANCES', '[]'))
     excluded_instances = event.get('EXCLUDED_INSTANCES', os.environ.get('EXCLUDED_INSTANCES', '[]'))
+    schedule_tag_key = event.get('SCHEDULE_TAG_KEY', os.environ.get('SCHEDULE_TAG_KEY'))
+    schedule_tag_values = event.get('SCHEDULE_TAG_VALUES', os.environ.get('SCHEDULE_TAG_VALUES', '[]'))
 
     instances = parse_instances(instances)
     excluded_instances = parse_instances(excluded_instances)
 
+    if schedule_tag_key:
+        tagged_instances = get_tagged_instances(region, schedule_tag_key, parse_instances(schedule_tag_values))
+        print(f"Tagged instances ({schedule_tag_key}): {tagged_instances}")
+        instances = instances + [inst for inst in tagged_instances if inst not in instances]
+
     print(f"Parsed INSTANCES: {instances}")
     print(f"Parsed EXCLUDED_INSTANCES: {excluded_instances}")
 
@@ -68,6 +267,16 @@ def lambda_handler(event, context):
     if action == 'disable':
         disable_instances(ec2_client, instances_to_manage)
     elif action == 'enable':
-        enable_instances(ec2_client, instances_to_manage)
+        enable_instances(ec2_client, instances_to_manage, context)
     else:
         print(f'Invalid action: {action}')
+
+# Виклик Lambda з метриками EMF незалежно від того, як завершилась обробка
+def lambda_handler(event, context):
+    started = time.perf_counter()
+    try:
+        return handle_event(event, context)
+    finally:
+        action = event.get('ACTION', os.environ.get('ACTION', 'enable'))
+        region = event.get('REGION', os.environ.get('REGION', 'eu-central-1'))
+        emit_metrics(region, action, round((time.perf_counter() - started) * 1000, 2))
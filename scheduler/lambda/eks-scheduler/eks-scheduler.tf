@@ -45,6 +45,10 @@ resource "aws_lambda_function" "eks_scheduler_lambda" {
       ACTION        = "enable"
       REGION        = "eu-west-1"
       CLUSTER_NAME  = "dev-1-30"
+      # Регіони та кластери для обробки; ["*"] - усі кластери в регіонах
+      REGIONS       = jsonencode(["eu-west-1"])
+      CLUSTERS      = jsonencode(["dev-1-30"])
+      MAX_WORKERS   = "10"
       SSM_PARAMETER = "/eks/disable-instances"
       EXCLUDED_NODEGROUPS = jsonencode([
         "dev-ondemand-gp3-20240724153425537700000062t",
@@ -1,24 +1,200 @@
 import boto3
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 
-# Ініціалізація клієнтів для EKS та SSM
+# Запас часу (мс) до таймауту, при якому решта роботи передається новому виклику
+TIME_RESERVE_MS = int(os.environ.get('TIME_RESERVE_MS', 10000))
+# Обмеження ланцюжка самовикликів, щоб уникнути нескінченного циклу
+MAX_CONTINUATIONS = int(os.environ.get('MAX_CONTINUATIONS', 50))
+# Кількість Node Groups, що обробляються паралельно
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', 10))
+CURSOR_PARAMETER = '/eks/scheduler/cursor'
+UPDATE_POLL_INITIAL_DELAY_S = 2
+UPDATE_POLL_MAX_DELAY_S = 15
+
+# Метрики виклику в CloudWatch Embedded Metric Format: CloudWatch Logs сам перетворює рядок лога
+# на метрики без виклику PutMetricData. Простір імен і виміри ті самі, що й у resource-scheduler
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ResourceScheduler')
+RESOURCE_TYPE = 'eks'
+METRIC_UNITS = {
+    'Duration': 'Milliseconds',
+    'ResourcesProcessed': 'Count',
+    'ApiCalls': 'Count',
+    'Throttles': 'Count',
+    'ApiFailures': 'Count',
+}
+THROTTLE_ERROR_CODES = (
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'RequestLimitExceeded', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'SlowDown',
+)
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def add_metric(name, value=1):
+    with _metrics_lock:
+        _metrics[name] = _metrics.get(name, 0) + value
+
+
+# Обробники подій botocore: рахують виклики API, тротлінг і помилки без додаткових запитів
+def _count_api_call(**kwargs):
+    add_metric('ApiCalls')
+
+
+def _count_throttle(response=None, **kwargs):
+    # Викликається для кожної спроби, зокрема повторних після тротлінгу
+    if response is not None and response[1].get('Error', {}).get('Code') in THROTTLE_ERROR_CODES:
+        add_metric('Throttles')
+
+
+def _count_api_failure(http_response=None, **kwargs):
+    if http_response is None or http_response.status_code >= 400:
+        add_metric('ApiFailures')
+
+
+# Лічильники підключаються до сесії за замовчуванням, тож діють для всіх клієнтів boto3.client
+def instrument_default_session():
+    boto3.setup_default_session()
+    events = boto3.DEFAULT_SESSION.events
+    events.register('before-call', _count_api_call)
+    events.register('needs-retry', _count_throttle)
+    events.register('after-call', _count_api_failure)
+    events.register('after-call-error', _count_api_failure)
+
+
+# Вивід метрик виклику одним рядком EMF. Лічильники скидаються, щоб теплий контейнер не змішував виклики
+def emit_metrics(region, action, duration_ms):
+    with _metrics_lock:
+        values = {name: _metrics.get(name, 0) for name in METRIC_UNITS if name != 'Duration'}
+        _metrics.clear()
+    values['Duration'] = duration_ms
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['ResourceType', 'Region', 'Action']],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, unit in METRIC_UNITS.items()],
+            }],
+        },
+        'ResourceType': RESOURCE_TYPE,
+        'Region': region,
+        'Action': action,
+        **values,
+    }))
+
+
+instrument_default_session()
+
+
+CLIENT_CONFIG = Config(retries={'max_attempts': 10, 'mode': 'adaptive'}, max_pool_connections=MAX_WORKERS * 2)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+# Клієнти EKS та SSM для регіону, спільні для всіх потоків (клієнти boto3 потокобезпечні)
 def init_clients(region):
-    eks_client = boto3.client('eks', region_name=region)
-    ssm_client = boto3.client('ssm', region_name=region)
-    return eks_client, ssm_client
+    with _clients_lock:
+        if region not in _clients:
+            _clients[region] = (
+                boto3.client('eks', region_name=region, config=CLIENT_CONFIG),
+                boto3.client('ssm', region_name=region, config=CLIENT_CONFIG)
+            )
+        return _clients[region]
+
+
+# Розбір списку зі змінної середовища (JSON або через кому)
+def parse_list(value):
+    if isinstance(value, list):
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, json.JSONDecodeError):
+        return [item.strip() for item in str(value).split(',') if item.strip()]
+
+
+# Кластери в регіонах (пагінований list_clusters). '*' у списку кластерів означає всі кластери
+def discover_clusters(regions, cluster_names):
+    clusters = []
+    for region in regions:
+        eks_client, _ = init_clients(region)
+        paginator = eks_client.get_paginator('list_clusters')
+        for page in paginator.paginate():
+            clusters.extend((region, cluster) for cluster in page['clusters']
+                            if '*' in cluster_names or cluster in cluster_names)
+    return clusters
+
+
+# Усі Node Groups знайдених кластерів як (регіон, кластер, Node Group), кластери опитуються паралельно
+def get_work_items(clusters, excluded_nodegroups):
+    def list_cluster(region_cluster):
+        region, cluster = region_cluster
+        eks_client, _ = init_clients(region)
+        return [(region, cluster, ng) for ng in get_active_nodegroups(eks_client, cluster, excluded_nodegroups)]
+
+    if not clusters:
+        return []
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(clusters))) as executor:
+        items = [item for cluster_items in executor.map(list_cluster, clusters) for item in cluster_items]
+    # Сортування за ключем курсора: відновлення порівнює саме ці рядки (порядок кортежів інший, коли
+    # назва одного кластера є префіксом іншої, напр. dev і dev-2)
+    return sorted(items, key=item_key)
+
+
+# Ключ курсора для елемента роботи
+def item_key(item):
+    return '/'.join(item)
 
 
 # Отримання активних Node Groups, виключаючи ті, що в списку виключень
 def get_active_nodegroups(eks_client, cluster_name, excluded_nodegroups):
-    response = eks_client.list_nodegroups(clusterName=cluster_name)
-    nodegroups = response['nodegroups']
-    active_nodegroups = [ng for ng in nodegroups if ng not in excluded_nodegroups]
+    paginator = eks_client.get_paginator('list_nodegroups')
+    active_nodegroups = []
+    for page in paginator.paginate(clusterName=cluster_name):
+        active_nodegroups.extend(ng for ng in page['nodegroups'] if ng not in excluded_nodegroups)
     return active_nodegroups
 
 
+# Чи залишилось часу менше, ніж потрібно для безпечного завершення
+def out_of_time(context):
+    return context is not None and context.get_remaining_time_in_millis() < TIME_RESERVE_MS
+
+
+# Збереження курсора (перша необроблена Node Group як регіон/кластер/Node Group) в SSM
+def save_cursor_to_ssm(ssm_client, action, next_nodegroup, continuation):
+    cursor = {
+        'action': action,
+        'next': next_nodegroup,
+        'continuation': continuation,
+        'status': 'in_progress' if next_nodegroup else 'completed'
+    }
+    ssm_client.put_parameter(
+        Name=CURSOR_PARAMETER,
+        Value=json.dumps(cursor),
+        Type='String',
+        Overwrite=True
+    )
+
+
+# Асинхронний самовиклик Lambda з курсором необроблених Node Groups
+def continue_in_new_invocation(context, event, next_nodegroup, continuation):
+    payload = dict(event, CURSOR=next_nodegroup, CONTINUATION=continuation)
+    lambda_client = boto3.client('lambda')
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(payload)
+    )
+    print(f'Time is running out. Continuing from node group {next_nodegroup} in invocation #{continuation}.')
+
+
 # Збереження конфігурації Node Group в SSM
 def save_nodegroup_config_to_ssm(eks_client, ssm_client, cluster_name, nodegroup_name):
     response = eks_client.describe_nodegroup(clusterName=cluster_name, nodegroupName=nodegroup_name)
@@ -42,12 +218,13 @@ def scale_down_nodegroup(eks_client, cluster_name, nodegroup_name, original_scal
         'desiredSize': 0
     }
 
-    eks_client.update_nodegroup_config(
+    response = eks_client.update_nodegroup_config(
         clusterName=cluster_name,
         nodegroupName=nodegroup_name,
         scalingConfig=new_scaling_config
     )
     print(f'Node group {nodegroup_name} in cluster {cluster_name} scaled down to 0 nodes.')
+    return response['update']['id']
 
 
 # Включення Node Group з параметрами з SSM
@@ -58,42 +235,129 @@ def scale_up_nodegroup(eks_client, ssm_client, cluster_name, nodegroup_name):
         scaling_config = json.loads(response['Parameter']['Value'])
     except ssm_client.exceptions.ParameterNotFound:
         print(f'No scaling config found in SSM for {nodegroup_name}. Skipping.')
-        return
+        return None
 
-    eks_client.update_nodegroup_config(
+    response = eks_client.update_nodegroup_config(
         clusterName=cluster_name,
         nodegroupName=nodegroup_name,
         scalingConfig=scaling_config
     )
     print(f'Node group {nodegroup_name} in cluster {cluster_name} scaled up with saved parameters.')
+    return response['update']['id']
+
 
+# Обробка однієї Node Group, повертає ID асинхронного оновлення або None
+def process_nodegroup(action, item):
+    region, cluster_name, nodegroup = item
+    eks_client, ssm_client = init_clients(region)
+    try:
+        if action == 'disable':
+            response = eks_client.describe_nodegroup(clusterName=cluster_name, nodegroupName=nodegroup)
+            scaling_config = response['nodegroup']['scalingConfig']
+            save_nodegroup_config_to_ssm(eks_client, ssm_client, cluster_name, nodegroup)
+            return scale_down_nodegroup(eks_client, cluster_name, nodegroup, scaling_config)
+        return scale_up_nodegroup(eks_client, ssm_client, cluster_name, nodegroup)
+    except ClientError as e:
+        print(f'Error processing nodegroup {item_key(item)}: {e}')
+        return None
 
 
-def lambda_handler(event, context):
+# Відстеження асинхронних оновлень update_nodegroup_config через describe_update,
+# поки всі не завершаться або не вичерпається час виклику
+def wait_for_updates(updates, context):
+    def describe(item_update):
+        (region, cluster_name, nodegroup), update_id = item_update
+        eks_client, _ = init_clients(region)
+        try:
+            return eks_client.describe_update(
+                name=cluster_name, nodegroupName=nodegroup, updateId=update_id)['update']
+        except ClientError as e:
+            print(f'Error describing update {update_id} for {item_key((region, cluster_name, nodegroup))}: {e}')
+            return {'status': 'Unknown', 'errors': []}
+
+    results = {}
+    pending = dict(updates)
+    delay = UPDATE_POLL_INITIAL_DELAY_S
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        while pending:
+            for (item, update_id), update in zip(list(pending.items()), executor.map(describe, list(pending.items()))):
+                if update['status'] != 'InProgress':
+                    del pending[item]
+                    results[item_key(item)] = update['status']
+                    for error in update.get('errors', []):
+                        print(f'Update {update_id} for {item_key(item)} failed: {error.get("errorMessage")}')
+            if not pending:
+                break
+            if context is not None and context.get_remaining_time_in_millis() - delay * 1000 < TIME_RESERVE_MS:
+                break
+            time.sleep(delay)
+            delay = min(delay * 2, UPDATE_POLL_MAX_DELAY_S)
+
+    results.update({item_key(item): 'InProgress' for item in pending})
+    summary = {}
+    for status in results.values():
+        summary[status] = summary.get(status, 0) + 1
+    print(json.dumps({'update_report': {'summary': summary, 'updates': results}}))
+    return results
+
+
+def handle_event(event, context):
     cluster_name = event.get('CLUSTER_NAME', os.environ.get('CLUSTER_NAME', 'dev-1-30'))
     excluded_nodegroups =  event.get('EXCLUDED_NODEGROUPS', os.environ.get('EXCLUDED_NODEGROUPS', []))
     action = event.get('ACTION', os.environ.get('ACTION', 'enable'))
     region = event.get('REGION', os.environ.get('REGION', 'eu-central-1'))
+    # Регіони та кластери для обробки; за замовчуванням - лише CLUSTER_NAME у REGION
+    regions = parse_list(event.get('REGIONS', os.environ.get('REGIONS', [region])))
+    cluster_names = parse_list(event.get('CLUSTERS', os.environ.get('CLUSTERS', [cluster_name])))
+    excluded_nodegroups = parse_list(excluded_nodegroups)
 
+    cursor = event.get('CURSOR')
+    continuation = event.get('CONTINUATION', 0)
 
-    eks_client, ssm_client = init_clients(region)
-
-    if action == 'disable':
-        nodegroups = get_active_nodegroups(eks_client, cluster_name, excluded_nodegroups)
-        for nodegroup in nodegroups:
-            try:
-                response = eks_client.describe_nodegroup(clusterName=cluster_name, nodegroupName=nodegroup)
-                scaling_config = response['nodegroup']['scalingConfig']
-                save_nodegroup_config_to_ssm(eks_client, ssm_client, cluster_name, nodegroup)
-                scale_down_nodegroup(eks_client, cluster_name, nodegroup, scaling_config)
-            except ClientError as e:
-                print(f'Error processing nodegroup {nodegroup}: {e}')
-    elif action == 'enable':
-        nodegroups = get_active_nodegroups(eks_client, cluster_name, excluded_nodegroups)
-        for nodegroup in nodegroups:
-            try:
-                scale_up_nodegroup(eks_client, ssm_client, cluster_name, nodegroup)
-            except ClientError as e:
-                print(f'Error processing nodegroup {nodegroup}: {e}')
-    else:
+    if action not in ('disable', 'enable'):
         print(f'Invalid action: {action}')
+        return
+
+    # Курсор зберігається в регіоні самої Lambda
+    _, ssm_client = init_clients(region)
+
+    clusters = discover_clusters(regions, cluster_names)
+    print(f'Clusters to process: {[item_key(cluster) for cluster in clusters]}')
+
+    items = get_work_items(clusters, excluded_nodegroups)
+    if cursor:
+        items = [item for item in items if item_key(item) >= cursor]
+        print(f'Resuming {action} from node group {cursor} (invocation #{continuation}), {len(items)} left.')
+
+    # Обробка хвилями по MAX_WORKERS Node Groups з перевіркою залишку часу між хвилями
+    updates = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for start in range(0, len(items), MAX_WORKERS):
+            if out_of_time(context):
+                next_item = item_key(items[start])
+                save_cursor_to_ssm(ssm_client, action, next_item, continuation + 1)
+                if continuation < MAX_CONTINUATIONS:
+                    continue_in_new_invocation(context, event, next_item, continuation + 1)
+                else:
+                    print(f'Reached {MAX_CONTINUATIONS} continuations. Stopped at node group {next_item}, cursor saved to SSM.')
+                wait_for_updates(updates, context)
+                return
+            wave = items[start:start + MAX_WORKERS]
+            for item, update_id in zip(wave, executor.map(lambda item: process_nodegroup(action, item), wave)):
+                if update_id:
+                    updates[item] = update_id
+                    add_metric('ResourcesProcessed')
+
+    save_cursor_to_ssm(ssm_client, action, None, continuation)
+    wait_for_updates(updates, context)
+
+
+# Виклик Lambda з метриками EMF незалежно від того, як завершилась обробка
+def lambda_handler(event, context):
+    started = time.perf_counter()
+    try:
+        return handle_event(event, context)
+    finally:
+        action = event.get('ACTION', os.environ.get('ACTION', 'enable'))
+        region = event.get('REGION', os.environ.get('REGION', 'eu-central-1'))
+        emit_metrics(region, action, round((time.perf_counter() - started) * 1000, 2))
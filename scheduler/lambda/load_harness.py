@@ -0,0 +1,283 @@
+import argparse
+import glob
+import importlib.util
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+import boto3
+
+
+# Локальне навантажувальне тестування Lambda-планувальників на емуляторі AWS (moto):
+#   pip install 'moto[all]'
+#   python load_harness.py --asgs 2000 --ec2 3000 --rds 500 --nodegroups 500 --latency-ms 40
+# Кожен lambda_handler викликається з контекстом, що має реальний дедлайн (timeout із Terraform),
+# самовиклики Lambda перехоплюються і виконуються наступним викликом, як у справжньому ланцюжку
+
+LAMBDA_DIR = os.path.dirname(os.path.abspath(__file__))
+REGION = 'eu-west-1'
+ACCOUNT_ID = '123456789012'
+ROLE_ARN = f'arn:aws:iam::{ACCOUNT_ID}:role/scheduler-load-harness'
+LAMBDAS = ['asg', 'ec2', 'eks', 'rds', 'resource']
+# Обмеження довжини ланцюжка самовикликів у гарнесі (захист від нескінченного циклу)
+MAX_CHAIN = 100
+
+
+# Контекст Lambda з реальним дедлайном
+class FakeContext:
+    def __init__(self, function_name, timeout_s):
+        self.function_name = function_name
+        self.invoked_function_arn = f'arn:aws:lambda:{REGION}:{ACCOUNT_ID}:function:{function_name}'
+        self.deadline = time.monotonic() + timeout_s
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self.deadline - time.monotonic()) * 1000))
+
+
+# Лічильник викликів API, штучна затримка і перехоплення самовикликів Lambda.
+# Обробники реєструються на сесії boto3 за замовчуванням, тож діють на всі клієнти Lambda
+class ApiHarness:
+    def __init__(self, latency_ms):
+        self.latency_s = latency_ms / 1000
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.invocations = []
+
+    def install(self):
+        events = boto3._get_default_session()._session.get_component('event_emitter')
+        events.register('before-call', self.before_call)
+        events.register('before-call.lambda.Invoke', self.intercept_invoke)
+
+    def before_call(self, model, **kwargs):
+        with self.lock:
+            self.calls[model.name] = self.calls.get(model.name, 0) + 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def intercept_invoke(self, params, **kwargs):
+        # Відповідь замість реального виклику: payload ставиться в чергу ланцюжка
+        with self.lock:
+            # params - серіалізований запит; тіло Invoke - це payload події
+            self.invocations.append(json.loads(params['body']))
+        return FakeHttpResponse(202), {'StatusCode': 202}
+
+    def reset(self):
+        with self.lock:
+            calls, invocations = self.calls, self.invocations
+            self.calls, self.invocations = {}, []
+        return calls, invocations
+
+
+class FakeHttpResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = b''
+
+
+# Timeout Lambda з Terraform-файлів її каталогу
+def terraform_timeout(lambda_dir):
+    for tf_file in glob.glob(os.path.join(lambda_dir, '*.tf')):
+        with open(tf_file) as f:
+            match = re.search(r'^\s*timeout\s*=\s*(\d+)', f.read(), re.MULTILINE)
+        if match:
+            return int(match.group(1))
+    return 3
+
+
+# Імпорт lambda_function.py з каталогу Lambda під унікальним іменем модуля
+def load_handler(name):
+    lambda_dir = os.path.join(LAMBDA_DIR, f'{name}-scheduler')
+    if lambda_dir not in sys.path and name == 'resource':
+        # Пакет resource_scheduler імпортується з каталогу Lambda
+        sys.path.insert(0, lambda_dir)
+    spec = importlib.util.spec_from_file_location(f'{name}_scheduler_lambda', os.path.join(lambda_dir, 'lambda_function.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.lambda_handler, terraform_timeout(lambda_dir)
+
+
+def chunked(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+# Наповнення емулятора: ASG, EC2, RDS, кластери EKS з Node Groups та стан у SSM
+def seed(counts):
+    started = time.perf_counter()
+    ec2_client = boto3.client('ec2', region_name=REGION)
+    asg_client = boto3.client('autoscaling', region_name=REGION)
+    rds_client = boto3.client('rds', region_name=REGION)
+    eks_client = boto3.client('eks', region_name=REGION)
+    ssm_client = boto3.client('ssm', region_name=REGION)
+
+    image_id = ec2_client.describe_images(Owners=['amazon'])['Images'][0]['ImageId']
+    fleet = {'asg': [], 'ec2': [], 'rds': [], 'eks': []}
+
+    asg_client.create_launch_configuration(
+        LaunchConfigurationName='load-harness', ImageId=image_id, InstanceType='t3.micro')
+    for index in range(counts['asgs']):
+        name = f'load-asg-{index:05d}'
+        asg_client.create_auto_scaling_group(
+            AutoScalingGroupName=name, LaunchConfigurationName='load-harness',
+            MinSize=0, MaxSize=2, DesiredCapacity=1, AvailabilityZones=[f'{REGION}a'])
+        ssm_client.put_parameter(Name=f'/asg/{name}/scalingConfig', Value=json.dumps([1, 2, 1]),
+                                 Type='String', Overwrite=True)
+        fleet['asg'].append(name)
+
+    for batch in chunked(range(counts['ec2']), 500):
+        response = ec2_client.run_instances(ImageId=image_id, InstanceType='t3.micro',
+                                            MinCount=len(batch), MaxCount=len(batch))
+        fleet['ec2'].extend(inst['InstanceId'] for inst in response['Instances'])
+
+    for index in range(counts['rds']):
+        name = f'load-db-{index:05d}'
+        rds_client.create_db_instance(DBInstanceIdentifier=name, DBInstanceClass='db.t3.micro',
+                                      Engine='postgres', MasterUsername='harness',
+                                      MasterUserPassword='harness-password', AllocatedStorage=20)
+        fleet['rds'].append(name)
+
+    for cluster_index in range(counts['clusters']):
+        cluster = f'load-cluster-{cluster_index:02d}'
+        eks_client.create_cluster(name=cluster, roleArn=ROLE_ARN, resourcesVpcConfig={})
+        for index in range(cluster_index, counts['nodegroups'], counts['clusters']):
+            nodegroup = f'load-ng-{index:05d}'
+            scaling_config = {'minSize': 1, 'maxSize': 3, 'desiredSize': 2}
+            eks_client.create_nodegroup(clusterName=cluster, nodegroupName=nodegroup, nodeRole=ROLE_ARN,
+                                        subnets=['subnet-harness'], scalingConfig=scaling_config)
+            ssm_client.put_parameter(Name=f'/eks/{cluster}/{nodegroup}/scalingConfig',
+                                     Value=json.dumps(scaling_config), Type='String', Overwrite=True)
+            fleet['eks'].append((cluster, nodegroup))
+
+    print(f'Seeded {json.dumps({t: len(ids) for t, ids in fleet.items()})} in {time.perf_counter() - started:.1f}s.')
+    return fleet
+
+
+# Подія для кожної Lambda (замість змінних середовища з Terraform)
+def build_event(name, action, fleet, counts):
+    event = {'ACTION': action, 'REGION': REGION}
+    if name == 'ec2':
+        event['INSTANCES'] = fleet['ec2']
+    elif name == 'rds':
+        event['INSTANCES'] = fleet['rds']
+    elif name == 'eks':
+        event.update(REGIONS=[REGION], CLUSTERS=['*'])
+    elif name == 'resource':
+        event.update(
+            RESOURCE_TYPES=['rds', 'asg', 'ec2', 'eks'],
+            EC2_INSTANCES=fleet['ec2'],
+            RDS_INSTANCES=fleet['rds'],
+            # Уніфікований планувальник обробляє один кластер
+            CLUSTER_NAME='load-cluster-00',
+            DEPENDENCIES={},
+            TRACK_CONVERGENCE='true',
+        )
+    return event
+
+
+# Виклик Lambda разом з ланцюжком самовикликів. Кожен виклик має власний дедлайн
+def run_chain(name, handler, timeout_s, event, api):
+    api.reset()
+    invocations = []
+    calls = {}
+    pending = [event]
+    while pending and len(invocations) < MAX_CHAIN:
+        payload = pending.pop(0)
+        context = FakeContext(f'{name}_scheduler', timeout_s)
+        started = time.perf_counter()
+        error = None
+        try:
+            handler(payload, context)
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        wall_s = time.perf_counter() - started
+        invocation_calls, continuations = api.reset()
+        for operation, count in invocation_calls.items():
+            calls[operation] = calls.get(operation, 0) + count
+        invocations.append({
+            'wall_s': round(wall_s, 2),
+            'api_calls': sum(invocation_calls.values()),
+            'headroom_s': round(timeout_s - wall_s, 2),
+            'timed_out': wall_s > timeout_s,
+            'error': error,
+        })
+        pending.extend(continuations)
+
+    return {
+        'lambda': name,
+        'action': event['ACTION'],
+        'timeout_s': timeout_s,
+        'invocations': len(invocations),
+        'total_wall_s': round(sum(inv['wall_s'] for inv in invocations), 2),
+        'max_wall_s': max(inv['wall_s'] for inv in invocations),
+        'min_headroom_s': min(inv['headroom_s'] for inv in invocations),
+        'api_calls': sum(calls.values()),
+        'top_operations': dict(sorted(calls.items(), key=lambda item: -item[1])[:5]),
+        'timed_out': sum(1 for inv in invocations if inv['timed_out']),
+        'errors': [inv['error'] for inv in invocations if inv['error']],
+        'chain_truncated': bool(pending),
+    }
+
+
+def print_report(results):
+    header = f'{"lambda":<10}{"action":<9}{"calls":>8}{"inv":>5}{"max s":>8}{"total s":>9}{"headroom s":>12}  status'
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        status = 'OK'
+        if r['timed_out'] or r['errors'] or r['chain_truncated']:
+            status = 'FAIL'
+        print(f'{r["lambda"]:<10}{r["action"]:<9}{r["api_calls"]:>8}{r["invocations"]:>5}'
+              f'{r["max_wall_s"]:>8}{r["total_wall_s"]:>9}{r["min_headroom_s"]:>12}  {status}')
+        for error in r['errors']:
+            print(f'    error: {error}')
+    print(json.dumps({'load_report': results}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run scheduler lambdas against a seeded AWS emulator at fleet scale.')
+    parser.add_argument('--lambdas', nargs='*', choices=LAMBDAS, default=LAMBDAS, help='Lambdas to run')
+    parser.add_argument('--actions', nargs='*', choices=['disable', 'enable'], default=['disable', 'enable'],
+                        help='Actions to run, in order')
+    parser.add_argument('--asgs', type=int, default=1000, help='Number of Auto Scaling groups')
+    parser.add_argument('--ec2', type=int, default=2000, help='Number of EC2 instances')
+    parser.add_argument('--rds', type=int, default=300, help='Number of RDS instances')
+    parser.add_argument('--clusters', type=int, default=5, help='Number of EKS clusters')
+    parser.add_argument('--nodegroups', type=int, default=500, help='Number of EKS node groups across all clusters')
+    parser.add_argument('--latency-ms', type=float, default=30, help='Artificial latency added to every API call')
+    args = parser.parse_args()
+
+    try:
+        from moto import mock_aws
+    except ImportError:
+        sys.exit("moto is required: pip install 'moto[all]'")
+
+    # Фіктивні облікові дані, щоб жоден запит не пішов у справжній AWS
+    os.environ.update(AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing',
+                      AWS_SESSION_TOKEN='testing', AWS_DEFAULT_REGION=REGION)
+    counts = {'asgs': args.asgs, 'ec2': args.ec2, 'rds': args.rds,
+              'clusters': max(1, args.clusters), 'nodegroups': args.nodegroups}
+
+    with mock_aws():
+        fleet = seed(counts)
+        api = ApiHarness(args.latency_ms)
+        api.install()
+        handlers = {name: load_handler(name) for name in args.lambdas}
+
+        results = []
+        # Для кожної Lambda: вимкнення, потім включення, щоб наступна бачила флот у вихідному стані
+        for name in args.lambdas:
+            for action in args.actions:
+                handler, timeout_s = handlers[name]
+                print(f'Running {name} {action} (timeout {timeout_s}s, latency {args.latency_ms}ms)...')
+                results.append(run_chain(name, handler, timeout_s, build_event(name, action, fleet, counts), api))
+
+    print_report(results)
+    if any(r['timed_out'] or r['errors'] or r['chain_truncated'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
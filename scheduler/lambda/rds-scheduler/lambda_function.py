@@ -2,6 +2,101 @@ import boto3
 from botocore.exceptions import ClientError
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Запас часу (мс) до таймауту, при якому решта роботи передається новому виклику
+TIME_RESERVE_MS = int(os.environ.get('TIME_RESERVE_MS', 10000))
+# Обмеження ланцюжка самовикликів, щоб уникнути нескінченного циклу
+MAX_CONTINUATIONS = int(os.environ.get('MAX_CONTINUATIONS', 50))
+CURSOR_PARAMETER = '/rds/scheduler/cursor'
+# Кількість кластерів та інстансів, що обробляються паралельно
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', 10))
+
+
+# Метрики виклику в CloudWatch Embedded Metric Format: CloudWatch Logs сам перетворює рядок лога
+# на метрики без виклику PutMetricData. Простір імен і виміри ті самі, що й у resource-scheduler
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ResourceScheduler')
+RESOURCE_TYPE = 'rds'
+METRIC_UNITS = {
+    'Duration': 'Milliseconds',
+    'ResourcesProcessed': 'Count',
+    'ApiCalls': 'Count',
+    'Throttles': 'Count',
+    'ApiFailures': 'Count',
+}
+THROTTLE_ERROR_CODES = (
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'RequestLimitExceeded', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'SlowDown',
+)
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def add_metric(name, value=1):
+    with _metrics_lock:
+        _metrics[name] = _metrics.get(name, 0) + value
+
+
+def _count_api_call(**kwargs):
+    """
+    Обробник події botocore before-call. Разом з обробниками нижче рахує виклики API,
+    тротлінг і помилки без додаткових запитів.
+    """
+    add_metric('ApiCalls')
+
+
+def _count_throttle(response=None, **kwargs):
+    # Викликається для кожної спроби, зокрема повторних після тротлінгу
+    if response is not None and response[1].get('Error', {}).get('Code') in THROTTLE_ERROR_CODES:
+        add_metric('Throttles')
+
+
+def _count_api_failure(http_response=None, **kwargs):
+    if http_response is None or http_response.status_code >= 400:
+        add_metric('ApiFailures')
+
+
+def instrument_default_session():
+    """
+    Лічильники підключаються до сесії за замовчуванням, тож діють для всіх клієнтів boto3.client.
+    """
+    boto3.setup_default_session()
+    events = boto3.DEFAULT_SESSION.events
+    events.register('before-call', _count_api_call)
+    events.register('needs-retry', _count_throttle)
+    events.register('after-call', _count_api_failure)
+    events.register('after-call-error', _count_api_failure)
+
+
+def emit_metrics(region, action, duration_ms):
+    """
+    Вивід метрик виклику одним рядком EMF. Лічильники скидаються, щоб теплий контейнер не змішував виклики.
+    """
+    with _metrics_lock:
+        values = {name: _metrics.get(name, 0) for name in METRIC_UNITS if name != 'Duration'}
+        _metrics.clear()
+    values['Duration'] = duration_ms
+    print(json.dumps({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [['ResourceType', 'Region', 'Action']],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, unit in METRIC_UNITS.items()],
+            }],
+        },
+        'ResourceType': RESOURCE_TYPE,
+        'Region': region,
+        'Action': action,
+        **values,
+    }))
+
+
+instrument_default_session()
 
 
 def get_boto3_client(service, region):
@@ -26,6 +121,22 @@ def parse_instances(input_instances):
         return []
 
 
+def get_tagged_rds_instances(region, tag_key, tag_values):
+    """
+    Знаходить RDS інстанси з тегом розкладу одним пагінованим запитом до Tagging API.
+    """
+    tagging_client = get_boto3_client('resourcegroupstaggingapi', region)
+    tag_filter = {'Key': tag_key}
+    if tag_values:
+        tag_filter['Values'] = tag_values
+    instances = []
+    paginator = tagging_client.get_paginator('get_resources')
+    for page in paginator.paginate(TagFilters=[tag_filter], ResourceTypeFilters=['rds:db']):
+        # arn:aws:rds:<region>:<account>:db:<db-instance-id>
+        instances.extend(m['ResourceARN'].split(':')[-1] for m in page['ResourceTagMappingList'])
+    return instances
+
+
 def get_active_rds_instances(db_instance_identifiers, excluded_instances):
     """
     Фільтрує список інстансів, виключаючи ті, які знаходяться у списку виключень.
@@ -34,58 +145,160 @@ def get_active_rds_instances(db_instance_identifiers, excluded_instances):
     return instances_to_manage
 
 
-def disable_rds_instances(rds_client, instances):
+def out_of_time(context):
     """
-    Зупиняє вказані RDS інстанси, якщо вони знаходяться в стані 'available'.
+    Перевіряє, чи залишилось часу менше, ніж потрібно для безпечного завершення.
     """
-    if not instances:
-        print('No RDS instances to disable.')
-        return
+    return context is not None and context.get_remaining_time_in_millis() < TIME_RESERVE_MS
 
-    for instance_id in instances:
-        try:
-            response = rds_client.describe_db_instances(DBInstanceIdentifier=instance_id)
-            db_instance = response['DBInstances'][0]
-            status = db_instance['DBInstanceStatus']
-            engine = db_instance['Engine']
 
-            if status != 'available':
-                print(f'RDS instance {instance_id} is not in available state (current state: {status}). Skipping.')
-                continue
+def save_cursor_to_ssm(ssm_client, action, next_target, continuation):
+    """
+    Зберігає в SSM курсор (першу необроблену ціль за іменем), щоб було видно, на чому зупинився запуск.
+    Курсор має сталий розмір незалежно від кількості інстансів, тож вміщується в Standard-параметр.
+    """
+    cursor = {
+        'action': action,
+        'next': next_target,
+        'continuation': continuation,
+        'status': 'in_progress' if next_target else 'completed'
+    }
+    ssm_client.put_parameter(
+        Name=CURSOR_PARAMETER,
+        Value=json.dumps(cursor),
+        Type='String',
+        Overwrite=True
+    )
 
-            # Зупинка інстансу
-            rds_client.stop_db_instance(DBInstanceIdentifier=instance_id)
-            print(f'Stopped RDS instance: {instance_id}')
-        except ClientError as e:
-            print(f'Failed to stop RDS instance {instance_id}: {e}')
+
+def continue_in_new_invocation(context, event, next_target, continuation):
+    """
+    Асинхронно викликає цю ж Lambda з курсором (першою необробленою ціллю).
+    """
+    payload = dict(event, CURSOR=next_target, CONTINUATION=continuation)
+    lambda_client = boto3.client('lambda')
+    lambda_client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(payload)
+    )
+    print(f'Time is running out. Continuing from {next_target} in invocation #{continuation}.')
 
 
-def enable_rds_instances(rds_client, instances):
+def describe_targets(rds_client, identifiers, excluded_instances=()):
     """
-    Запускає вказані RDS інстанси, якщо вони знаходяться в стані 'stopped'.
+    Описує цілі пагінованими describe_db_instances і describe_db_clusters з фільтрами
+    (до 100 ідентифікаторів на запит). Члени кластерів Aurora замінюються своїм кластером,
+    бо зупиняти і запускати їх можна лише на рівні кластера. Кластери, серед членів яких
+    є виключені інстанси, пропускаються, щоб не зупинити і їх.
+    Повертає ({інстанс: статус}, {кластер: статус}).
     """
-    if not instances:
-        print('No RDS instances to enable.')
-        return
+    instances, members, cluster_ids = {}, set(), set()
+    paginator = rds_client.get_paginator('describe_db_instances')
+    for start in range(0, len(identifiers), 100):
+        chunk = identifiers[start:start + 100]
+        for page in paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': chunk}]):
+            for db in page['DBInstances']:
+                if db.get('DBClusterIdentifier'):
+                    members.add(db['DBInstanceIdentifier'])
+                    cluster_ids.add(db['DBClusterIdentifier'])
+                else:
+                    instances[db['DBInstanceIdentifier']] = db['DBInstanceStatus']
 
-    for instance_id in instances:
-        try:
-            response = rds_client.describe_db_instances(DBInstanceIdentifier=instance_id)
-            db_instance = response['DBInstances'][0]
-            status = db_instance['DBInstanceStatus']
+    # Ідентифікатори, що не є інстансами, можуть бути назвами кластерів
+    cluster_ids.update(i for i in identifiers if i not in instances and i not in members)
+    cluster_ids = sorted(cluster_ids)
+    clusters = {}
+    paginator = rds_client.get_paginator('describe_db_clusters')
+    for start in range(0, len(cluster_ids), 100):
+        chunk = cluster_ids[start:start + 100]
+        for page in paginator.paginate(Filters=[{'Name': 'db-cluster-id', 'Values': chunk}]):
+            for cluster in page['DBClusters']:
+                excluded = sorted(m['DBInstanceIdentifier'] for m in cluster.get('DBClusterMembers', [])
+                                  if m['DBInstanceIdentifier'] in excluded_instances)
+                if excluded:
+                    print(f"WARNING: RDS cluster {cluster['DBClusterIdentifier']} has excluded members "
+                          f"{excluded}. Skipping.")
+                    continue
+                clusters[cluster['DBClusterIdentifier']] = cluster['Status']
+    return instances, clusters
 
-            if status != 'stopped':
-                print(f'RDS instance {instance_id} is not in stopped state (current state: {status}). Skipping.')
+
+def resolve_targets(rds_client, identifiers, action, excluded_instances=(), resume_from=None):
+    """
+    Повертає кластери та окремі інстанси, які можна зупинити ('available')
+    або запустити ('stopped'), як список пар (тип, ідентифікатор), відсортований за ідентифікатором,
+    щоб курсор відновлював обробку в тому самому порядку. Цілі перед resume_from уже оброблені.
+    """
+    instances, clusters = describe_targets(rds_client, identifiers, excluded_instances)
+    expected = 'available' if action == 'disable' else 'stopped'
+    targets = []
+    for kind, statuses in (('cluster', clusters), ('instance', instances)):
+        for identifier, status in sorted(statuses.items()):
+            if resume_from is not None and identifier < resume_from:
+                continue
+            if status != expected:
+                print(f'RDS {kind} {identifier} is not in {expected} state (current state: {status}). Skipping.')
                 continue
+            targets.append((kind, identifier))
+    return sorted(targets, key=lambda target: target[1])
+
 
-            # Запуск інстансу
-            rds_client.start_db_instance(DBInstanceIdentifier=instance_id)
-            print(f'Started RDS instance: {instance_id}')
+def apply_action(rds_client, targets, action, context=None):
+    """
+    Зупиняє або запускає кластери та інстанси паралельно, хвилями по MAX_WORKERS.
+    Повертає першу ціль, яку не встигли обробити до таймауту, або None.
+    """
+    operations = {
+        ('cluster', 'disable'): lambda identifier: rds_client.stop_db_cluster(DBClusterIdentifier=identifier),
+        ('cluster', 'enable'): lambda identifier: rds_client.start_db_cluster(DBClusterIdentifier=identifier),
+        ('instance', 'disable'): lambda identifier: rds_client.stop_db_instance(DBInstanceIdentifier=identifier),
+        ('instance', 'enable'): lambda identifier: rds_client.start_db_instance(DBInstanceIdentifier=identifier),
+    }
+    verb = 'Stopped' if action == 'disable' else 'Started'
+
+    def process(target):
+        kind, identifier = target
+        try:
+            operations[(kind, action)](identifier)
+            print(f'{verb} RDS {kind}: {identifier}')
+            add_metric('ResourcesProcessed')
         except ClientError as e:
-            print(f'Failed to start RDS instance {instance_id}: {e}')
+            print(f'Failed to {"stop" if action == "disable" else "start"} RDS {kind} {identifier}: {e}')
 
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for start in range(0, len(targets), MAX_WORKERS):
+            if out_of_time(context):
+                return targets[start][1]
+            list(executor.map(process, targets[start:start + MAX_WORKERS]))
+    return None
 
-def lambda_handler(event, context):
+
+def disable_rds_instances(rds_client, instances, context=None, excluded_instances=(), resume_from=None):
+    """
+    Зупиняє вказані RDS інстанси та кластери Aurora, якщо вони в стані 'available',
+    починаючи з цілі resume_from. Повертає першу ціль, яку не встигли обробити до таймауту, або None.
+    """
+    if not instances:
+        print('No RDS instances to disable.')
+        return None
+    targets = resolve_targets(rds_client, instances, 'disable', excluded_instances, resume_from)
+    return apply_action(rds_client, targets, 'disable', context)
+
+
+def enable_rds_instances(rds_client, instances, context=None, excluded_instances=(), resume_from=None):
+    """
+    Запускає вказані RDS інстанси та кластери Aurora, якщо вони в стані 'stopped',
+    починаючи з цілі resume_from. Повертає першу ціль, яку не встигли обробити до таймауту, або None.
+    """
+    if not instances:
+        print('No RDS instances to enable.')
+        return None
+    targets = resolve_targets(rds_client, instances, 'enable', excluded_instances, resume_from)
+    return apply_action(rds_client, targets, 'enable', context)
+
+
+def handle_event(event, context):
     """
     Основна функція Lambda, яка керує запуском та зупинкою RDS інстансів.
     """
@@ -96,18 +309,32 @@ def lambda_handler(event, context):
     # Отримання списків інстансів
     db_instance_identifiers = event.get('INSTANCES', os.environ.get('INSTANCES', '[]'))
     excluded_instances = event.get('EXCLUDED_INSTANCES', os.environ.get('EXCLUDED_INSTANCES', '[]'))
+    schedule_tag_key = event.get('SCHEDULE_TAG_KEY', os.environ.get('SCHEDULE_TAG_KEY'))
+    schedule_tag_values = event.get('SCHEDULE_TAG_VALUES', os.environ.get('SCHEDULE_TAG_VALUES', '[]'))
 
     # Парсинг списків інстансів
     db_instance_identifiers = parse_instances(db_instance_identifiers)
     excluded_instances = parse_instances(excluded_instances)
 
+    # Додавання інстансів, знайдених за тегом розкладу
+    if schedule_tag_key:
+        tagged_instances = get_tagged_rds_instances(region, schedule_tag_key, parse_instances(schedule_tag_values))
+        print(f"Tagged instances ({schedule_tag_key}): {tagged_instances}")
+        db_instance_identifiers = db_instance_identifiers + [
+            inst for inst in tagged_instances if inst not in db_instance_identifiers]
+
     print(f"Region: {region}")
     print(f"Parsed INSTANCES: {db_instance_identifiers}")
     print(f"Parsed EXCLUDED_INSTANCES: {excluded_instances}")
 
+    # Курсор (перша необроблена ціль за іменем) від попереднього виклику
+    cursor = event.get('CURSOR')
+    continuation = event.get('CONTINUATION', 0)
+
     # Ініціалізація клієнтів Boto3
     try:
         rds_client = get_boto3_client('rds', region)
+        ssm_client = get_boto3_client('ssm', region)
     except Exception as e:
         print(f'Error initializing Boto3 RDS client: {e}')
         return {
@@ -117,15 +344,16 @@ def lambda_handler(event, context):
 
     # Фільтрація інстансів для керування
     instances_to_manage = get_active_rds_instances(db_instance_identifiers, excluded_instances)
+    if cursor is not None:
+        # Цілі повторно описуються одним пакетом; оброблені раніше відкидаються за курсором
+        print(f"Resuming {action} from {cursor} (invocation #{continuation})")
     print(f"Instances to manage: {instances_to_manage}")
 
     # Виконання дії на основі параметра ACTION
     if action == 'disable':
-        disable_rds_instances(rds_client, instances_to_manage)
-        message = f'Action "disable" completed successfully on instances: {instances_to_manage}.'
+        next_target = disable_rds_instances(rds_client, instances_to_manage, context, excluded_instances, cursor)
     elif action == 'enable':
-        enable_rds_instances(rds_client, instances_to_manage)
-        message = f'Action "enable" completed successfully on instances: {instances_to_manage}.'
+        next_target = enable_rds_instances(rds_client, instances_to_manage, context, excluded_instances, cursor)
     else:
         message = 'Invalid action specified. Use "disable" or "enable".'
         print(message)
@@ -134,7 +362,35 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': message})
         }
 
+    # Передача решти роботи новому виклику перед таймаутом
+    if next_target:
+        save_cursor_to_ssm(ssm_client, action, next_target, continuation + 1)
+        if continuation < MAX_CONTINUATIONS:
+            continue_in_new_invocation(context, event, next_target, continuation + 1)
+        else:
+            print(f'Reached {MAX_CONTINUATIONS} continuations. Stopped at {next_target}, cursor saved to SSM.')
+        message = f'Action "{action}" stopped at {next_target} before the timeout. Continuing from it.'
+        return {
+            'statusCode': 202,
+            'body': json.dumps({'message': message})
+        }
+
+    save_cursor_to_ssm(ssm_client, action, None, continuation)
+    message = f'Action "{action}" completed successfully on instances: {instances_to_manage}.'
     return {
         'statusCode': 200,
         'body': json.dumps({'message': message})
     }
+
+
+def lambda_handler(event, context):
+    """
+    Виклик Lambda з метриками EMF незалежно від того, як завершилась обробка.
+    """
+    started = time.perf_counter()
+    try:
+        return handle_event(event, context)
+    finally:
+        action = event.get('ACTION', os.environ.get('ACTION', 'enable')).lower()
+        region = event.get('REGION', os.environ.get('REGION', 'eu-west-1'))
+        emit_metrics(region, action, round((time.perf_counter() - started) * 1000, 2))
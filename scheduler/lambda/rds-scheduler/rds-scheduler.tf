@@ -45,6 +45,7 @@ resource "aws_lambda_function" "rds_scheduler_lambda" {
       ACTION        = "enable"
       REGION        = "eu-west-1"
       SSM_PARAMETER = "/rds/disable-instances"
+      MAX_WORKERS   = "10"
       INSTANCES = jsonencode([
         "athena-dev-banking-migrated",
         "athena-dev-dwh-migrated",
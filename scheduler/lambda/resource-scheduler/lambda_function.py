@@ -0,0 +1,168 @@
+import time
+
+# Початок ініціалізації модуля (холодний старт)
+_INIT_STARTED = time.perf_counter()
+
+import json
+
+from botocore.exceptions import ClientError
+
+from resource_scheduler import continuation, convergence, metrics, orchestrator, prewarm, stagger
+from resource_scheduler.batching import chunked
+from resource_scheduler.clients import cached_client_count
+from resource_scheduler.config import load_config
+from resource_scheduler.discovery import discover_tagged_resources
+from resource_scheduler.plan import build_plan, format_plan, planned_targets
+from resource_scheduler.plugins import IMPORT_TIMES_MS, load_plugin
+
+INIT_DURATION_MS = round((time.perf_counter() - _INIT_STARTED) * 1000, 2)
+_cold_start = True
+
+
+# Порядок обробки типів ресурсів: при вимкненні у зворотному порядку
+def ordered_resource_types(config):
+    resource_types = config['resource_types']
+    return resource_types if config['action'] == 'enable' else list(reversed(resource_types))
+
+
+# Виконання дії над усіма типами ресурсів з подальшим відстеженням сходження.
+# Повертає курсор, якщо не встигли завершити
+def run_action(config, context, cursor=None):
+    cursor = cursor or {}
+    if cursor.get('phase') == 'converge':
+        return track_convergence(config, context, cursor['tracking'])
+    if cursor.get('phase') == 'stagger':
+        return staggered_start(config, context, cursor)
+
+    started_at = cursor.get('started_at', time.time())
+    changed = cursor.get('changed', {})
+    resource_types = ordered_resource_types(config)
+    if cursor.get('type'):
+        resource_types = resource_types[resource_types.index(cursor['type']):]
+
+    for resource_type in resource_types:
+        # Типи, що включаються хвилями, запускаються після решти
+        if stagger.applies(resource_type, config):
+            continue
+        with metrics.resource_scope(resource_type):
+            type_started = time.perf_counter()
+            next_target = apply_action(resource_type, config, context, cursor, changed)
+            metrics.add('Duration', round((time.perf_counter() - type_started) * 1000, 2))
+        if next_target is not None:
+            return {'phase': 'apply', 'type': resource_type, 'next': next_target,
+                    'changed': changed, 'started_at': started_at}
+
+    staggered = [t for t in resource_types if stagger.applies(t, config)]
+    if staggered:
+        targets = {}
+        for resource_type in staggered:
+            with metrics.resource_scope(resource_type):
+                targets[resource_type] = load_plugin(resource_type).get_targets(config['region'], config)
+        cursor = {'phase': 'stagger', 'stagger': stagger.new_state(targets, config),
+                  'changed': changed, 'started_at': started_at}
+        return staggered_start(config, context, cursor)
+
+    if config['track_convergence']:
+        return track_convergence(config, context, convergence.new_tracking(changed, started_at))
+    return None
+
+
+# Дія над одним типом ресурсів. Повертає перший необроблений ресурс, якщо не встигли
+def apply_action(resource_type, config, context, cursor, changed):
+    action = config['action']
+    region = config['region']
+    plugin = load_plugin(resource_type)
+    targets = plugin.get_targets(region, config)
+    if cursor.get('type') == resource_type:
+        targets = [target for target in targets if target >= cursor['next']]
+    # Виконуємо лише різницю між поточним і бажаним станом
+    targets = planned_targets(plugin, region, targets, action, config)
+    handler = plugin.disable if action == 'disable' else plugin.enable
+
+    for batch in chunked(targets, plugin.BATCH_SIZE):
+        if continuation.out_of_time(context):
+            return batch[0]
+        try:
+            handler(region, batch, config)
+            changed.setdefault(resource_type, []).extend(batch)
+            metrics.add('ResourcesProcessed', len(batch))
+        except ClientError as e:
+            print(f'Error processing {resource_type} {batch}: {e}')
+    return None
+
+
+# Запуск хвилями з відстеженням готовності кожної хвилі, далі - загальне відстеження сходження
+def staggered_start(config, context, cursor):
+    if not stagger.run(cursor['stagger'], config, context):
+        return cursor
+    stagger.report(cursor['stagger'], config)
+    changed = cursor['changed']
+    for resource_type, ids in stagger.started(cursor['stagger']).items():
+        changed.setdefault(resource_type, []).extend(ids)
+
+    if config['track_convergence']:
+        return track_convergence(config, context, convergence.new_tracking(changed, cursor['started_at']))
+    return None
+
+
+# Очікування, поки змінені ресурси досягнуть цільового стану
+def track_convergence(config, context, tracking):
+    if not convergence.track(tracking, config['action'], config, context):
+        return {'phase': 'converge', 'tracking': tracking}
+    convergence.report(tracking, config['action'], config)
+    return None
+
+
+def lambda_handler(event, context):
+    global _cold_start
+    started = time.perf_counter()
+    cold_start, _cold_start = _cold_start, False
+    clients_before = cached_client_count()
+
+    config = load_config(event)
+    if config['action'] not in ('disable', 'enable', 'prewarm'):
+        print(f'Invalid action: {config["action"]}')
+        return {'statusCode': 400, 'body': json.dumps({'error': 'Use "disable", "enable" or "prewarm".'})}
+
+    # Один прохід Tagging API замість окремих describe для кожного типу, який обробляє ця дія
+    if config['schedule_tag_key']:
+        types = config['prewarm_types'] if config['action'] == 'prewarm' else config['resource_types']
+        config['discovered'] = discover_tagged_resources(
+            config['region'], config['schedule_tag_key'], config['schedule_tag_values'], types)
+
+    if config['plan'] and config['action'] in ('disable', 'enable'):
+        # Лише показ плану змін без їх виконання
+        plan = build_plan(config, ordered_resource_types(config))
+        print(format_plan(plan))
+        return {'statusCode': 200, 'body': json.dumps({'plan': plan})}
+
+    invocation = event.get('CONTINUATION', 0)
+    if config['action'] == 'prewarm':
+        # Ранній запуск повільних ресурсів за історією часу їх старту
+        cursor = prewarm.run(config, context)
+    elif config['action'] == 'enable' and config['dependencies']:
+        # Включення рівнями за залежностями з очікуванням готовності
+        cursor = orchestrator.run(config, context, event.get('CURSOR'))
+    else:
+        cursor = run_action(config, context, event.get('CURSOR'))
+    if cursor:
+        continuation.hand_off(context, event, config['region'], config['action'], cursor, invocation,
+                              waiting=cursor.get('waiting', False))
+    else:
+        continuation.save_cursor(config['region'], config['action'], None, invocation)
+
+    # Звіт про час холодного/теплого старту та виконання
+    report = {
+        'action': config['action'],
+        'region': config['region'],
+        'cold_start': cold_start,
+        'init_ms': INIT_DURATION_MS if cold_start else 0,
+        'handler_ms': round((time.perf_counter() - started) * 1000, 2),
+        'plugin_import_ms': dict(IMPORT_TIMES_MS),
+        'clients_created': cached_client_count() - clients_before,
+        'continuation': invocation,
+        'cursor': cursor,
+    }
+    print(json.dumps({'startup_report': report}))
+    metrics.emit(config['region'], config['action'], report['handler_ms'])
+    return {'statusCode': 202 if cursor else 200, 'body': json.dumps(report)}
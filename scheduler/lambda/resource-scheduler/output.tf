@@ -0,0 +1,3 @@
+output "resource_scheduler_lambda_function_arn" {
+  value = aws_lambda_function.resource_scheduler_lambda.arn
+}
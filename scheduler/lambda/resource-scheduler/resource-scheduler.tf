@@ -0,0 +1,185 @@
+data "archive_file" "lambda" {
+  type        = "zip"
+  source_dir  = path.module
+  output_path = "lambda_function.zip"
+  excludes = [
+    "lambda_function.zip",
+    "resource-scheduler.tf",
+    "output.tf",
+    "provider.tf",
+    "remote_state.tf",
+    "terraform.tf",
+    "terragrunt.hcl",
+    "variables.tf",
+    ".terraform",
+    ".terraform.lock.hcl",
+  ]
+}
+
+
+# Lambda Function: одна функція для ASG, EC2, EKS та RDS
+resource "aws_lambda_function" "resource_scheduler_lambda" {
+  provider      = aws.Blue
+  function_name = "resource_scheduler"
+  handler       = "lambda_function.lambda_handler"
+  # Роль потребує прав усіх чотирьох планувальників, SSM та lambda:InvokeFunction
+  role          = data.terraform_remote_state.iam.outputs.iam_role_asg_scheduler_lambda
+  runtime       = "python3.12"
+  filename      = data.archive_file.lambda.output_path
+
+  source_code_hash = data.archive_file.lambda.output_base64sha256
+
+  timeout = 60 # Set timeout to 1 minute (60 seconds)
+
+  environment {
+    variables = {
+      ACTION         = "enable"
+      REGION         = "eu-west-1"
+      RESOURCE_TYPES = jsonencode(["rds", "eks", "asg", "ec2"])
+      CLUSTER_NAME   = "dev-1-30"
+      EXCLUDED_NODEGROUPS = jsonencode([
+        "eks-dev-common-spots-gp3-20241003185735319400000001-90c929df-51d2-ffd0-1959-c49b616ed998",
+        "eks-dev-ondemand_styd-gp3-20240930102001513800000009-b8c92138-dc09-b9cd-ca1b-35ba536b35a1",
+        "eks-dev-spots-x64-2024093010200151470000000b-7ec92138-dc09-51f1-26dc-be5610f6bc0a",
+        "eks-dev-ondemand-gp3-20240724153425537700000062-a0c872b0-8f99-3d5b-fc7a-f52646be0af1"
+      ])
+      EXCLUDED_ASGS          = jsonencode([])
+      # terminate - масштабування ASG до 0, warm-pool - паркування інстансів у warm pool
+      ASG_SCALE_DOWN_MODE    = "terminate"
+      ASG_WARM_POOL_STATE    = "Stopped"
+      EC2_INSTANCES          = jsonencode([])
+      EXCLUDED_EC2_INSTANCES = jsonencode([])
+      # Гібернація інстансів з HibernationOptions.Configured, решта зупиняються звичайно
+      EC2_HIBERNATE          = "false"
+      RDS_INSTANCES          = jsonencode([])
+      EXCLUDED_RDS_INSTANCES = jsonencode([])
+      SCHEDULE_TAG_KEY       = "Schedule"
+      SCHEDULE_TAG_VALUES    = jsonencode(["office-hours"])
+      # Порядок включення: RDS -> EKS Node Groups -> ASG, EC2 після RDS
+      DEPENDENCIES = jsonencode({
+        eks = ["rds"]
+        asg = ["eks"]
+        ec2 = ["rds"]
+      })
+      TRACK_CONVERGENCE   = "true"
+      METRICS_NAMESPACE   = "ResourceScheduler"
+      PREWARM_TARGET_TIME = "05:30"
+      PREWARM_TYPES       = jsonencode(["rds", "eks"])
+      PREWARM_PERCENTILE  = "90"
+      PREWARM_MARGIN_S    = "120"
+      # Запуск EC2/ASG/EKS хвилями, щоб не перевантажувати RDS і спільні сервіси
+      STAGGER_TYPES           = jsonencode(["ec2", "asg", "eks"])
+      STAGGER_WAVE_SIZE       = "0"
+      STAGGER_WAVE_INTERVAL_S = "30"
+      STAGGER_RATE            = "0"
+    }
+  }
+
+  tags = {
+    Name        = "resource_scheduler"
+    Environment = "dev"
+    Terraform   = "true"
+  }
+}
+
+
+# CloudWatch Event Rule для ACTION=enable
+resource "aws_cloudwatch_event_rule" "lambda_schedule_enable" {
+  provider            = aws.Blue
+  name                = "resource_scheduler-enable-schedule"
+  description         = "Trigger Lambda function to enable resources daily at 5:30 UTC"
+  schedule_expression = "cron(30 5 * * ? *)"
+  state               = "ENABLED"
+}
+
+
+# CloudWatch Event Target для ACTION=enable
+resource "aws_cloudwatch_event_target" "trigger_lambda_enable" {
+  provider  = aws.Blue
+  rule      = aws_cloudwatch_event_rule.lambda_schedule_enable.name
+  target_id = "resource_scheduler-enable"
+  arn       = aws_lambda_function.resource_scheduler_lambda.arn
+
+  input = jsonencode({
+    ACTION = "enable"
+  })
+}
+
+
+# Permission for CloudWatch to Invoke the Lambda Function
+resource "aws_lambda_permission" "allow_cloudwatch_enable" {
+  provider      = aws.Blue
+  statement_id  = "AllowExecutionFromCloudWatchEnabled"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.resource_scheduler_lambda.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lambda_schedule_enable.arn
+}
+
+
+# CloudWatch Event Rule для ACTION=prewarm (щохвилини перед цільовим часом)
+resource "aws_cloudwatch_event_rule" "lambda_schedule_prewarm" {
+  provider            = aws.Blue
+  name                = "resource_scheduler-prewarm-schedule"
+  description         = "Trigger Lambda function to pre-warm slow resources every minute 3:00-5:59 UTC"
+  schedule_expression = "cron(* 3-5 * * ? *)"
+  state               = "ENABLED"
+}
+
+
+# CloudWatch Event Target для ACTION=prewarm
+resource "aws_cloudwatch_event_target" "trigger_lambda_prewarm" {
+  provider  = aws.Blue
+  rule      = aws_cloudwatch_event_rule.lambda_schedule_prewarm.name
+  target_id = "resource_scheduler-prewarm"
+  arn       = aws_lambda_function.resource_scheduler_lambda.arn
+
+  input = jsonencode({
+    ACTION = "prewarm"
+  })
+}
+
+
+# Permission for CloudWatch to Invoke the Lambda Function
+resource "aws_lambda_permission" "allow_cloudwatch_prewarm" {
+  provider      = aws.Blue
+  statement_id  = "AllowExecutionFromCloudWatchPrewarm"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.resource_scheduler_lambda.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lambda_schedule_prewarm.arn
+}
+
+
+# CloudWatch Event Rule для ACTION=disable
+resource "aws_cloudwatch_event_rule" "lambda_schedule_disable" {
+  provider            = aws.Blue
+  name                = "resource_scheduler-disable-schedule"
+  description         = "Trigger Lambda function to disable resources daily at 19:00 UTC"
+  schedule_expression = "cron(0 19 * * ? *)"
+  state               = "ENABLED"
+}
+
+
+# CloudWatch Event Target для ACTION=disable
+resource "aws_cloudwatch_event_target" "trigger_lambda_disable" {
+  provider  = aws.Blue
+  rule      = aws_cloudwatch_event_rule.lambda_schedule_disable.name
+  target_id = "resource_scheduler-disable"
+  arn       = aws_lambda_function.resource_scheduler_lambda.arn
+
+  input = jsonencode({
+    ACTION = "disable"
+  })
+}
+
+
+# Permission for CloudWatch to Invoke the Lambda Function
+resource "aws_lambda_permission" "allow_cloudwatch_disable" {
+  provider      = aws.Blue
+  statement_id  = "AllowExecutionFromCloudWatchDisabled"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.resource_scheduler_lambda.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.lambda_schedule_disable.arn
+}
@@ -0,0 +1,32 @@
+import argparse
+import json
+
+from resource_scheduler.config import RESOURCE_TYPES
+
+
+# Локальний запуск планувальника. Решта параметрів береться зі змінних середовища, як у Lambda:
+#   python -m resource_scheduler --region eu-west-1 --action disable --plan
+def main():
+    parser = argparse.ArgumentParser(description='Disable or enable scheduled resources, or show the plan.')
+    parser.add_argument('--region', required=True, help='AWS region')
+    parser.add_argument('--action', choices=['disable', 'enable'], required=True, help='Action to perform')
+    parser.add_argument('--resource-types', nargs='*', default=RESOURCE_TYPES, help='Resource types to manage')
+    parser.add_argument('--plan', action='store_true', help='Only show what would change')
+    args = parser.parse_args()
+
+    # Імпорт тут, щоб `--help` не тягнув boto3
+    from lambda_function import lambda_handler
+
+    event = {
+        'ACTION': args.action,
+        'REGION': args.region,
+        'RESOURCE_TYPES': args.resource_types,
+        'PLAN': args.plan,
+    }
+    response = lambda_handler(event, None)
+    if not args.plan:
+        print(json.dumps(json.loads(response['body']), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+from botocore.exceptions import ClientError
+
+
+# Розбиття списку на частини фіксованого розміру
+def chunked(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+# Виклик для частини ресурсів; при помилці частина ділиться навпіл, щоб один
+# застарілий ID не блокував решту. Повертає (оброблені, невдалі)
+def apply_with_bisect(operation, items):
+    try:
+        operation(items)
+        return list(items), []
+    except ClientError as e:
+        if len(items) == 1:
+            print(f'Failed for {items[0]}: {e}')
+            return [], list(items)
+    middle = len(items) // 2
+    done_left, failed_left = apply_with_bisect(operation, items[:middle])
+    done_right, failed_right = apply_with_bisect(operation, items[middle:])
+    return done_left + done_right, failed_left + failed_right
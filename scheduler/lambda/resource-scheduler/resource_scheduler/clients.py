@@ -0,0 +1,35 @@
+import threading
+
+import boto3
+from botocore.config import Config
+
+from resource_scheduler import metrics
+
+
+# Клієнти живуть на рівні модуля, тому теплий контейнер Lambda
+# повторно використовує їх разом з відкритими TLS-з'єднаннями
+_CLIENTS = {}
+_LOCK = threading.Lock()
+
+CLIENT_CONFIG = Config(
+    retries={'max_attempts': 10, 'mode': 'adaptive'},
+    max_pool_connections=50
+)
+
+
+# Отримання (або ліниве створення) клієнта для сервісу в регіоні
+def get_client(service, region):
+    key = (service, region)
+    client = _CLIENTS.get(key)
+    if client is None:
+        with _LOCK:
+            client = _CLIENTS.get(key)
+            if client is None:
+                client = metrics.instrument(boto3.client(service, region_name=region, config=CLIENT_CONFIG))
+                _CLIENTS[key] = client
+    return client
+
+
+# Кількість вже створених клієнтів (для звіту про холодний/теплий старт)
+def cached_client_count():
+    return len(_CLIENTS)
@@ -0,0 +1,71 @@
+import json
+import os
+
+
+RESOURCE_TYPES = ['rds', 'eks', 'asg', 'ec2']
+
+
+# Парсинг списку, переданого як список, JSON-рядок або рядок через кому
+def parse_list(value):
+    if isinstance(value, list):
+        return value
+    elif isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return [item.strip() for item in value.split(',') if item.strip()]
+    else:
+        return []
+
+
+# Парсинг словника, переданого як словник або JSON-рядок
+def parse_dict(value):
+    if isinstance(value, dict):
+        return value
+    elif isinstance(value, str) and value.strip():
+        return json.loads(value)
+    else:
+        return {}
+
+
+# Значення параметра з події або змінних середовища
+def get_setting(event, name, default=None):
+    return event.get(name, os.environ.get(name, default))
+
+
+# Збір конфігурації запуску з події та змінних середовища
+def load_config(event):
+    return {
+        'action': get_setting(event, 'ACTION', 'enable').lower(),
+        'plan': str(get_setting(event, 'PLAN', 'false')).lower() == 'true',
+        'track_convergence': str(get_setting(event, 'TRACK_CONVERGENCE', 'false')).lower() == 'true',
+        'region': get_setting(event, 'REGION', 'eu-central-1'),
+        'resource_types': parse_list(get_setting(event, 'RESOURCE_TYPES', RESOURCE_TYPES)),
+        'excluded_asgs': parse_list(get_setting(event, 'EXCLUDED_ASGS', [])),
+        'asg_scale_down_mode': get_setting(event, 'ASG_SCALE_DOWN_MODE', 'terminate'),
+        'asg_warm_pool_state': get_setting(event, 'ASG_WARM_POOL_STATE', 'Stopped'),
+        'ec2_instances': parse_list(get_setting(event, 'EC2_INSTANCES', [])),
+        'excluded_ec2_instances': parse_list(get_setting(event, 'EXCLUDED_EC2_INSTANCES', [])),
+        'ec2_hibernate': str(get_setting(event, 'EC2_HIBERNATE', 'false')).lower() == 'true',
+        'rds_instances': parse_list(get_setting(event, 'RDS_INSTANCES', [])),
+        'excluded_rds_instances': parse_list(get_setting(event, 'EXCLUDED_RDS_INSTANCES', [])),
+        'cluster_name': get_setting(event, 'CLUSTER_NAME', 'dev-1-30'),
+        'excluded_nodegroups': parse_list(get_setting(event, 'EXCLUDED_NODEGROUPS', [])),
+        # Тег розкладу: EC2/RDS з тегом додаються до списків вище,
+        # а ASG та Node Groups обираються лише за тегом замість усіх
+        'schedule_tag_key': get_setting(event, 'SCHEDULE_TAG_KEY'),
+        'schedule_tag_values': parse_list(get_setting(event, 'SCHEDULE_TAG_VALUES', [])),
+        # Залежності для включення, наприклад {"eks": ["rds"], "asg": ["eks"]}
+        'dependencies': parse_dict(get_setting(event, 'DEPENDENCIES', {})),
+        # Прогрів: ресурси мають бути готові до PREWARM_TARGET_TIME (UTC)
+        'prewarm_target_time': get_setting(event, 'PREWARM_TARGET_TIME', '05:30'),
+        'prewarm_types': parse_list(get_setting(event, 'PREWARM_TYPES', ['rds', 'eks'])),
+        'prewarm_percentile': float(get_setting(event, 'PREWARM_PERCENTILE', 90)),
+        'prewarm_margin_s': int(get_setting(event, 'PREWARM_MARGIN_S', 120)),
+        # Включення хвилями: STAGGER_WAVE_SIZE ресурсів кожні STAGGER_WAVE_INTERVAL_S секунд
+        # або з темпом STAGGER_RATE ресурсів/с. 0 в обох - усі ресурси одночасно
+        'stagger_types': parse_list(get_setting(event, 'STAGGER_TYPES', ['ec2', 'asg', 'eks'])),
+        'stagger_wave_size': int(get_setting(event, 'STAGGER_WAVE_SIZE', 0)),
+        'stagger_wave_interval_s': float(get_setting(event, 'STAGGER_WAVE_INTERVAL_S', 30)),
+        'stagger_rate': float(get_setting(event, 'STAGGER_RATE', 0)),
+    }
@@ -0,0 +1,81 @@
+import json
+import os
+
+from resource_scheduler import metrics
+from resource_scheduler.clients import get_client
+
+
+# Запас часу (мс) до таймауту, при якому решта роботи передається новому виклику
+TIME_RESERVE_MS = int(os.environ.get('TIME_RESERVE_MS', 10000))
+# Обмеження ланцюжка самовикликів, щоб уникнути нескінченного циклу. Виклики, що лише чекали
+# готовності рівня, не враховуються: їх кількість і так обмежена LEVEL_TIMEOUT_S кожного рівня
+MAX_CONTINUATIONS = int(os.environ.get('MAX_CONTINUATIONS', 50))
+# Префікс параметра курсора; курсор кожної дії окремий (/scheduler/cursor/enable тощо), щоб prewarm,
+# що працює щохвилини, не перезаписав курсор ланцюжка enable, який виконується в той самий час
+CURSOR_PARAMETER = '/scheduler/cursor'
+
+
+# Чи залишилось часу менше, ніж потрібно для безпечного завершення
+def out_of_time(context):
+    return context is not None and context.get_remaining_time_in_millis() < TIME_RESERVE_MS
+
+
+# Чи можна почекати вказану кількість секунд і залишитись у межах запасу часу
+def can_wait(context, seconds):
+    return context is None or context.get_remaining_time_in_millis() - seconds * 1000 >= TIME_RESERVE_MS
+
+
+# Стислий вигляд курсора для SSM: списки ресурсів замінюються їх кількістю
+def summarize(cursor):
+    if not cursor:
+        return cursor
+    summary = {key: value for key, value in cursor.items() if key not in ('changed', 'tracking', 'stagger')}
+    if 'changed' in cursor:
+        summary['changed'] = {t: len(ids) for t, ids in cursor['changed'].items()}
+    if 'tracking' in cursor:
+        summary['pending'] = {t: len(ids) for t, ids in cursor['tracking']['pending'].items()}
+    if 'stagger' in cursor:
+        summary['stagger'] = {'started_waves': cursor['stagger']['next'], 'waves': len(cursor['stagger']['waves'])}
+    return summary
+
+
+# Збереження курсора (тип ресурсу та перший необроблений ресурс) в SSM
+def save_cursor(region, action, cursor, continuation, status=None):
+    value = {
+        'action': action,
+        'cursor': summarize(cursor),
+        'continuation': continuation,
+        'status': status or ('in_progress' if cursor else 'completed')
+    }
+    get_client('ssm', region).put_parameter(
+        Name=f'{CURSOR_PARAMETER}/{action}',
+        Value=json.dumps(value),
+        Type='String',
+        Tier='Intelligent-Tiering',
+        Overwrite=True
+    )
+
+
+# Асинхронний самовиклик Lambda з курсором
+def continue_in_new_invocation(context, event, cursor, continuation, waits):
+    payload = dict(event, CURSOR=cursor, CONTINUATION=continuation, WAITS=waits)
+    region = context.invoked_function_arn.split(':')[3]
+    get_client('lambda', region).invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(payload)
+    )
+    print(f'Time is running out. Continuing from {cursor} in invocation #{continuation}.')
+
+
+# Збереження курсора і передача решти роботи новому виклику
+def hand_off(context, event, region, action, cursor, continuation, waiting=False):
+    waits = event.get('WAITS', 0) + (1 if waiting else 0)
+    if continuation - waits < MAX_CONTINUATIONS:
+        save_cursor(region, action, cursor, continuation + 1)
+        continue_in_new_invocation(context, event, cursor, continuation + 1, waits)
+    else:
+        # Незавершена дія не має зникати тихо: статус у SSM і метрика для алерту
+        save_cursor(region, action, cursor, continuation + 1, status='exhausted')
+        metrics.add('ContinuationsExhausted', resource_type=metrics.DEFAULT_RESOURCE_TYPE)
+        print(f'ERROR: Reached {MAX_CONTINUATIONS} continuations. Stopped at {cursor}, cursor saved to SSM.')
@@ -0,0 +1,114 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resource_scheduler import continuation, metrics
+from resource_scheduler.history import percentile
+from resource_scheduler.plugins import load_plugin
+
+
+POLL_INITIAL_DELAY_S = 2
+POLL_MAX_DELAY_S = 20
+# Ресурси, що не досягли цільового стану за цей час, позначаються як такі, що не зійшлися
+CONVERGENCE_TIMEOUT_S = int(os.environ.get('CONVERGENCE_TIMEOUT_S', 1800))
+
+
+def get_pending(resource_type, ids, action, config):
+    with metrics.resource_scope(resource_type):
+        return load_plugin(resource_type).get_pending(config['region'], ids, action, config)
+
+
+# Ресурси, що ще не досягли цільового стану, по всіх типах паралельно.
+# Кожен плагін перевіряє свій набір мінімальною кількістю пакетних describe
+def pending_resources(targets, action, config):
+    targets = {t: ids for t, ids in targets.items() if ids}
+    if not targets:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        futures = {
+            resource_type: executor.submit(get_pending, resource_type, ids, action, config)
+            for resource_type, ids in targets.items()
+        }
+    pending = {resource_type: future.result() for resource_type, future in futures.items()}
+    return {resource_type: ids for resource_type, ids in pending.items() if ids}
+
+
+# Новий стан відстеження для змінених ресурсів
+def new_tracking(changed, started_at):
+    return {
+        'started_at': started_at,
+        'pending': {t: list(ids) for t, ids in changed.items() if ids},
+        'converged': {},
+    }
+
+
+# Перенесення ресурсів, що зійшлися, з pending у converged з часом від початку запуску
+def update_tracking(tracking, pending):
+    elapsed = round(time.time() - tracking['started_at'], 1)
+    for resource_type, ids in tracking['pending'].items():
+        still_pending = set(pending.get(resource_type, []))
+        converged = tracking['converged'].setdefault(resource_type, {})
+        converged.update({rid: elapsed for rid in ids if rid not in still_pending})
+        tracking['pending'][resource_type] = [rid for rid in ids if rid in still_pending]
+    tracking['pending'] = {t: ids for t, ids in tracking['pending'].items() if ids}
+
+
+# Опитування з експоненційною затримкою до сходження всіх ресурсів або таймауту.
+# Повертає False, якщо час виклику Lambda вичерпано і відстеження треба продовжити
+def track(tracking, action, config, context):
+    delay = POLL_INITIAL_DELAY_S
+    while True:
+        update_tracking(tracking, pending_resources(tracking['pending'], action, config))
+        if not tracking['pending']:
+            return True
+        if time.time() - tracking['started_at'] > CONVERGENCE_TIMEOUT_S:
+            return True
+        if not continuation.can_wait(context, delay):
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_DELAY_S)
+
+
+# Час досягнення цільового стану по групах ресурсів (напр. ec2: hibernate/stop)
+def group_times(groups, converged):
+    result = {}
+    for group, ids in groups.items():
+        times = [converged[rid] for rid in ids if rid in converged]
+        if times:
+            result[group] = {'converged': len(times), 'p50_s': percentile(times, 50), 'max_s': max(times)}
+    return result
+
+
+# Звіт: час досягнення цільового стану по ресурсах, типах та загалом.
+# Для типів із кількома режимами вимкнення (asg, ec2) у звіті вказується режим або групи
+def report(tracking, action, config):
+    by_type = {}
+    for resource_type in set(tracking['converged']) | set(tracking['pending']):
+        times = list(tracking['converged'].get(resource_type, {}).values())
+        plugin = load_plugin(resource_type)
+        by_type[resource_type] = {
+            'converged': len(times),
+            'not_converged': tracking['pending'].get(resource_type, []),
+            'p50_s': percentile(times, 50) if times else None,
+            'p90_s': percentile(times, 90) if times else None,
+            'max_s': max(times) if times else None,
+        }
+        if hasattr(plugin, 'scale_down_mode'):
+            by_type[resource_type]['mode'] = plugin.scale_down_mode(config)
+        if hasattr(plugin, 'resource_groups') and times:
+            by_type[resource_type]['groups'] = group_times(
+                plugin.resource_groups(config['region'], list(tracking['converged'][resource_type]), config),
+                tracking['converged'][resource_type])
+    all_times = [s for times in tracking['converged'].values() for s in times.values()]
+    result = {
+        'action': action,
+        'resources': tracking['converged'],
+        'by_type': by_type,
+        'time_to_target_state_s': max(all_times) if all_times else 0,
+        'not_converged': sum(len(ids) for ids in tracking['pending'].values()),
+    }
+    for resource_type, ids in tracking['pending'].items():
+        print(f'WARNING: {len(ids)} {resource_type} resources did not reach the target state: {ids}')
+    print(json.dumps({'convergence_report': result}))
+    return result
@@ -0,0 +1,52 @@
+from resource_scheduler.clients import get_client
+
+
+# Типи ресурсів у термінах Resource Groups Tagging API
+RESOURCE_TYPE_FILTERS = {
+    'asg': 'autoscaling:autoScalingGroup',
+    'ec2': 'ec2:instance',
+    'eks': 'eks:nodegroup',
+    'rds': 'rds:db',
+}
+
+
+# Розбір ARN у (тип ресурсу, ідентифікатор). Для Node Group ідентифікатор - (кластер, назва)
+def parse_arn(arn):
+    service, resource = arn.split(':', 5)[2], arn.split(':', 5)[5]
+    if service == 'ec2':
+        # arn:aws:ec2:<region>:<account>:instance/i-0123456789abcdef0
+        return 'ec2', resource.split('/', 1)[1]
+    if service == 'rds':
+        # arn:aws:rds:<region>:<account>:db:<db-instance-id>
+        return 'rds', resource.split(':', 1)[1]
+    if service == 'autoscaling':
+        # arn:aws:autoscaling:<region>:<account>:autoScalingGroup:<uuid>:autoScalingGroupName/<name>
+        return 'asg', resource.split('autoScalingGroupName/', 1)[1]
+    if service == 'eks':
+        # arn:aws:eks:<region>:<account>:nodegroup/<cluster>/<nodegroup>/<uuid>
+        _, cluster_name, nodegroup_name, _ = resource.split('/', 3)
+        return 'eks', (cluster_name, nodegroup_name)
+    return None, None
+
+
+# Пошук ресурсів з тегом розкладу одним пагінованим проходом по регіону.
+# Фільтрація за тегом і типом відбувається на стороні AWS
+def discover_tagged_resources(region, tag_key, tag_values, resource_types):
+    type_filters = [RESOURCE_TYPE_FILTERS[t] for t in resource_types if t in RESOURCE_TYPE_FILTERS]
+    discovered = {resource_type: [] for resource_type in resource_types}
+    if not type_filters:
+        return discovered
+
+    tag_filter = {'Key': tag_key}
+    if tag_values:
+        tag_filter['Values'] = tag_values
+
+    paginator = get_client('resourcegroupstaggingapi', region).get_paginator('get_resources')
+    for page in paginator.paginate(TagFilters=[tag_filter], ResourceTypeFilters=type_filters):
+        for mapping in page['ResourceTagMappingList']:
+            resource_type, resource_id = parse_arn(mapping['ResourceARN'])
+            if resource_type in discovered:
+                discovered[resource_type].append(resource_id)
+
+    print(f'Discovered by tag {tag_key}: ' + ', '.join(f'{t}={len(ids)}' for t, ids in discovered.items()))
+    return discovered
@@ -0,0 +1,53 @@
+import json
+import math
+
+from resource_scheduler.clients import get_client
+
+
+# Історія тривалостей старту (від запуску до готовності) зберігається в SSM,
+# окремий параметр на ресурс: /scheduler/startup-history/<тип>/<ресурс>
+HISTORY_PREFIX = '/scheduler/startup-history'
+HISTORY_SIZE = 20
+
+
+# Шлях до історії типу ресурсів (для Node Groups - в розрізі кластера)
+def history_path(resource_type, config):
+    if resource_type == 'eks':
+        return f'{HISTORY_PREFIX}/eks/{config["cluster_name"]}'
+    return f'{HISTORY_PREFIX}/{resource_type}'
+
+
+# Завантаження історії всіх ресурсів типу: {ресурс: [секунди, ...]}
+def load_history(region, resource_type, config):
+    paginator = get_client('ssm', region).get_paginator('get_parameters_by_path')
+    history = {}
+    for page in paginator.paginate(Path=history_path(resource_type, config)):
+        for parameter in page['Parameters']:
+            history[parameter['Name'].rsplit('/', 1)[1]] = json.loads(parameter['Value'])
+    return history
+
+
+# Додавання нових вимірів до ковзного вікна історії
+def record_durations(region, resource_type, durations, config, history=None):
+    if not durations:
+        return
+    if history is None:
+        history = load_history(region, resource_type, config)
+    ssm_client = get_client('ssm', region)
+    for resource_id, seconds in durations.items():
+        samples = (history.get(resource_id, []) + [round(seconds)])[-HISTORY_SIZE:]
+        history[resource_id] = samples
+        ssm_client.put_parameter(
+            Name=f'{history_path(resource_type, config)}/{resource_id}',
+            Value=json.dumps(samples),
+            Type='String',
+            Overwrite=True
+        )
+        print(f'{resource_type} {resource_id} became ready in {round(seconds)}s (history: {len(samples)} runs).')
+
+
+# Перцентиль вибірки методом найближчого рангу
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Метрики виводяться в лог у CloudWatch Embedded Metric Format (EMF):
+# CloudWatch Logs сам перетворює такі рядки на метрики без виклику PutMetricData
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ResourceScheduler')
+# Виклики поза обробкою конкретного типу ресурсів (курсор, Tagging API, самовиклик)
+DEFAULT_RESOURCE_TYPE = 'scheduler'
+# Сумарні метрики за весь виклик
+TOTAL_RESOURCE_TYPE = 'all'
+THROTTLE_ERROR_CODES = (
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottled',
+    'RequestThrottledException', 'RequestLimitExceeded', 'TooManyRequestsException',
+    'ProvisionedThroughputExceededException', 'SlowDown',
+)
+UNITS = {
+    'Duration': 'Milliseconds',
+    'ResourcesProcessed': 'Count',
+    'ApiCalls': 'Count',
+    'Throttles': 'Count',
+    'ApiFailures': 'Count',
+    'ContinuationsExhausted': 'Count',
+}
+
+_counters = {}
+_lock = threading.Lock()
+_scope = threading.local()
+
+
+# Тип ресурсу, до якого відносяться виклики API в поточному потоці
+def current_resource_type():
+    return getattr(_scope, 'resource_type', None) or DEFAULT_RESOURCE_TYPE
+
+
+# Віднесення викликів API в межах блоку (у поточному потоці) до типу ресурсу
+@contextmanager
+def resource_scope(resource_type):
+    previous = getattr(_scope, 'resource_type', None)
+    _scope.resource_type = resource_type
+    try:
+        yield
+    finally:
+        _scope.resource_type = previous
+
+
+# Час виконання блоку як Duration кожного з типів ресурсів (типи одного рівня обробляються разом)
+@contextmanager
+def timed(*resource_types):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        for resource_type in resource_types:
+            add('Duration', elapsed_ms, resource_type)
+
+
+def add(name, value=1, resource_type=None):
+    resource_type = resource_type or current_resource_type()
+    with _lock:
+        counters = _counters.setdefault(resource_type, {})
+        counters[name] = counters.get(name, 0) + value
+
+
+# Обробники подій botocore: рахують виклики, тротлінг і помилки без додаткових запитів
+def _on_before_call(**kwargs):
+    add('ApiCalls')
+
+
+def _on_needs_retry(response=None, **kwargs):
+    # Викликається для кожної спроби, зокрема повторних після тротлінгу
+    if response is not None:
+        code = response[1].get('Error', {}).get('Code')
+        if code in THROTTLE_ERROR_CODES:
+            add('Throttles')
+
+
+def _on_after_call(http_response=None, **kwargs):
+    if http_response is not None and http_response.status_code >= 400:
+        add('ApiFailures')
+
+
+def _on_after_call_error(**kwargs):
+    add('ApiFailures')
+
+
+# Підключення лічильників до клієнта boto3 (один раз при створенні клієнта)
+def instrument(client):
+    events = client.meta.events
+    events.register('before-call', _on_before_call)
+    events.register('needs-retry', _on_needs_retry)
+    events.register('after-call', _on_after_call)
+    events.register('after-call-error', _on_after_call_error)
+    return client
+
+
+def emf_record(resource_type, region, action, values, timestamp):
+    return {
+        '_aws': {
+            'Timestamp': timestamp,
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [['ResourceType', 'Region', 'Action']],
+                'Metrics': [{'Name': name, 'Unit': UNITS[name]} for name in values],
+            }],
+        },
+        'ResourceType': resource_type,
+        'Region': region,
+        'Action': action,
+        **values,
+    }
+
+
+# Вивід метрик виклику: рядок на кожен тип ресурсу та сумарний. Лічильники скидаються,
+# щоб теплий контейнер не змішував виклики
+def emit(region, action, duration_ms):
+    with _lock:
+        counters = dict(_counters)
+        _counters.clear()
+
+    totals = {name: 0 for name in UNITS if name != 'Duration'}
+    for values in counters.values():
+        for name in totals:
+            totals[name] += values.get(name, 0)
+    totals['Duration'] = duration_ms
+
+    timestamp = int(time.time() * 1000)
+    for resource_type, values in sorted(counters.items()):
+        print(json.dumps(emf_record(resource_type, region, action, values, timestamp)))
+    print(json.dumps(emf_record(TOTAL_RESOURCE_TYPE, region, action, totals, timestamp)))
+    return counters
@@ -0,0 +1,159 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
+
+from resource_scheduler import continuation, convergence, metrics, stagger
+from resource_scheduler.batching import chunked
+from resource_scheduler.plan import planned_targets
+from resource_scheduler.plugins import load_plugin
+
+
+MAX_WORKERS = int(os.environ.get('MAX_WORKERS', 16))
+POLL_INITIAL_DELAY_S = 2
+POLL_MAX_DELAY_S = 20
+# Після цього часу рівень вважається завершеним, навіть якщо не всі ресурси готові
+LEVEL_TIMEOUT_S = int(os.environ.get('LEVEL_TIMEOUT_S', 1800))
+# Скільки неготових ресурсів зберігати у звіті (курсор має обмежений розмір)
+NOT_READY_REPORT_LIMIT = 20
+
+
+# Розбиття типів ресурсів на рівні за залежностями (топологічне сортування)
+def build_levels(resource_types, dependencies):
+    remaining = {t: {d for d in dependencies.get(t, []) if d in resource_types} for t in resource_types}
+    levels = []
+    while remaining:
+        level = sorted(t for t, deps in remaining.items() if not deps)
+        if not level:
+            raise ValueError(f'Circular dependency between resource types: {sorted(remaining)}')
+        levels.append(level)
+        for resource_type in level:
+            del remaining[resource_type]
+        for deps in remaining.values():
+            deps.difference_update(level)
+    return levels
+
+
+# Запуск однієї частини ресурсів. Повертає перший ресурс, якщо не встигли почати
+def start_batch(resource_type, plugin, region, batch, config, context):
+    if continuation.out_of_time(context):
+        return batch[0]
+    with metrics.resource_scope(resource_type):
+        try:
+            plugin.enable(region, batch, config)
+            metrics.add('ResourcesProcessed', len(batch))
+        except ClientError as e:
+            print(f'Error processing {batch}: {e}')
+    return None
+
+
+# Паралельний запуск усіх типів ресурсів рівня. Повертає курсори незапущених ресурсів
+def start_level(level, targets, config, context, pending):
+    futures = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for resource_type in level:
+            if pending is not None and resource_type not in pending:
+                continue
+            plugin = load_plugin(resource_type)
+            resume_from = pending.get(resource_type) if pending else None
+            type_targets = [t for t in targets[resource_type] if resume_from is None or t >= resume_from]
+            with metrics.resource_scope(resource_type):
+                type_targets = planned_targets(plugin, config['region'], type_targets, 'enable', config)
+            for batch in chunked(type_targets, plugin.BATCH_SIZE):
+                future = executor.submit(start_batch, resource_type, plugin, config['region'], batch, config, context)
+                futures.append((resource_type, future))
+
+    not_started = {}
+    for resource_type, future in futures:
+        first = future.result()
+        if first is not None:
+            not_started[resource_type] = min(not_started.get(resource_type, first), first)
+    return not_started
+
+
+# Очікування готовності рівня з експоненційною затримкою між перевірками.
+# Повертає (завершено, неготові ресурси); False означає, що час виклику вичерпано
+def wait_for_level(level, targets, config, context, level_started):
+    delay = POLL_INITIAL_DELAY_S
+    while True:
+        not_ready = convergence.pending_resources({t: targets[t] for t in level}, 'enable', config)
+        if not not_ready:
+            return True, {}
+        if time.time() - level_started > LEVEL_TIMEOUT_S:
+            print(f'Level {level} did not become ready in {LEVEL_TIMEOUT_S}s: {not_ready}')
+            return True, not_ready
+        if not continuation.can_wait(context, delay):
+            return False, not_ready
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_DELAY_S)
+
+
+# Включення ресурсів рівнями за залежностями.
+# Повертає стан для наступного виклику, якщо не встигли завершити
+def run(config, context, state=None):
+    levels = build_levels(config['resource_types'], config['dependencies'])
+    if state is None:
+        state = {'level': 0, 'phase': 'start', 'pending': None, 'started_at': time.time(), 'levels': []}
+        print(f'Enable levels: {levels}')
+    # Виклик, що продовжив очікування рівня і не дочекався, лише чекав (не враховується в ліміт)
+    waiting_level = state['level'] if state['phase'] == 'wait' else None
+    state.pop('waiting', None)
+
+    while state['level'] < len(levels):
+        index = state['level']
+        level = levels[index]
+        # Час рівня в цьому виклику (запуск і очікування готовності) - Duration кожного його типу
+        with metrics.timed(*level):
+            targets = {}
+            for resource_type in level:
+                with metrics.resource_scope(resource_type):
+                    targets[resource_type] = load_plugin(resource_type).get_targets(config['region'], config)
+
+            if state['phase'] == 'start':
+                if state['pending'] is None:
+                    state['level_started'] = time.time()
+                    print(f'Level {index}: starting {level}')
+                # Типи, що включаються хвилями, запускаються окремо після решти типів рівня
+                immediate = [t for t in level if not stagger.applies(t, config)]
+                not_started = start_level(immediate, targets, config, context, state['pending'])
+                if not_started:
+                    state['pending'] = not_started
+                    return state
+                staggered = len(immediate) < len(level)
+                state.update(phase='stagger' if staggered else 'wait', pending=None)
+
+            if state['phase'] == 'stagger':
+                if 'stagger' not in state:
+                    state['stagger'] = stagger.new_state(
+                        {t: targets[t] for t in level if stagger.applies(t, config)}, config)
+                if not stagger.run(state['stagger'], config, context):
+                    return state
+                state['level_waves'] = stagger.report(state.pop('stagger'), config)['waves']
+                state['phase'] = 'wait'
+
+            ready, not_ready = wait_for_level(level, targets, config, context, state['level_started'])
+            if not ready:
+                state['waiting'] = index == waiting_level
+                return state
+
+            record = {
+                'level': index,
+                'resource_types': level,
+                'resources': sum(len(ids) for ids in targets.values()),
+                'time_to_ready_s': round(time.time() - state['level_started'], 1),
+                'not_ready': {t: ids[:NOT_READY_REPORT_LIMIT] for t, ids in not_ready.items()},
+            }
+            if 'level_waves' in state:
+                record['waves'] = state.pop('level_waves')
+            print(f'Level {index} ready in {record["time_to_ready_s"]}s: {level}')
+            state['levels'].append(record)
+            state.update(level=index + 1, phase='start')
+
+    report = {
+        'levels': state['levels'],
+        'total_time_to_ready_s': round(time.time() - state['started_at'], 1),
+    }
+    print(json.dumps({'orchestration_report': report}))
+    return None
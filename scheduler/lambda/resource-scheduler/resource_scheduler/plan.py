@@ -0,0 +1,29 @@
+from resource_scheduler.plugins import load_plugin
+
+
+# Ідентифікатори ресурсів, для яких потрібна зміна (знімок стану одним пакетом)
+def planned_targets(plugin, region, targets, action, config):
+    if not targets:
+        return []
+    return [change['id'] for change in plugin.plan(region, targets, action, config)]
+
+
+# План змін для всіх типів ресурсів: {тип: [{'id', 'current', 'desired'}, ...]}
+def build_plan(config, resource_types):
+    plan = {}
+    for resource_type in resource_types:
+        plugin = load_plugin(resource_type)
+        targets = plugin.get_targets(config['region'], config)
+        plan[resource_type] = plugin.plan(config['region'], targets, config['action'], config) if targets else []
+    return plan
+
+
+# Текстове представлення плану
+def format_plan(plan):
+    lines = []
+    for resource_type, changes in plan.items():
+        for change in changes:
+            lines.append(f'~ {resource_type} {change["id"]}: {change["current"]} -> {change["desired"]}')
+    total = sum(len(changes) for changes in plan.values())
+    lines.append(f'Plan: {total} to change (' + ', '.join(f'{t}={len(c)}' for t, c in plan.items()) + ').')
+    return '\n'.join(lines)
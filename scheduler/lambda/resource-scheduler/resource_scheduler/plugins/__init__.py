@@ -0,0 +1,25 @@
+import importlib
+import time
+
+
+# Плагіни імпортуються ліниво: виклик для одного типу ресурсів
+# не платить за імпорт і ініціалізацію решти
+PLUGIN_MODULES = {
+    'asg': 'resource_scheduler.plugins.asg',
+    'ec2': 'resource_scheduler.plugins.ec2',
+    'eks': 'resource_scheduler.plugins.eks',
+    'rds': 'resource_scheduler.plugins.rds',
+}
+
+# Час імпорту кожного плагіна (мс) для звіту про старт
+IMPORT_TIMES_MS = {}
+
+
+# Завантаження плагіна для типу ресурсів
+def load_plugin(resource_type):
+    if resource_type not in PLUGIN_MODULES:
+        raise ValueError(f'Unknown resource type: {resource_type}')
+    started = time.perf_counter()
+    module = importlib.import_module(PLUGIN_MODULES[resource_type])
+    IMPORT_TIMES_MS.setdefault(resource_type, round((time.perf_counter() - started) * 1000, 2))
+    return module
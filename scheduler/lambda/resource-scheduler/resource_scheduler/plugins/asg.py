@@ -0,0 +1,134 @@
+import json
+
+from resource_scheduler.batching import chunked
+from resource_scheduler.clients import get_client
+
+
+# Кількість ASG, що обробляються між перевірками залишку часу
+BATCH_SIZE = 1
+
+
+# Отримання активних ASG, виключаючи ті, що в списку виключень
+def get_targets(region, config):
+    if 'discovered' in config:
+        return sorted(asg for asg in config['discovered'].get('asg', []) if asg not in config['excluded_asgs'])
+    paginator = get_client('autoscaling', region).get_paginator('describe_auto_scaling_groups')
+    targets = []
+    for page in paginator.paginate():
+        targets.extend(asg['AutoScalingGroupName'] for asg in page['AutoScalingGroups']
+                       if asg['AutoScalingGroupName'] not in config['excluded_asgs'])
+    return sorted(targets)
+
+
+# Режим вимкнення ASG: terminate (масштабування до 0) або warm-pool
+def scale_down_mode(config):
+    return config['asg_scale_down_mode']
+
+
+# Warm pool для паркування інстансів: при scale-in вони зупиняються і повертаються в пул
+# (ReuseOnScaleIn) замість завершення. MaxGroupPreparedCapacity = поточна DesiredCapacity,
+# щоб вночі в пулі було рівно стільки інстансів, скільки працювало, а вдень - жодного
+def put_warm_pool(asg_client, asg_name, desired_capacity, config):
+    asg_client.put_warm_pool(
+        AutoScalingGroupName=asg_name,
+        MaxGroupPreparedCapacity=desired_capacity,
+        MinSize=0,
+        PoolState=config['asg_warm_pool_state'],
+        InstanceReusePolicy={'ReuseOnScaleIn': True}
+    )
+
+
+# Збереження конфігурації ASG в SSM та масштабування до 0
+def disable(region, targets, config):
+    asg_client = get_client('autoscaling', region)
+    ssm_client = get_client('ssm', region)
+    response = asg_client.describe_auto_scaling_groups(AutoScalingGroupNames=targets)
+    for asg in response['AutoScalingGroups']:
+        asg_name = asg['AutoScalingGroupName']
+        ssm_client.put_parameter(
+            Name=f'/asg/{asg_name}/scalingConfig',
+            Value=json.dumps([asg['MinSize'], asg['MaxSize'], asg['DesiredCapacity']]),
+            Type='String',
+            Overwrite=True
+        )
+        if scale_down_mode(config) == 'warm-pool' and asg['DesiredCapacity'] > 0:
+            put_warm_pool(asg_client, asg_name, asg['DesiredCapacity'], config)
+        asg_client.update_auto_scaling_group(
+            AutoScalingGroupName=asg_name,
+            MinSize=0,
+            MaxSize=asg['MaxSize'],  # Залишаємо maxSize без змін
+            DesiredCapacity=0
+        )
+        print(f'ASG {asg_name} scaled down to 0 instances ({scale_down_mode(config)} mode).')
+
+
+# Включення ASG з параметрами з SSM. У режимі warm-pool ASG спершу бере зупинені інстанси з пулу
+def enable(region, targets, config):
+    asg_client = get_client('autoscaling', region)
+    ssm_client = get_client('ssm', region)
+    for asg_name in targets:
+        try:
+            response = ssm_client.get_parameter(Name=f'/asg/{asg_name}/scalingConfig')
+            min_size, max_size, desired_capacity = json.loads(response['Parameter']['Value'])
+        except ssm_client.exceptions.ParameterNotFound:
+            print(f'No scaling config found in SSM for {asg_name}. Skipping.')
+            continue
+
+        asg_client.update_auto_scaling_group(
+            AutoScalingGroupName=asg_name,
+            MinSize=min_size,
+            MaxSize=max_size,
+            DesiredCapacity=desired_capacity
+        )
+        print(f'ASG {asg_name} scaled up with saved parameters.')
+
+
+# Чи досягла ASG цільового стану: без інстансів після вимкнення (інстанси warm pool
+# не входять у Instances), або з DesiredCapacity інстансів InService після включення
+def is_converged(asg, action):
+    if action == 'disable':
+        return not asg['Instances']
+    in_service = sum(1 for inst in asg['Instances'] if inst['LifecycleState'] == 'InService')
+    return in_service >= asg['DesiredCapacity']
+
+
+# ASG, які ще не досягли цільового стану (один describe на 100 груп)
+def get_pending(region, targets, action, config):
+    paginator = get_client('autoscaling', region).get_paginator('describe_auto_scaling_groups')
+    pending = []
+    for chunk in chunked(targets, 100):
+        for page in paginator.paginate(AutoScalingGroupNames=chunk):
+            pending.extend(asg['AutoScalingGroupName'] for asg in page['AutoScalingGroups']
+                           if not is_converged(asg, action))
+    return pending
+
+
+# Збережені в SSM конфігурації ASG: {назва: [MinSize, MaxSize, DesiredCapacity]}
+def load_saved_configs(region, targets):
+    ssm_client = get_client('ssm', region)
+    saved = {}
+    for chunk in chunked(targets, 10):
+        names = [f'/asg/{asg_name}/scalingConfig' for asg_name in chunk]
+        for parameter in ssm_client.get_parameters(Names=names)['Parameters']:
+            saved[parameter['Name'].split('/')[2]] = json.loads(parameter['Value'])
+    return saved
+
+
+# Мінімальний набір змін: поточна ємність ASG проти бажаної
+def plan(region, targets, action, config):
+    paginator = get_client('autoscaling', region).get_paginator('describe_auto_scaling_groups')
+    current = {}
+    for chunk in chunked(targets, 100):
+        for page in paginator.paginate(AutoScalingGroupNames=chunk):
+            for asg in page['AutoScalingGroups']:
+                current[asg['AutoScalingGroupName']] = [asg['MinSize'], asg['MaxSize'], asg['DesiredCapacity']]
+
+    if action == 'disable':
+        desired = {name: [0, size[1], 0] for name, size in current.items()}
+    else:
+        desired = load_saved_configs(region, list(current))
+
+    return [
+        {'id': name, 'current': current[name], 'desired': desired[name]}
+        for name in sorted(current) if name in desired and current[name] != desired[name]
+    ]
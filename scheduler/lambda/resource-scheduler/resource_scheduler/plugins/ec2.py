@@ -0,0 +1,103 @@
+from botocore.exceptions import ClientError
+
+from resource_scheduler.batching import apply_with_bisect, chunked
+from resource_scheduler.clients import get_client
+
+
+# Кількість інстансів в одному виклику stop_instances/start_instances
+BATCH_SIZE = 100
+# Тег, яким позначається спосіб зупинки інстансу (hibernate/stop) для звіту про час відновлення
+STOP_MODE_TAG = 'scheduler:stop-mode'
+
+
+# Список EC2 інстансів (із конфігурації та знайдених за тегом), за винятком виключених
+def get_targets(region, config):
+    instances = set(config['ec2_instances']) | set(config.get('discovered', {}).get('ec2', []))
+    return sorted(inst for inst in instances if inst not in config['excluded_ec2_instances'])
+
+
+# Опис інстансів (один describe на 200 інстансів)
+def describe_instances(region, targets):
+    paginator = get_client('ec2', region).get_paginator('describe_instances')
+    instances = []
+    for chunk in chunked(targets, 200):
+        for page in paginator.paginate(Filters=[{'Name': 'instance-id', 'Values': chunk}]):
+            for reservation in page['Reservations']:
+                instances.extend(reservation['Instances'])
+    return instances
+
+
+# Зупинка частини інстансів; з EC2_HIBERNATE успішно зупинені позначаються тегом способу зупинки.
+# Помилка тегування не повертається у apply_with_bisect, щоб зупинка не повторювалась
+def stop_batch(ec2_client, ids, mode, config):
+    ec2_client.stop_instances(InstanceIds=ids, Hibernate=mode == 'hibernate')
+    if not config['ec2_hibernate']:
+        return
+    try:
+        ec2_client.create_tags(Resources=ids, Tags=[{'Key': STOP_MODE_TAG, 'Value': mode}])
+    except ClientError as e:
+        print(f'Failed to tag EC2 instances {ids} with {STOP_MODE_TAG}={mode}: {e}')
+
+
+# Зупинка EC2 інстансів. З EC2_HIBERNATE інстанси з HibernationOptions.Configured
+# переходять у гібернацію, решта зупиняються звичайно
+def disable(region, targets, config):
+    ec2_client = get_client('ec2', region)
+    groups = {'hibernate': [], 'stop': list(targets)}
+    if config['ec2_hibernate']:
+        groups = {'hibernate': [], 'stop': []}
+        for inst in describe_instances(region, targets):
+            hibernate = inst.get('HibernationOptions', {}).get('Configured')
+            groups['hibernate' if hibernate else 'stop'].append(inst['InstanceId'])
+
+    for mode, instances in groups.items():
+        if not instances:
+            continue
+        if mode == 'hibernate':
+            done, failed = apply_with_bisect(lambda ids: stop_batch(ec2_client, ids, 'hibernate', config), instances)
+            print(f'Hibernated EC2 instances: {done}')
+            # Інстанси, які не вдалося перевести в гібернацію, зупиняються звичайно
+            if failed:
+                groups['stop'].extend(failed)
+        else:
+            done, failed = apply_with_bisect(lambda ids: stop_batch(ec2_client, ids, 'stop', config), instances)
+            print(f'Stopped EC2 instances: {done}')
+            if failed:
+                print(f'Failed to stop EC2 instances: {failed}')
+
+
+# Запуск EC2 інстансів
+def enable(region, targets, config):
+    ec2_client = get_client('ec2', region)
+    done, failed = apply_with_bisect(lambda ids: ec2_client.start_instances(InstanceIds=ids), targets)
+    print(f'Started EC2 instances: {done}')
+    if failed:
+        print(f'Failed to start EC2 instances: {failed}')
+
+
+# EC2 інстанси, які ще не досягли цільового стану
+def get_pending(region, targets, action, config):
+    target_states = ('stopped', 'terminated') if action == 'disable' else ('running',)
+    return [inst['InstanceId'] for inst in describe_instances(region, targets)
+            if inst['State']['Name'] not in target_states]
+
+
+# Групи для звіту про сходження: як інстанс був зупинений (за тегом STOP_MODE_TAG)
+def resource_groups(region, targets, config):
+    groups = {}
+    for inst in describe_instances(region, targets):
+        tags = {tag['Key']: tag['Value'] for tag in inst.get('Tags', [])}
+        groups.setdefault(tags.get(STOP_MODE_TAG, 'stop'), []).append(inst['InstanceId'])
+    return groups
+
+
+# Мінімальний набір змін: лише інстанси, стан яких відрізняється від бажаного.
+# Інстанси в перехідних станах (pending/stopping) не чіпаємо
+def plan(region, targets, action, config):
+    actionable = ('running',) if action == 'disable' else ('stopped',)
+    desired = 'stopped' if action == 'disable' else 'running'
+    changes = [
+        {'id': inst['InstanceId'], 'current': inst['State']['Name'], 'desired': desired}
+        for inst in describe_instances(region, targets) if inst['State']['Name'] in actionable
+    ]
+    return sorted(changes, key=lambda change: change['id'])
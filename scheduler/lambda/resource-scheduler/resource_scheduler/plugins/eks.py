@@ -0,0 +1,131 @@
+import json
+
+from resource_scheduler.batching import chunked
+from resource_scheduler.clients import get_client
+from resource_scheduler.plugins import asg as asg_plugin
+
+
+# Кількість Node Groups, що обробляються між перевірками залишку часу
+BATCH_SIZE = 1
+
+
+# Отримання активних Node Groups, виключаючи ті, що в списку виключень
+def get_targets(region, config):
+    if 'discovered' in config:
+        return sorted(ng for cluster_name, ng in config['discovered'].get('eks', [])
+                      if cluster_name == config['cluster_name'] and ng not in config['excluded_nodegroups'])
+    paginator = get_client('eks', region).get_paginator('list_nodegroups')
+    targets = []
+    for page in paginator.paginate(clusterName=config['cluster_name']):
+        targets.extend(ng for ng in page['nodegroups'] if ng not in config['excluded_nodegroups'])
+    return sorted(targets)
+
+
+# Збереження конфігурації Node Group в SSM та масштабування до 0
+def disable(region, targets, config):
+    eks_client = get_client('eks', region)
+    ssm_client = get_client('ssm', region)
+    cluster_name = config['cluster_name']
+    for nodegroup_name in targets:
+        response = eks_client.describe_nodegroup(clusterName=cluster_name, nodegroupName=nodegroup_name)
+        scaling_config = response['nodegroup']['scalingConfig']
+        ssm_client.put_parameter(
+            Name=f'/eks/{cluster_name}/{nodegroup_name}/scalingConfig',
+            Value=json.dumps(scaling_config),
+            Type='String',
+            Overwrite=True
+        )
+        eks_client.update_nodegroup_config(
+            clusterName=cluster_name,
+            nodegroupName=nodegroup_name,
+            scalingConfig={
+                'minSize': 0,
+                'maxSize': scaling_config['maxSize'],  # Залишаємо maxSize без змін
+                'desiredSize': 0
+            }
+        )
+        print(f'Node group {nodegroup_name} in cluster {cluster_name} scaled down to 0 nodes.')
+
+
+# Включення Node Group з параметрами з SSM
+def enable(region, targets, config):
+    eks_client = get_client('eks', region)
+    ssm_client = get_client('ssm', region)
+    cluster_name = config['cluster_name']
+    for nodegroup_name in targets:
+        try:
+            response = ssm_client.get_parameter(Name=f'/eks/{cluster_name}/{nodegroup_name}/scalingConfig')
+            scaling_config = json.loads(response['Parameter']['Value'])
+        except ssm_client.exceptions.ParameterNotFound:
+            print(f'No scaling config found in SSM for {nodegroup_name}. Skipping.')
+            continue
+
+        eks_client.update_nodegroup_config(
+            clusterName=cluster_name,
+            nodegroupName=nodegroup_name,
+            scalingConfig=scaling_config
+        )
+        print(f'Node group {nodegroup_name} in cluster {cluster_name} scaled up with saved parameters.')
+
+
+# Node Groups, які ще не досягли цільового стану. EKS не має пакетного describe,
+# тому вузли перевіряються через ASG Node Groups (один describe на 100 груп)
+def get_pending(region, targets, action, config):
+    eks_client = get_client('eks', region)
+    cluster_name = config['cluster_name']
+    pending = []
+    asg_owners = {}
+    scaled_to_zero = []
+    for nodegroup_name in targets:
+        nodegroup = eks_client.describe_nodegroup(clusterName=cluster_name, nodegroupName=nodegroup_name)['nodegroup']
+        if nodegroup['status'] != 'ACTIVE':
+            pending.append(nodegroup_name)
+            continue
+        if action == 'enable' and nodegroup['scalingConfig']['desiredSize'] == 0:
+            scaled_to_zero.append(nodegroup_name)
+        for asg in nodegroup.get('resources', {}).get('autoScalingGroups', []):
+            asg_owners[asg['name']] = nodegroup_name
+
+    # Масштабована до 0 Node Group не готова, якщо в SSM збережена ненульова конфігурація
+    saved = load_saved_configs(region, cluster_name, scaled_to_zero)
+    pending.extend(ng for ng, scaling_config in saved.items() if scaling_config.get('desiredSize', 0) > 0)
+
+    paginator = get_client('autoscaling', region).get_paginator('describe_auto_scaling_groups')
+    for chunk in chunked(list(asg_owners), 100):
+        for page in paginator.paginate(AutoScalingGroupNames=chunk):
+            for asg in page['AutoScalingGroups']:
+                owner = asg_owners[asg['AutoScalingGroupName']]
+                if not asg_plugin.is_converged(asg, action) and owner not in pending:
+                    pending.append(owner)
+    return pending
+
+
+# Збережені в SSM конфігурації Node Groups: {назва: scalingConfig}
+def load_saved_configs(region, cluster_name, targets):
+    ssm_client = get_client('ssm', region)
+    saved = {}
+    for chunk in chunked(targets, 10):
+        names = [f'/eks/{cluster_name}/{ng}/scalingConfig' for ng in chunk]
+        for parameter in ssm_client.get_parameters(Names=names)['Parameters']:
+            saved[parameter['Name'].split('/')[3]] = json.loads(parameter['Value'])
+    return saved
+
+
+# Мінімальний набір змін: поточний scalingConfig проти бажаного
+def plan(region, targets, action, config):
+    eks_client = get_client('eks', region)
+    cluster_name = config['cluster_name']
+    current = {}
+    for nodegroup_name in targets:
+        nodegroup = eks_client.describe_nodegroup(clusterName=cluster_name, nodegroupName=nodegroup_name)['nodegroup']
+        current[nodegroup_name] = nodegroup['scalingConfig']
+
+    if action == 'disable':
+        desired = {ng: dict(size, minSize=0, desiredSize=0) for ng, size in current.items()}
+    else:
+        desired = load_saved_configs(region, cluster_name, list(current))
+
+    return [
+        {'id': ng, 'current': current[ng], 'desired': desired[ng]}
+        for ng in sorted(current) if ng in desired and current[ng] != desired[ng]
+    ]
@@ -0,0 +1,53 @@
+from resource_scheduler.batching import chunked
+from resource_scheduler.clients import get_client
+
+
+# Кількість RDS інстансів, що обробляються між перевірками залишку часу
+BATCH_SIZE = 1
+
+
+# Список RDS інстансів (із конфігурації та знайдених за тегом), за винятком виключених
+def get_targets(region, config):
+    instances = set(config['rds_instances']) | set(config.get('discovered', {}).get('rds', []))
+    return sorted(inst for inst in instances if inst not in config['excluded_rds_instances'])
+
+
+# Зупинка RDS інстансів (цілі вже відфільтровані планом до стану 'available')
+def disable(region, targets, config):
+    rds_client = get_client('rds', region)
+    for instance_id in targets:
+        rds_client.stop_db_instance(DBInstanceIdentifier=instance_id)
+        print(f'Stopped RDS instance: {instance_id}')
+
+
+# Запуск RDS інстансів (цілі вже відфільтровані планом до стану 'stopped')
+def enable(region, targets, config):
+    rds_client = get_client('rds', region)
+    for instance_id in targets:
+        rds_client.start_db_instance(DBInstanceIdentifier=instance_id)
+        print(f'Started RDS instance: {instance_id}')
+
+
+# RDS інстанси, які ще не досягли цільового стану (один describe на 100 інстансів)
+def get_pending(region, targets, action, config):
+    paginator = get_client('rds', region).get_paginator('describe_db_instances')
+    target_status = 'stopped' if action == 'disable' else 'available'
+    pending = []
+    for chunk in chunked(targets, 100):
+        for page in paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': chunk}]):
+            pending.extend(db['DBInstanceIdentifier'] for db in page['DBInstances']
+                           if db['DBInstanceStatus'] != target_status)
+    return pending
+
+
+# Мінімальний набір змін: зупиняємо лише 'available', запускаємо лише 'stopped'
+def plan(region, targets, action, config):
+    paginator = get_client('rds', region).get_paginator('describe_db_instances')
+    actionable = 'available' if action == 'disable' else 'stopped'
+    desired = 'stopped' if action == 'disable' else 'available'
+    changes = []
+    for chunk in chunked(targets, 100):
+        for page in paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': chunk}]):
+            changes.extend({'id': db['DBInstanceIdentifier'], 'current': db['DBInstanceStatus'], 'desired': desired}
+                           for db in page['DBInstances'] if db['DBInstanceStatus'] == actionable)
+    return sorted(changes, key=lambda change: change['id'])
@@ -0,0 +1,125 @@
+import json
+import time
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from resource_scheduler import metrics
+from resource_scheduler.batching import chunked
+from resource_scheduler.clients import get_client
+from resource_scheduler.history import load_history, percentile, record_durations
+from resource_scheduler.plan import planned_targets
+from resource_scheduler.plugins import load_plugin
+
+
+# Тривалість старту за замовчуванням (с), поки для ресурсу немає історії
+DEFAULT_LEAD_TIME_S = {'rds': 900, 'eks': 600, 'asg': 300, 'ec2': 120}
+STATE_PARAMETER = '/scheduler/prewarm/state'
+
+
+# Момент, до якого ресурси мають бути готові (сьогодні, UTC)
+def target_timestamp(target_time, now):
+    hour, minute = (int(part) for part in target_time.split(':'))
+    return now.replace(hour=hour, minute=minute, second=0, microsecond=0).timestamp()
+
+
+# Наскільки раніше цільового часу запускати ресурс: перцентиль історії плюс запас
+def lead_time(samples, resource_type, config):
+    if not samples:
+        return DEFAULT_LEAD_TIME_S[resource_type] + config['prewarm_margin_s']
+    return percentile(samples, config['prewarm_percentile']) + config['prewarm_margin_s']
+
+
+# Стан прогріву за день: коли запущено кожен ресурс і які вже готові
+def load_state(region, day):
+    ssm_client = get_client('ssm', region)
+    try:
+        state = json.loads(ssm_client.get_parameter(Name=STATE_PARAMETER)['Parameter']['Value'])
+    except ssm_client.exceptions.ParameterNotFound:
+        state = {}
+    if state.get('date') != day:
+        state = {'date': day, 'started': {}, 'done': {}}
+    return state
+
+
+def save_state(region, state):
+    get_client('ssm', region).put_parameter(
+        Name=STATE_PARAMETER,
+        Value=json.dumps(state),
+        Type='String',
+        Tier='Intelligent-Tiering',
+        Overwrite=True
+    )
+
+
+# Запис тривалостей старту для ресурсів, що стали готовими з минулого виклику
+def record_ready(region, plugin, resource_type, started, done, history, config):
+    waiting = [rid for rid in started if rid not in done]
+    if not waiting:
+        return
+    not_ready = set(plugin.get_pending(region, waiting, 'enable', config))
+    now = time.time()
+    durations = {rid: now - started[rid] for rid in waiting if rid not in not_ready}
+    record_durations(region, resource_type, durations, config, history)
+    done.update(durations)
+
+
+# Прогрів: викликається щохвилини перед цільовим часом і запускає кожен ресурс
+# із випередженням, яке дорівнює його типовому часу старту
+def run(config, context):
+    region = config['region']
+    now = datetime.now(timezone.utc)
+    target = target_timestamp(config['prewarm_target_time'], now)
+    state = load_state(region, now.date().isoformat())
+    report = {'target': datetime.fromtimestamp(target, timezone.utc).isoformat(), 'started': {}, 'planned': {}}
+
+    # Стан зберігається навіть після помилки, щоб не втратити час старту вже запущених ресурсів
+    try:
+        for resource_type in config['prewarm_types']:
+            with metrics.resource_scope(resource_type), metrics.timed(resource_type):
+                prewarm_type(resource_type, region, now, target, state, report, config)
+    finally:
+        save_state(region, state)
+    print(json.dumps({'prewarm_report': report}))
+    return None
+
+
+# Прогрів одного типу ресурсів: запис готових і запуск тих, чий час настав
+def prewarm_type(resource_type, region, now, target, state, report, config):
+    plugin = load_plugin(resource_type)
+    history = load_history(region, resource_type, config)
+    started = state['started'].setdefault(resource_type, {})
+    done = set(state['done'].get(resource_type, []))
+
+    record_ready(region, plugin, resource_type, started, done, history, config)
+    state['done'][resource_type] = sorted(done)
+
+    due = []
+    planned = report['planned'].setdefault(resource_type, {})
+    for rid in plugin.get_targets(region, config):
+        if rid in started or rid in done:
+            continue
+        start_at = target - lead_time(history.get(rid), resource_type, config)
+        if now.timestamp() >= start_at:
+            due.append(rid)
+        else:
+            planned[rid] = datetime.fromtimestamp(start_at, timezone.utc).isoformat()
+
+    if due:
+        # Запускаємо (і вимірюємо) лише ті, що справді зупинені
+        to_start = planned_targets(plugin, region, due, 'enable', config)
+        done.update(rid for rid in due if rid not in to_start)
+        # Час старту записується лише для успішних частин; решта повториться в наступному виклику
+        report['started'][resource_type] = []
+        for batch in chunked(to_start, plugin.BATCH_SIZE):
+            started_at = time.time()
+            try:
+                plugin.enable(region, batch, config)
+            except ClientError as e:
+                print(f'Error processing {resource_type} {batch}: {e}')
+                continue
+            metrics.add('ResourcesProcessed', len(batch))
+            started.update({rid: started_at for rid in batch})
+            report['started'][resource_type].extend(batch)
+
+    state['done'][resource_type] = sorted(done)
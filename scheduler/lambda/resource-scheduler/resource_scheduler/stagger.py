@@ -0,0 +1,157 @@
+import json
+import math
+import time
+
+from botocore.exceptions import ClientError
+
+from resource_scheduler import continuation, convergence, metrics
+from resource_scheduler.batching import chunked
+from resource_scheduler.plan import planned_targets
+from resource_scheduler.plugins import load_plugin
+
+
+POLL_INITIAL_DELAY_S = 2
+POLL_MAX_DELAY_S = 20
+# Скільки неготових ресурсів хвилі зберігати у звіті (курсор має обмежений розмір)
+NOT_READY_REPORT_LIMIT = 20
+
+
+# Чи включається тип ресурсів хвилями (лише для enable і коли задано розмір хвилі або темп)
+def applies(resource_type, config):
+    staggered = config['stagger_wave_size'] > 0 or config['stagger_rate'] > 0
+    return config['action'] == 'enable' and staggered and resource_type in config['stagger_types']
+
+
+# Розмір хвилі: заданий явно або кількість ресурсів, що запускається з темпом STAGGER_RATE за інтервал
+def wave_size(config):
+    if config['stagger_wave_size'] > 0:
+        return config['stagger_wave_size']
+    return max(1, math.ceil(config['stagger_rate'] * config['stagger_wave_interval_s']))
+
+
+# Інтервал між хвилями (с): з темпом STAGGER_RATE (ресурсів/с) він виводиться з розміру хвилі
+def wave_interval(config):
+    if config['stagger_rate'] > 0:
+        return wave_size(config) / config['stagger_rate']
+    return config['stagger_wave_interval_s']
+
+
+# Розбиття ресурсів на хвилі у порядку типів: [{тип: [ids]}, ...]
+def build_waves(targets, size):
+    flat = [(resource_type, rid) for resource_type, ids in targets.items() for rid in ids]
+    waves = []
+    for chunk in chunked(flat, size):
+        wave = {}
+        for resource_type, rid in chunk:
+            wave.setdefault(resource_type, []).append(rid)
+        waves.append(wave)
+    return waves
+
+
+# Новий стан хвильового запуску. Запускаються лише ресурси, стан яких відрізняється від бажаного
+def new_state(targets, config):
+    planned = {}
+    for resource_type, ids in targets.items():
+        with metrics.resource_scope(resource_type):
+            planned[resource_type] = planned_targets(load_plugin(resource_type), config['region'], ids, 'enable', config)
+    now = time.time()
+    state = {
+        'waves': build_waves({t: ids for t, ids in planned.items() if ids}, wave_size(config)),
+        'next': 0,
+        'next_at': now,
+        'started_at': now,
+        'records': [],
+    }
+    print(f'Staggered start: {len(state["waves"])} waves of up to {wave_size(config)} resources '
+          f'every {round(wave_interval(config), 1)}s')
+    return state
+
+
+# Запуск однієї хвилі: кожен тип частинами за BATCH_SIZE свого плагіна
+def start_wave(wave, config):
+    for resource_type, ids in wave.items():
+        plugin = load_plugin(resource_type)
+        with metrics.resource_scope(resource_type):
+            for batch in chunked(ids, plugin.BATCH_SIZE):
+                try:
+                    plugin.enable(config['region'], batch, config)
+                    metrics.add('ResourcesProcessed', len(batch))
+                except ClientError as e:
+                    print(f'Error processing {resource_type} {batch}: {e}')
+
+
+# Оновлення готовності запущених хвиль: час від старту хвилі до готовності всіх її ресурсів
+def update_readiness(state, config):
+    waiting = [record for record in state['records'] if record['pending']]
+    for record in waiting:
+        record['pending'] = convergence.pending_resources(record['pending'], 'enable', config)
+        if not record['pending']:
+            record['time_to_ready_s'] = round(time.time() - record['started_at'], 1)
+            print(f'Wave {record["wave"]} ready in {record["time_to_ready_s"]}s')
+
+
+# Запуск хвиль з інтервалом і відстеження їх готовності між хвилями.
+# Повертає False, якщо час виклику вичерпано і роботу треба продовжити
+def run(state, config, context):
+    delay = POLL_INITIAL_DELAY_S
+    while True:
+        now = time.time()
+        if state['next'] < len(state['waves']) and now >= state['next_at']:
+            if continuation.out_of_time(context):
+                return False
+            index = state['next']
+            wave = state['waves'][index]
+            print(f'Wave {index}: starting {sum(len(ids) for ids in wave.values())} resources')
+            start_wave(wave, config)
+            state['records'].append({
+                'wave': index,
+                'resources': {t: len(ids) for t, ids in wave.items()},
+                'started_at': now,
+                'pending': wave,
+                'time_to_ready_s': None,
+            })
+            state.update(next=index + 1, next_at=now + wave_interval(config))
+            delay = POLL_INITIAL_DELAY_S
+            continue
+
+        update_readiness(state, config)
+        all_started = state['next'] >= len(state['waves'])
+        if all_started and not any(record['pending'] for record in state['records']):
+            return True
+        if all_started and now - state['started_at'] > convergence.CONVERGENCE_TIMEOUT_S:
+            return True
+
+        sleep_s = delay if all_started else max(0, min(delay, state['next_at'] - now))
+        if not continuation.can_wait(context, sleep_s):
+            return False
+        time.sleep(sleep_s)
+        delay = min(delay * 2, POLL_MAX_DELAY_S)
+
+
+# Ресурси, запущені хвилями: {тип: [ids]}
+def started(state):
+    result = {}
+    for wave in state['waves'][:state['next']]:
+        for resource_type, ids in wave.items():
+            result.setdefault(resource_type, []).extend(ids)
+    return result
+
+
+# Звіт: для кожної хвилі зсув старту та час до готовності, щоб підібрати розмір і інтервал
+def report(state, config):
+    waves = [{
+        'wave': record['wave'],
+        'resources': record['resources'],
+        'start_offset_s': round(record['started_at'] - state['started_at'], 1),
+        'time_to_ready_s': record['time_to_ready_s'],
+        'not_ready': {t: ids[:NOT_READY_REPORT_LIMIT] for t, ids in record['pending'].items()},
+    } for record in state['records']]
+    ready_at = [w['start_offset_s'] + w['time_to_ready_s'] for w in waves if w['time_to_ready_s'] is not None]
+    result = {
+        'wave_size': wave_size(config),
+        'wave_interval_s': round(wave_interval(config), 1),
+        'waves': waves,
+        'total_time_to_ready_s': round(max(ready_at), 1) if ready_at else None,
+    }
+    print(json.dumps({'stagger_report': result}))
+    return result
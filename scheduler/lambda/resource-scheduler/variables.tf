@@ -0,0 +1,6 @@
+variable "aws_region" {}
+variable "terraform_remote_state_s3_bucket" {}
+variable "terraform_remote_state_dynamodb_table" {}
+variable "terraform_remote_state_file_name" {}
+variable "terraform_remote_state_kms_key" {}
+variable "resource_name_prefix" {}
\ No newline at end of file
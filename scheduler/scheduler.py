@@ -1,10 +1,35 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
-from botocore.exceptions import ClientError
+from botocore.config import Config
+from botocore.exceptions import ClientError, WaiterError
+
+# Кількість паралельних запитів до API
+MAX_WORKERS = 16
+# Кількість інстансів в одному виклику stop_instances/start_instances
+INSTANCE_CHUNK_SIZE = 500
+# Процеси ASG, які призупиняються, щоб група не замінювала і не перебалансовувала зупинені інстанси
+SUSPENDED_PROCESSES = ['Launch', 'Terminate', 'HealthCheck', 'ReplaceUnhealthy', 'AZRebalance']
+# Тег, у якому зберігаються процеси, призупинені цим скриптом (щоб не відновлювати чужі)
+SUSPENDED_TAG = 'scheduler:suspended-processes'
 
 # Ініціалізуємо клієнти для Auto Scaling та RDS
-autoscaling_client = boto3.client('autoscaling')
-ec2_client = boto3.client('ec2')
-rds_client = boto3.client('rds')
+client_config = Config(retries={'max_attempts': 10, 'mode': 'adaptive'}, max_pool_connections=MAX_WORKERS * 2)
+autoscaling_client = boto3.client('autoscaling', config=client_config)
+ec2_client = boto3.client('ec2', config=client_config)
+rds_client = boto3.client('rds', config=client_config)
+
+def chunked(items, size):
+    """Розбиває список на частини фіксованого розміру."""
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+def run_concurrently(function, items):
+    """Виконує function для кожного елемента паралельно і повертає результати."""
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(items))) as executor:
+        return list(executor.map(function, items))
 
 def get_all_auto_scaling_groups():
     """Отримує всі Auto Scaling групи."""
@@ -22,14 +47,127 @@ def get_all_rds_instances():
         instances.extend(page['DBInstances'])
     return instances
 
-def suspend_auto_scaling_instances(group):
-    """Зупиняє всі інстанси в Auto Scaling групі."""
-    instance_ids = [instance['InstanceId'] for instance in group['Instances']]
-    if instance_ids:
-        ec2_client.stop_instances(InstanceIds=instance_ids)
-        print(f"Інстанси {instance_ids} у групі {group['AutoScalingGroupName']} зупинено.")
-    else:
-        print(f"У групі {group['AutoScalingGroupName']} немає активних інстансів для зупинки.")
+def group_tags(group):
+    """Теги групи як словник."""
+    return {tag['Key']: tag['Value'] for tag in group.get('Tags', [])}
+
+def tag_suspended_processes(groups, processes):
+    """Запам'ятовує призупинені процеси в тегах груп (до 25 тегів за виклик)."""
+    tags = [{
+        'ResourceId': group['AutoScalingGroupName'],
+        'ResourceType': 'auto-scaling-group',
+        'Key': SUSPENDED_TAG,
+        'Value': ','.join(processes[group['AutoScalingGroupName']]),
+        'PropagateAtLaunch': False,
+    } for group in groups if processes[group['AutoScalingGroupName']]]
+    run_concurrently(lambda chunk: autoscaling_client.create_or_update_tags(Tags=chunk), chunked(tags, 25))
+
+def untag_suspended_processes(groups):
+    """Видаляє теги з призупиненими процесами після їх відновлення."""
+    tags = [{
+        'ResourceId': group['AutoScalingGroupName'],
+        'ResourceType': 'auto-scaling-group',
+        'Key': SUSPENDED_TAG,
+    } for group in groups if SUSPENDED_TAG in group_tags(group)]
+    run_concurrently(lambda chunk: autoscaling_client.delete_tags(Tags=chunk), chunked(tags, 25))
+
+def suspend_group_processes(group):
+    """Призупиняє процеси групи, які ще не призупинені. Повертає список призупинених
+    або None, якщо призупинити не вдалося."""
+    already_suspended = {process['ProcessName'] for process in group.get('SuspendedProcesses', [])}
+    processes = [process for process in SUSPENDED_PROCESSES if process not in already_suspended]
+    if not processes:
+        return []
+    try:
+        autoscaling_client.suspend_processes(AutoScalingGroupName=group['AutoScalingGroupName'],
+                                             ScalingProcesses=processes)
+        return processes
+    except ClientError as e:
+        print(f"Не вдалося призупинити процеси групи {group['AutoScalingGroupName']}: {e}")
+        return None
+
+def resume_group_processes(group):
+    """Відновлює лише ті процеси, які призупинив цей скрипт. Повертає None, якщо відновити не вдалося."""
+    processes = [p for p in group_tags(group).get(SUSPENDED_TAG, '').split(',') if p]
+    if not processes:
+        return []
+    try:
+        autoscaling_client.resume_processes(AutoScalingGroupName=group['AutoScalingGroupName'],
+                                            ScalingProcesses=processes)
+        return processes
+    except ClientError as e:
+        print(f"Не вдалося відновити процеси групи {group['AutoScalingGroupName']}: {e}")
+        return None
+
+def apply_to_instances(operation, instance_ids):
+    """Зупиняє/запускає інстанси великими частинами паралельно. Повертає невдалі ID."""
+    def apply_chunk(chunk):
+        try:
+            operation(InstanceIds=chunk)
+            return []
+        except ClientError as e:
+            print(f"Помилка для {len(chunk)} інстансів ({chunk[0]}...): {e}")
+            return chunk
+    failed = run_concurrently(apply_chunk, chunked(instance_ids, INSTANCE_CHUNK_SIZE))
+    return [instance_id for chunk in failed for instance_id in chunk]
+
+def wait_until_running(instance_ids):
+    """Очікує стану running для всіх інстансів (waiter на кожну частину з 100 ID паралельно).
+    Помилки очікування лише логуються, щоб процеси груп було відновлено в будь-якому разі."""
+    waiter = ec2_client.get_waiter('instance_running')
+
+    def wait_chunk(chunk):
+        try:
+            waiter.wait(InstanceIds=chunk, WaiterConfig={'Delay': 5, 'MaxAttempts': 60})
+        except WaiterError as e:
+            print(f"Не всі інстанси запустилися ({len(chunk)} інстансів, {chunk[0]}...): {e}")
+
+    run_concurrently(wait_chunk, chunked(instance_ids, 100))
+
+def selected_groups(excluded_groups):
+    """Auto Scaling групи, окрім виключених."""
+    all_groups = get_all_auto_scaling_groups()
+    groups = [group for group in all_groups if group['AutoScalingGroupName'] not in excluded_groups]
+    print(f"Auto Scaling груп для обробки: {len(groups)} (у виключеннях: {len(all_groups) - len(groups)}).")
+    return groups
+
+def suspend_auto_scaling_groups(excluded_groups):
+    """Призупиняє процеси всіх груп, окрім виключених, і зупиняє їх інстанси одним пакетом."""
+    groups = selected_groups(excluded_groups)
+
+    # Спершу процеси, щоб група не замінила інстанси, які зараз будуть зупинені
+    suspended = run_concurrently(suspend_group_processes, groups)
+    processes = {group['AutoScalingGroupName']: done for group, done in zip(groups, suspended)}
+    tag_suspended_processes(groups, processes)
+    print(f"Процеси призупинено у {sum(1 for done in suspended if done)} групах.")
+
+    # Інстанси зупиняються лише в групах, де всі SUSPENDED_PROCESSES призупинено (зараз або раніше),
+    # інакше HealthCheck/ReplaceUnhealthy замінить зупинені інстанси
+    protected = [group for group, done in zip(groups, suspended) if done is not None]
+    for group, done in zip(groups, suspended):
+        if done is None:
+            print(f"Групу {group['AutoScalingGroupName']} пропущено: її процеси не призупинено.")
+    instance_ids = [instance['InstanceId'] for group in protected for instance in group['Instances']
+                    if instance['LifecycleState'] == 'InService']
+    failed = apply_to_instances(ec2_client.stop_instances, instance_ids)
+    print(f"Зупинено {len(instance_ids) - len(failed)} з {len(instance_ids)} інстансів у {len(protected)} групах "
+          f"(пропущено груп: {len(groups) - len(protected)}).")
+
+def resume_auto_scaling_groups(excluded_groups):
+    """Запускає інстанси всіх груп, окрім виключених, і відновлює їх процеси."""
+    groups = selected_groups(excluded_groups)
+
+    instance_ids = [instance['InstanceId'] for group in groups for instance in group['Instances']]
+    failed = set(apply_to_instances(ec2_client.start_instances, instance_ids))
+    started = [instance_id for instance_id in instance_ids if instance_id not in failed]
+    print(f"Запущено {len(started)} з {len(instance_ids)} інстансів у {len(groups)} групах.")
+
+    # Процеси відновлюються після старту, інакше HealthCheck замінить ще не запущені інстанси
+    wait_until_running(started)
+    resumed = run_concurrently(resume_group_processes, groups)
+    # Тег знімається лише з груп, процеси яких справді відновлено, щоб наступний запуск повторив спробу
+    untag_suspended_processes([group for group, done in zip(groups, resumed) if done is not None])
+    print(f"Процеси відновлено у {sum(1 for done in resumed if done)} групах.")
 
 def stop_rds_instance(instance):
     """Зупиняє RDS інстанс."""
@@ -39,21 +177,9 @@ def stop_rds_instance(instance):
     except ClientError as e:
         print(f"Не вдалося зупинити RDS інстанс {instance['DBInstanceIdentifier']}: {e}")
 
-def manage_auto_scaling_groups(excluded_groups):
-    """Призупиняє всі Auto Scaling групи, окрім тих, що у виключеннях."""
-    groups = get_all_auto_scaling_groups()
-    print(groups)
-    for group in groups:
-        if group['AutoScalingGroupName'] not in excluded_groups:
-            print(f"Призупиняємо інстанси для групи {group['AutoScalingGroupName']}...")
-            #suspend_auto_scaling_instances(group)
-        else:
-            print(f"Група {group['AutoScalingGroupName']} у виключеннях, пропускаємо.")
-
 def manage_rds_instances(excluded_instances):
     """Зупиняє всі RDS інстанси, окрім тих, що у виключеннях."""
     instances = get_all_rds_instances()
-    print(instances)
     for instance in instances:
         if instance['DBInstanceIdentifier'] not in excluded_instances:
             print(f"Зупиняємо RDS інстанс {instance['DBInstanceIdentifier']}...")
@@ -62,12 +188,20 @@ def manage_rds_instances(excluded_instances):
             print(f"RDS інстанс {instance['DBInstanceIdentifier']} у виключеннях, пропускаємо.")
 
 if __name__ == '__main__':
-    # Список виключених Auto Scaling груп та RDS інстансів
-    excluded_auto_scaling_groups = ['GROUP_NAME_1', 'GROUP_NAME_2']
-    excluded_rds_instances = ['RDS_INSTANCE_1', 'RDS_INSTANCE_2']
+    parser = argparse.ArgumentParser(description='Suspend or resume Auto Scaling groups in bulk.')
+    parser.add_argument('--action', choices=['suspend', 'resume'], required=True, help='Action to perform')
+    parser.add_argument('--excluded-groups', nargs='*', default=['GROUP_NAME_1', 'GROUP_NAME_2'],
+                        help='Auto Scaling groups to exclude')
+    parser.add_argument('--excluded-rds-instances', nargs='*', default=['RDS_INSTANCE_1', 'RDS_INSTANCE_2'],
+                        help='RDS instances to exclude')
+    args = parser.parse_args()
 
-    # Призупинення Auto Scaling груп (окрім виключених)
-    manage_auto_scaling_groups(excluded_auto_scaling_groups)
+    if args.action == 'suspend':
+        # Призупинення Auto Scaling груп (окрім виключених)
+        suspend_auto_scaling_groups(args.excluded_groups)
+    else:
+        resume_auto_scaling_groups(args.excluded_groups)
 
-    # Зупинка RDS інстансів (окрім виключених)
-    manage_rds_instances(excluded_rds_instances)
+    if args.action == 'suspend':
+        # Зупинка RDS інстансів (окрім виключених)
+        manage_rds_instances(args.excluded_rds_instances)
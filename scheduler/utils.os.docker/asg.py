@@ -3,6 +3,8 @@ import json
 import argparse
 import sys
 
+from convergence import pending_nodegroups, wait_for_convergence
+
 
 # Ініціалізація клієнтів для EKS та SSM
 def init_clients(region):
@@ -83,6 +85,7 @@ def disable_nodegroups(eks_client, ssm_client, cluster_name, excluded_nodegroups
 
         # Масштабування вниз з використанням оригінальної maxSize
         scale_down_nodegroup(eks_client, cluster_name, nodegroup, scaling_config)
+    return nodegroups
 
 
 # Основна функція для включення Node Groups
@@ -90,6 +93,7 @@ def enable_nodegroups(eks_client, ssm_client, cluster_name, excluded_nodegroups)
     nodegroups = get_active_nodegroups(eks_client, cluster_name, excluded_nodegroups)
     for nodegroup in nodegroups:
         scale_up_nodegroup(eks_client, ssm_client, cluster_name, nodegroup)
+    return nodegroups
 
 
 # Функція для обробки параметрів командного рядка
@@ -100,6 +104,8 @@ def parse_arguments():
     parser.add_argument('--excluded-nodegroups', nargs='*', default=[], help='List of Node Groups to exclude')
     parser.add_argument('--action', choices=['disable', 'enable'], required=True,
                         help='Action to perform: disable or enable Node Groups')
+    parser.add_argument('--wait', action='store_true', help='Wait until Node Groups reach the target size')
+    parser.add_argument('--wait-timeout', type=int, default=900, help='Seconds to wait for the target size')
     return parser.parse_args()
 
 
@@ -110,6 +116,14 @@ if __name__ == '__main__':
     eks_client, ssm_client = init_clients(args.region)
 
     if args.action == 'disable':
-        disable_nodegroups(eks_client, ssm_client, args.cluster_name, args.excluded_nodegroups)
+        changed = disable_nodegroups(eks_client, ssm_client, args.cluster_name, args.excluded_nodegroups)
     elif args.action == 'enable':
-        enable_nodegroups(eks_client, ssm_client, args.cluster_name, args.excluded_nodegroups)
+        changed = enable_nodegroups(eks_client, ssm_client, args.cluster_name, args.excluded_nodegroups)
+
+    # Перевірка, що вузли Node Groups справді зупинились/запустились
+    if args.wait and changed:
+        asg_client = boto3.client('autoscaling', region_name=args.region)
+        _, not_converged = wait_for_convergence(
+            'Node group', changed, pending_nodegroups(eks_client, asg_client, args.cluster_name), args.wait_timeout)
+        if not_converged:
+            sys.exit(1)
@@ -0,0 +1,181 @@
+import boto3
+import json
+import argparse
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from botocore.config import Config
+
+import asg
+import ec2
+import rds
+from convergence import (pending_ec2_instances, pending_nodegroups, pending_rds_clusters, pending_rds_instances,
+                         wait_for_convergence)
+
+# Кількість записів маніфесту, що обробляються паралельно
+MAX_WORKERS = 8
+
+# Спільні клієнти для всіх записів маніфесту: один клієнт на сервіс і регіон
+_clients = {}
+_clients_lock = threading.Lock()
+_session = boto3.session.Session()
+_client_config = Config(retries={'max_attempts': 10, 'mode': 'adaptive'}, max_pool_connections=MAX_WORKERS * 2)
+
+
+# Отримання клієнта з кешу (створення клієнтів у boto3 не потокобезпечне, тому під блокуванням)
+def get_client(service, region):
+    with _clients_lock:
+        if (service, region) not in _clients:
+            _clients[(service, region)] = _session.client(service, region_name=region, config=_client_config)
+        return _clients[(service, region)]
+
+
+# Читання маніфесту: JSON список записів або об'єкт з ключем "entries".
+# Запис: {"type": "ec2" | "rds" | "eks", "region": ..., "instances": [...], "excluded": [...],
+#         "ssm_parameter": ... (ec2, rds), "cluster_name": ... (eks), "action": ... (необов'язково)}
+def load_manifest(path):
+    with open(path) as f:
+        manifest = json.load(f)
+    entries = manifest['entries'] if isinstance(manifest, dict) else manifest
+    for index, entry in enumerate(entries):
+        required = {'ec2': ['region', 'ssm_parameter'], 'rds': ['region', 'ssm_parameter'],
+                    'eks': ['region', 'cluster_name']}.get(entry.get('type'))
+        if required is None:
+            raise ValueError(f'Manifest entry #{index}: unknown type {entry.get("type")!r}.')
+        missing = [key for key in required if not entry.get(key)]
+        if missing:
+            raise ValueError(f'Manifest entry #{index} ({entry["type"]}): missing {", ".join(missing)}.')
+    return entries
+
+
+# Назва запису для звіту
+def entry_name(entry):
+    target = entry.get('cluster_name') or entry.get('ssm_parameter')
+    return f'{entry["type"]}:{entry["region"]}:{target}'
+
+
+# Вимкнення/включення EC2 інстансів одного запису. Повертає (змінені, не досягли цільового стану)
+def run_ec2(entry, action, wait, wait_timeout):
+    ec2_client, ssm_client = get_client('ec2', entry['region']), get_client('ssm', entry['region'])
+    if action == 'disable':
+        instances = ec2.get_active_instances(ec2_client, entry.get('instances', []), entry.get('excluded', []))
+        changed = ec2.disable_instances(ec2_client, ssm_client, entry['ssm_parameter'], instances)
+    else:
+        changed = ec2.enable_instances(ec2_client, ssm_client, entry['ssm_parameter'])
+
+    not_converged = []
+    if wait and changed:
+        target_state = 'stopped' if action == 'disable' else 'running'
+        not_converged = wait_for_convergence(
+            'EC2 instance', changed, pending_ec2_instances(ec2_client, target_state), wait_timeout)[1]
+    return changed, not_converged
+
+
+# Вимкнення/включення RDS інстансів і кластерів Aurora одного запису
+def run_rds(entry, action, wait, wait_timeout):
+    rds_client, ssm_client = get_client('rds', entry['region']), get_client('ssm', entry['region'])
+    if action == 'disable':
+        instances = rds.get_active_rds_instances(rds_client, entry.get('instances', []), entry.get('excluded', []))
+        changed = rds.disable_rds_instances(rds_client, ssm_client, entry['ssm_parameter'], instances,
+                                            entry.get('excluded', []))
+    else:
+        changed = rds.enable_rds_instances(rds_client, ssm_client, entry['ssm_parameter'])
+
+    not_converged = []
+    if wait and changed:
+        target_status = 'stopped' if action == 'disable' else 'available'
+        if changed['instance']:
+            not_converged += wait_for_convergence(
+                'RDS instance', changed['instance'], pending_rds_instances(rds_client, target_status), wait_timeout)[1]
+        if changed['cluster']:
+            not_converged += wait_for_convergence(
+                'RDS cluster', changed['cluster'], pending_rds_clusters(rds_client, target_status), wait_timeout)[1]
+    return [identifier for ids in changed.values() for identifier in ids], not_converged
+
+
+# Масштабування Node Groups одного кластера EKS
+def run_eks(entry, action, wait, wait_timeout):
+    eks_client, ssm_client = get_client('eks', entry['region']), get_client('ssm', entry['region'])
+    if action == 'disable':
+        changed = asg.disable_nodegroups(eks_client, ssm_client, entry['cluster_name'], entry.get('excluded', []))
+    else:
+        changed = asg.enable_nodegroups(eks_client, ssm_client, entry['cluster_name'], entry.get('excluded', []))
+
+    not_converged = []
+    if wait and changed:
+        asg_client = get_client('autoscaling', entry['region'])
+        not_converged = wait_for_convergence(
+            'Node group', changed, pending_nodegroups(eks_client, asg_client, entry['cluster_name']), wait_timeout)[1]
+    return changed, not_converged
+
+
+RUNNERS = {'ec2': run_ec2, 'rds': run_rds, 'eks': run_eks}
+
+
+# Обробка одного запису маніфесту. Помилки (зокрема sys.exit у модулях) не зупиняють інші записи
+def run_entry(entry, action, wait, wait_timeout):
+    action = entry.get('action', action)
+    started = time.time()
+    result = {'entry': entry_name(entry), 'action': action, 'status': 'ok', 'changed': 0, 'not_converged': []}
+    try:
+        changed, not_converged = RUNNERS[entry['type']](entry, action, wait, wait_timeout)
+        result['changed'] = len(changed or [])
+        result['not_converged'] = not_converged
+        if not_converged:
+            result['status'] = 'not_converged'
+    except SystemExit:
+        result['status'] = 'failed'
+    except Exception as e:
+        print(f'Failed to process {result["entry"]}: {e}')
+        result['status'] = 'failed'
+    result['duration_s'] = round(time.time() - started, 1)
+    return result
+
+
+# Зведений звіт по всіх записах
+def print_report(results, duration):
+    width = max([len(r['entry']) for r in results] + [5])
+    print(f'{"entry":<{width}}  {"action":<8} {"status":<14} {"changed":>7} {"time_s":>8}')
+    for r in results:
+        print(f'{r["entry"]:<{width}}  {r["action"]:<8} {r["status"]:<14} {r["changed"]:>7} {r["duration_s"]:>8}')
+    print(json.dumps({'batch_report': {
+        'entries': len(results),
+        'failed': sum(1 for r in results if r['status'] != 'ok'),
+        'duration_s': duration,
+        'results': results,
+    }}))
+
+
+# Основна функція
+def main():
+    parser = argparse.ArgumentParser(description='Disable or enable EC2, RDS and EKS resources listed in a manifest.')
+    parser.add_argument('--manifest', required=True, help='Path to the JSON manifest with entries to process')
+    parser.add_argument('--action', choices=['disable', 'enable'], required=True,
+                        help='Action to perform (an entry may override it with its own "action")')
+    parser.add_argument('--max-workers', type=int, default=MAX_WORKERS, help='Entries processed concurrently')
+    parser.add_argument('--wait', action='store_true', help='Wait until resources reach the target state')
+    parser.add_argument('--wait-timeout', type=int, default=1800, help='Seconds to wait for the target state')
+
+    args = parser.parse_args()
+
+    try:
+        entries = load_manifest(args.manifest)
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Invalid manifest {args.manifest}: {e}')
+        sys.exit(2)
+    if not entries:
+        print('No entries in manifest.')
+        return
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, min(args.max_workers, len(entries)))) as executor:
+        results = list(executor.map(lambda entry: run_entry(entry, args.action, args.wait, args.wait_timeout),
+                                    entries))
+    print_report(results, round(time.time() - started, 1))
+
+    if any(r['status'] != 'ok' for r in results):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
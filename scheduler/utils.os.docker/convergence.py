@@ -0,0 +1,102 @@
+import json
+import time
+
+
+# Розбиття списку на частини фіксованого розміру
+def chunked(items, size):
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+# Очікування, поки всі ресурси досягнуть цільового стану.
+# fetch_pending(ids) повертає ті, що ще не досягли, мінімальною кількістю пакетних describe
+def wait_for_convergence(resource_name, targets, fetch_pending, timeout=900, initial_delay=5, max_delay=30):
+    started = time.time()
+    pending = list(targets)
+    converged = {}
+    delay = initial_delay
+    while pending:
+        still_pending = set(fetch_pending(pending))
+        elapsed = round(time.time() - started, 1)
+        for resource_id in pending:
+            if resource_id not in still_pending:
+                converged[resource_id] = elapsed
+                print(f'{resource_name} {resource_id} reached target state in {elapsed}s.')
+        pending = [resource_id for resource_id in pending if resource_id in still_pending]
+        if not pending or time.time() - started + delay > timeout:
+            break
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+    if pending:
+        print(f'WARNING: {len(pending)} {resource_name} resources did not reach target state in {timeout}s: {pending}')
+    print(json.dumps({'convergence_report': {
+        'resource': resource_name,
+        'resources': converged,
+        'time_to_target_state_s': max(converged.values()) if converged else 0,
+        'not_converged': pending,
+    }}))
+    return converged, pending
+
+
+# EC2 інстанси не в цільовому стані (один describe на 200 інстансів)
+def pending_ec2_instances(ec2_client, target_state):
+    def fetch_pending(instance_ids):
+        paginator = ec2_client.get_paginator('describe_instances')
+        pending = []
+        for chunk in chunked(instance_ids, 200):
+            for page in paginator.paginate(Filters=[{'Name': 'instance-id', 'Values': chunk}]):
+                for reservation in page['Reservations']:
+                    pending.extend(inst['InstanceId'] for inst in reservation['Instances']
+                                   if inst['State']['Name'] != target_state)
+        return pending
+    return fetch_pending
+
+
+# RDS інстанси не в цільовому стані (один describe на 100 інстансів)
+def pending_rds_instances(rds_client, target_status):
+    def fetch_pending(instance_ids):
+        paginator = rds_client.get_paginator('describe_db_instances')
+        pending = []
+        for chunk in chunked(instance_ids, 100):
+            for page in paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': chunk}]):
+                pending.extend(db['DBInstanceIdentifier'] for db in page['DBInstances']
+                               if db['DBInstanceStatus'] != target_status)
+        return pending
+    return fetch_pending
+
+
+# Кластери Aurora не в цільовому стані (один describe на 100 кластерів)
+def pending_rds_clusters(rds_client, target_status):
+    def fetch_pending(cluster_ids):
+        paginator = rds_client.get_paginator('describe_db_clusters')
+        pending = []
+        for chunk in chunked(cluster_ids, 100):
+            for page in paginator.paginate(Filters=[{'Name': 'db-cluster-id', 'Values': chunk}]):
+                pending.extend(c['DBClusterIdentifier'] for c in page['DBClusters'] if c['Status'] != target_status)
+        return pending
+    return fetch_pending
+
+
+# Node Groups, вузли яких ще не досягли цільової кількості. Стан вузлів перевіряється
+# через ASG Node Groups (один describe_auto_scaling_groups на 100 груп)
+def pending_nodegroups(eks_client, asg_client, cluster_name):
+    def fetch_pending(nodegroup_names):
+        pending = []
+        asg_owners = {}
+        for nodegroup_name in nodegroup_names:
+            nodegroup = eks_client.describe_nodegroup(clusterName=cluster_name, nodegroupName=nodegroup_name)['nodegroup']
+            if nodegroup['status'] != 'ACTIVE':
+                pending.append(nodegroup_name)
+                continue
+            for asg in nodegroup.get('resources', {}).get('autoScalingGroups', []):
+                asg_owners[asg['name']] = nodegroup_name
+
+        paginator = asg_client.get_paginator('describe_auto_scaling_groups')
+        for chunk in chunked(list(asg_owners), 100):
+            for page in paginator.paginate(AutoScalingGroupNames=chunk):
+                for asg in page['AutoScalingGroups']:
+                    in_service = sum(1 for inst in asg['Instances'] if inst['LifecycleState'] == 'InService')
+                    if len(asg['Instances']) != asg['DesiredCapacity'] or in_service != asg['DesiredCapacity']:
+                        pending.append(asg_owners[asg['AutoScalingGroupName']])
+        return pending
+    return fetch_pending
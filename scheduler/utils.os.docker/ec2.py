@@ -4,6 +4,8 @@ import argparse
 import sys
 from botocore.exceptions import ClientError
 
+from convergence import pending_ec2_instances, wait_for_convergence
+
 # Ініціалізація клієнтів для EC2 та SSM
 def init_clients(region):
     ec2_client = boto3.client('ec2', region_name=region)
@@ -48,17 +50,22 @@ def get_instances_from_ssm(ssm_client, parameter_name):
 def disable_instances(ec2_client, ssm_client, parameter_name, instances):
     if not instances:
         print('No instances to disable.')
-        return
+        return []
 
     # Збереження списку інстансів у SSM
     save_instances_to_ssm(ssm_client, parameter_name, instances)
 
+    # Повертаються лише інстанси, для яких справді викликано stop_instances, щоб --wait
+    # (тут і в batch.py) не чекав зупинки, яка не відбудеться, поки виклик закоментований
+    stopped = []
     try:
        # ec2_client.stop_instances(InstanceIds=instances)
+       # stopped = instances
         print(f'Stopped EC2 instances: {instances}')
     except ClientError as e:
         print(f'Failed to stop instances: {e}')
         sys.exit(1)
+    return stopped
 
 # Включення (запуск) EC2 інстансів
 def enable_instances(ec2_client, ssm_client, parameter_name):
@@ -67,7 +74,7 @@ def enable_instances(ec2_client, ssm_client, parameter_name):
 
     if not instances:
         print('No instances to enable.')
-        return
+        return []
 
     try:
         ec2_client.start_instances(InstanceIds=instances)
@@ -75,6 +82,7 @@ def enable_instances(ec2_client, ssm_client, parameter_name):
     except ClientError as e:
         print(f'Failed to start instances: {e}')
         sys.exit(1)
+    return instances
 
 # Основна функція
 def main():
@@ -84,6 +92,8 @@ def main():
     parser.add_argument('--excluded-instances', nargs='*', default=[], help='List of EC2 instance IDs to exclude')
     parser.add_argument('--action', choices=['disable', 'enable'], required=True, help='Action to perform: disable or enable EC2 instances')
     parser.add_argument('--ssm-parameter', required=True, help='SSM Parameter name to store/retrieve instance IDs')
+    parser.add_argument('--wait', action='store_true', help='Wait until instances reach the target state')
+    parser.add_argument('--wait-timeout', type=int, default=900, help='Seconds to wait for the target state')
 
     args = parser.parse_args()
 
@@ -91,9 +101,17 @@ def main():
 
     if args.action == 'disable':
         instances = get_active_instances(ec2_client, args.instances, args.excluded_instances)
-        disable_instances(ec2_client, ssm_client, args.ssm_parameter, instances)
+        changed = disable_instances(ec2_client, ssm_client, args.ssm_parameter, instances)
     elif args.action == 'enable':
-        enable_instances(ec2_client, ssm_client, args.ssm_parameter)
+        changed = enable_instances(ec2_client, ssm_client, args.ssm_parameter)
+
+    # Перевірка, що зупинка/запуск справді відбулися
+    if args.wait and changed:
+        target_state = 'stopped' if args.action == 'disable' else 'running'
+        _, not_converged = wait_for_convergence(
+            'EC2 instance', changed, pending_ec2_instances(ec2_client, target_state), args.wait_timeout)
+        if not_converged:
+            sys.exit(1)
 
 if __name__ == '__main__':
     main()
@@ -2,8 +2,14 @@ import boto3
 import json
 import argparse
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 
+from convergence import chunked, pending_rds_clusters, pending_rds_instances, wait_for_convergence
+
+# Кількість кластерів та інстансів, що обробляються паралельно
+MAX_WORKERS = 10
+
 # Ініціалізація клієнтів для RDS та SSM
 def init_clients(region):
     rds_client = boto3.client('rds', region_name=region)
@@ -44,57 +50,96 @@ def get_instances_from_ssm(ssm_client, parameter_name):
         print(f'Failed to retrieve parameters from SSM: {e}')
         sys.exit(1)
 
-# Вимкнення (зупинка) RDS інстансів
-def disable_rds_instances(rds_client, ssm_client, parameter_name, instances):
+# Опис цілей пагінованими describe_db_instances і describe_db_clusters з фільтрами.
+# Члени кластерів Aurora замінюються своїм кластером, бо керувати ними можна лише на рівні кластера.
+# Кластери, серед членів яких є виключені інстанси, пропускаються, щоб не зупинити і їх
+def describe_targets(rds_client, identifiers, excluded_instances=()):
+    instances, members, cluster_ids = {}, set(), set()
+    paginator = rds_client.get_paginator('describe_db_instances')
+    for chunk in chunked(identifiers, 100):
+        for page in paginator.paginate(Filters=[{'Name': 'db-instance-id', 'Values': chunk}]):
+            for db in page['DBInstances']:
+                if db.get('DBClusterIdentifier'):
+                    members.add(db['DBInstanceIdentifier'])
+                    cluster_ids.add(db['DBClusterIdentifier'])
+                else:
+                    instances[db['DBInstanceIdentifier']] = db['DBInstanceStatus']
+
+    # Ідентифікатори, що не є інстансами, можуть бути назвами кластерів
+    cluster_ids.update(i for i in identifiers if i not in instances and i not in members)
+    clusters = {}
+    paginator = rds_client.get_paginator('describe_db_clusters')
+    for chunk in chunked(sorted(cluster_ids), 100):
+        for page in paginator.paginate(Filters=[{'Name': 'db-cluster-id', 'Values': chunk}]):
+            for cluster in page['DBClusters']:
+                excluded = sorted(m['DBInstanceIdentifier'] for m in cluster.get('DBClusterMembers', [])
+                                  if m['DBInstanceIdentifier'] in excluded_instances)
+                if excluded:
+                    print(f"WARNING: RDS cluster {cluster['DBClusterIdentifier']} has excluded members "
+                          f"{excluded}. Skipping.")
+                    continue
+                clusters[cluster['DBClusterIdentifier']] = cluster['Status']
+    return instances, clusters
+
+# Паралельна зупинка/запуск кластерів та окремих інстансів у потрібному стані.
+# Повертає ({'cluster': [...], 'instance': [...]}) успішно оброблених
+def apply_action(rds_client, identifiers, action, excluded_instances=()):
+    instances, clusters = describe_targets(rds_client, identifiers, excluded_instances)
+    expected = 'available' if action == 'disable' else 'stopped'
+    targets = []
+    for kind, statuses in (('cluster', clusters), ('instance', instances)):
+        for identifier, status in sorted(statuses.items()):
+            if status != expected:
+                print(f'RDS {kind} {identifier} is not in {expected} state (current state: {status}). Skipping.')
+                continue
+            targets.append((kind, identifier))
+
+    operations = {
+        ('cluster', 'disable'): lambda identifier: rds_client.stop_db_cluster(DBClusterIdentifier=identifier),
+        ('cluster', 'enable'): lambda identifier: rds_client.start_db_cluster(DBClusterIdentifier=identifier),
+        ('instance', 'disable'): lambda identifier: rds_client.stop_db_instance(DBInstanceIdentifier=identifier),
+        ('instance', 'enable'): lambda identifier: rds_client.start_db_instance(DBInstanceIdentifier=identifier),
+    }
+    verb = 'Stopped' if action == 'disable' else 'Started'
+
+    def process(target):
+        kind, identifier = target
+        try:
+            operations[(kind, action)](identifier)
+            print(f'{verb} RDS {kind}: {identifier}')
+            return True
+        except ClientError as e:
+            print(f'Failed to {"stop" if action == "disable" else "start"} RDS {kind} {identifier}: {e}')
+            return False
+
+    changed = {'cluster': [], 'instance': []}
+    if not targets:
+        return changed
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(targets))) as executor:
+        for (kind, identifier), ok in zip(targets, executor.map(process, targets)):
+            if ok:
+                changed[kind].append(identifier)
+    return changed
+
+# Вимкнення (зупинка) RDS інстансів і кластерів Aurora
+def disable_rds_instances(rds_client, ssm_client, parameter_name, instances, excluded_instances=()):
     if not instances:
         print('No RDS instances to disable.')
-        return
+        return {}
 
     # Збереження списку інстансів у SSM
     save_instances_to_ssm(ssm_client, parameter_name, instances)
+    return apply_action(rds_client, instances, 'disable', excluded_instances)
 
-    for instance_id in instances:
-        try:
-            # Перевірка, чи інстанс можна зупинити
-            response = rds_client.describe_db_instances(DBInstanceIdentifier=instance_id)
-            db_instance = response['DBInstances'][0]
-            status = db_instance['DBInstanceStatus']
-            engine = db_instance['Engine']
-
-            if status != 'available':
-                print(f'RDS instance {instance_id} is not in available state (current state: {status}). Skipping.')
-                continue
-
-            # Зупинка інстансу
-            rds_client.stop_db_instance(DBInstanceIdentifier=instance_id)
-            print(f'Stopped RDS instance: {instance_id}')
-        except ClientError as e:
-            print(f'Failed to stop RDS instance {instance_id}: {e}')
-
-# Включення (запуск) RDS інстансів
+# Включення (запуск) RDS інстансів і кластерів Aurora
 def enable_rds_instances(rds_client, ssm_client, parameter_name):
     # Отримання списку інстансів з SSM
     instances = get_instances_from_ssm(ssm_client, parameter_name)
 
     if not instances:
         print('No RDS instances to enable.')
-        return
-
-    for instance_id in instances:
-        try:
-            response = rds_client.describe_db_instances(DBInstanceIdentifier=instance_id)
-            db_instance = response['DBInstances'][0]
-            status = db_instance['DBInstanceStatus']
-
-            if status != 'stopped':
-                print(f'RDS instance {instance_id} is not in stopped state (current state: {status}). Skipping.')
-                continue
-
-            # Запуск інстансу
-            rds_client.start_db_instance(DBInstanceIdentifier=instance_id)
-            print(f'Started RDS instance: {instance_id}')
-        except ClientError as e:
-            print(f'Failed to start RDS instance {instance_id}: {e}')
+        return {}
+    return apply_action(rds_client, instances, 'enable')
 
 # Основна функція
 def main():
@@ -104,6 +149,8 @@ def main():
     parser.add_argument('--excluded-instances', nargs='*', default=[], help='List of RDS DB instance identifiers to exclude')
     parser.add_argument('--action', choices=['disable', 'enable'], required=True, help='Action to perform: disable or enable RDS instances')
     parser.add_argument('--ssm-parameter', required=True, help='SSM Parameter name to store/retrieve instance IDs')
+    parser.add_argument('--wait', action='store_true', help='Wait until instances reach the target state')
+    parser.add_argument('--wait-timeout', type=int, default=1800, help='Seconds to wait for the target state')
 
     args = parser.parse_args()
 
@@ -111,9 +158,24 @@ def main():
 
     if args.action == 'disable':
         instances = get_active_rds_instances(rds_client, args.instances, args.excluded_instances)
-        disable_rds_instances(rds_client, ssm_client, args.ssm_parameter, instances)
+        changed = disable_rds_instances(rds_client, ssm_client, args.ssm_parameter, instances, args.excluded_instances)
     elif args.action == 'enable':
-        enable_rds_instances(rds_client, ssm_client, args.ssm_parameter)
+        changed = enable_rds_instances(rds_client, ssm_client, args.ssm_parameter)
+
+    # Перевірка, що зупинка/запуск справді відбулися
+    if args.wait and changed:
+        target_status = 'stopped' if args.action == 'disable' else 'available'
+        not_converged = []
+        if changed['instance']:
+            not_converged += wait_for_convergence(
+                'RDS instance', changed['instance'], pending_rds_instances(rds_client, target_status),
+                args.wait_timeout)[1]
+        if changed['cluster']:
+            not_converged += wait_for_convergence(
+                'RDS cluster', changed['cluster'], pending_rds_clusters(rds_client, target_status),
+                args.wait_timeout)[1]
+        if not_converged:
+            sys.exit(1)
 
 if __name__ == '__main__':
     main()